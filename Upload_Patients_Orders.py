@@ -1,6 +1,7 @@
 import pandas as pd
 import requests
 from config import get_auth_header
+from date_normalization import parse_date, format_date, ISO_DATE_FORMAT, STANDARD_DATE_FORMAT
 try:
     import fitz  # PyMuPDF for PDF text extraction
 except Exception:
@@ -577,25 +578,16 @@ def split_name(full_name):
 
 
 def get_age(dob):
-    try:
-        birth = pd.to_datetime(dob)
-        today = pd.to_datetime("today")
-        return str(today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day)))
-    except Exception:
+    birth = parse_date(dob, lenient=True)
+    if birth is None:
         return ""
+    today = datetime.datetime.now()
+    return str(today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day)))
 
 
 def normalize_dob(dob_value: str) -> str:
     """Normalize DOB to YYYY-MM-DD for consistent matching and payloads."""
-    try:
-        if pd.isna(dob_value) or dob_value is None:
-            return ""
-        dt = pd.to_datetime(str(dob_value).strip(), errors="coerce")
-        if pd.isna(dt):
-            return ""
-        return dt.strftime("%Y-%m-%d")
-    except Exception:
-        return ""
+    return format_date(dob_value, ISO_DATE_FORMAT, lenient=True) or ""
 
 
 def format_date_mmddyyyy(date_value) -> str:
@@ -604,15 +596,7 @@ def format_date_mmddyyyy(date_value) -> str:
     Accepts strings in various formats, pandas Timestamps, datetime/date.
     Returns empty string on failure.
     """
-    try:
-        if date_value is None or (isinstance(date_value, float) and pd.isna(date_value)):
-            return ""
-        dt = pd.to_datetime(str(date_value).strip(), errors="coerce")
-        if pd.isna(dt):
-            return ""
-        return dt.strftime("%m/%d/%Y")
-    except Exception:
-        return ""
+    return format_date(date_value, STANDARD_DATE_FORMAT, lenient=True) or ""
 
 
 def search_patientid_by_name_dob(patients, name, dob):
@@ -772,9 +756,8 @@ def get_episode_data_from_patient(row, patients):
     if not ref_date:
         return row.get("soc", ""), row.get("cert_period_soe", ""), row.get("cert_period_eoe", "")
     
-    try:
-        ref_date_parsed = pd.to_datetime(ref_date)
-    except:
+    ref_date_parsed = parse_date(ref_date, lenient=True)
+    if ref_date_parsed is None:
         return row.get("soc", ""), row.get("cert_period_soe", ""), row.get("cert_period_eoe", "")
     
     # Find matching patient and episode
@@ -788,9 +771,9 @@ def get_episode_data_from_patient(row, patients):
                     soe = episode.get("startOfEpisode", "")
                     eoe = episode.get("endOfEpisode", "")
                     if soe and eoe:
-                        soe_parsed = pd.to_datetime(soe)
-                        eoe_parsed = pd.to_datetime(eoe)
-                        if soe_parsed <= ref_date_parsed <= eoe_parsed:
+                        soe_parsed = parse_date(soe, lenient=True)
+                        eoe_parsed = parse_date(eoe, lenient=True)
+                        if soe_parsed and eoe_parsed and soe_parsed <= ref_date_parsed <= eoe_parsed:
                             return (
                                 episode.get("startOfCare", row.get("soc", "")),
                                 soe,
@@ -1928,6 +1911,19 @@ def main():
     except Exception as e:
         print(f"[FILTER] Error applying excluded document type filter: {e}")
 
+    # Validate the whole sheet in one vectorized pass before any upload call is made
+    try:
+        from validation import MedicalFieldValidator
+        sheet_validation = MedicalFieldValidator.validate_dataframe(df)
+        # Reported only; df is written back to Excel and must keep its own columns
+        invalid_mask = ~sheet_validation.valid_rows
+        row_errors = sheet_validation.row_errors()[invalid_mask]
+        print(f"[VALIDATE] {int(invalid_mask.sum())}/{len(df)} rows have field issues. Invalid per column: {sheet_validation.summary()}")
+        for idx, errors in row_errors.items():
+            debug_log("VALIDATE", f"Row={idx} DocID={df.at[idx, 'Document ID'] if 'Document ID' in df.columns else ''} {errors}")
+    except Exception as e:
+        print(f"[VALIDATE] Error validating sheet: {e}")
+
     created_patients = set()
     # 1. First pass: Create patients for ALL non-excluded document types where PatientExist==False
     for idx, row in df.iterrows():
@@ -0,0 +1,154 @@
+import re
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import CHUNK_DEDUP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'\w+')
+FINGERPRINT_BITS = 64
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over lowercase word shingles; similar texts differ in few bits."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) >= shingle_size:
+        features = [" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)]
+    else:
+        features = [" ".join(tokens)]
+    weights = [0] * FINGERPRINT_BITS
+    for feature in features:
+        value = _token_hash(feature)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def digit_signature(text: str) -> str:
+    """Hash of the tokens containing digits (dates, MRNs, ICD codes, phone numbers).
+
+    Two chunks only count as duplicates when these match exactly, so a shared
+    template filled in for different patients is never collapsed.
+    """
+    tokens = sorted(token for token in _TOKEN_RE.findall(text.lower()) if any(c.isdigit() for c in token))
+    return hashlib.sha1(" ".join(tokens).encode("utf-8")).hexdigest()[:16]
+
+def chunk_fingerprint(text: str, shingle_size: int = 3) -> Dict[str, str]:
+    """Payload fields identifying a chunk for near-duplicate lookups."""
+    return {"simhash": f"{simhash(text, shingle_size):016x}", "digit_signature": digit_signature(text)}
+
+@dataclass
+class NearDuplicateIndex:
+    """SimHash index answering "is there a stored chunk within max_distance bits?".
+
+    The fingerprint is split into max_distance + 1 bands; by pigeonhole, any
+    fingerprint within max_distance bits shares at least one band exactly, so
+    only chunks in matching band buckets are compared.
+    """
+    max_distance: int = 3
+    _buckets: List[Dict[int, List[Tuple[int, str, str]]]] = field(default_factory=list, repr=False)
+
+    def __post_init__(self):
+        self.bands = self.max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.bands
+        self._buckets = [{} for _ in range(self.bands)]
+
+    def _band_keys(self, fingerprint: int) -> Iterable[Tuple[int, int]]:
+        mask = (1 << self.band_bits) - 1
+        for band in range(self.bands):
+            yield band, fingerprint >> (band * self.band_bits) & mask
+
+    def add(self, key: str, fingerprint: int, signature: str):
+        entry = (fingerprint, signature, key)
+        for band, band_key in self._band_keys(fingerprint):
+            self._buckets[band].setdefault(band_key, []).append(entry)
+
+    def find(self, fingerprint: int, signature: str) -> Optional[str]:
+        """Key of a stored near duplicate with the same digit signature, or None."""
+        for band, band_key in self._band_keys(fingerprint):
+            for other, other_signature, key in self._buckets[band].get(band_key, ()):
+                if other_signature == signature and bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    return key
+        return None
+
+@dataclass
+class DedupStats:
+    chunks: int = 0
+    within_run: int = 0
+    against_collection: int = 0
+    reused: int = 0
+    chars_saved: int = 0
+
+    @property
+    def skipped(self) -> int:
+        """Chunks that need no embedding call (dropped or reusing a stored vector)."""
+        return self.within_run + self.against_collection
+
+def suppress_near_duplicates(
+    texts: List[str],
+    metadatas: List[dict],
+    ids: List[str],
+    existing: Iterable[Tuple[str, Dict]] = (),
+    config: Dict = None
+) -> Tuple[List[str], List[dict], List[str], List[Tuple[str, dict, str, str]], DedupStats]:
+    """Split chunks into ones to embed and near duplicates of an earlier chunk.
+
+    Chunks are matched across documents, so letterhead and fax boilerplate
+    repeated on many orders is embedded once. A duplicate of a chunk from the
+    same doc_id is dropped; a duplicate of another document's chunk is returned
+    in reused as (text, metadata, point_id, source_point_id), so the store can
+    add it under its own doc_id with the source's vector and per-document
+    filtered retrieval still finds it. existing yields (point_id, payload) for
+    points already in the collection; only payloads carrying a simhash are used.
+    Kept chunks get their fingerprint added to the metadata so later runs can
+    match against them. A chunk whose own point ID is already stored is kept
+    (the store skips it without embedding anyway).
+    """
+    config = config or CHUNK_DEDUP_CONFIG
+    shingle_size = config.get("shingle_size", 3)
+    index = NearDuplicateIndex(config.get("max_hamming_distance", 3))
+    doc_of: Dict[str, Optional[str]] = {}
+
+    def doc_key(doc_id) -> Optional[str]:
+        return None if doc_id is None else str(doc_id)
+
+    stored = set()
+    for point_id, payload in existing:
+        if payload and payload.get("simhash") and payload.get("digit_signature"):
+            point_id = str(point_id)
+            index.add(point_id, int(payload["simhash"], 16), payload["digit_signature"])
+            doc_of[point_id] = doc_key(payload.get("doc_id"))
+            stored.add(point_id)
+
+    stats = DedupStats(chunks=len(texts))
+    kept_texts, kept_metadatas, kept_ids = [], [], []
+    reused = []
+    copied = set()
+    for text, metadata, point_id in zip(texts, metadatas, ids):
+        point_id = str(point_id)
+        fingerprint = chunk_fingerprint(text, shingle_size)
+        value = int(fingerprint["simhash"], 16)
+        doc_id = doc_key(metadata.get("doc_id"))
+        duplicate_of = index.find(value, fingerprint["digit_signature"])
+        if duplicate_of is not None and duplicate_of != point_id:
+            if duplicate_of in stored:
+                stats.against_collection += 1
+            else:
+                stats.within_run += 1
+            stats.chars_saved += len(text)
+            # One copy per document is enough for its filtered retrieval
+            if doc_of[duplicate_of] != doc_id and (duplicate_of, doc_id) not in copied:
+                copied.add((duplicate_of, doc_id))
+                reused.append((text, {**metadata, **fingerprint}, point_id, duplicate_of))
+                stats.reused += 1
+            continue
+        index.add(point_id, value, fingerprint["digit_signature"])
+        doc_of[point_id] = doc_id
+        kept_texts.append(text)
+        kept_metadatas.append({**metadata, **fingerprint})
+        kept_ids.append(point_id)
+    return kept_texts, kept_metadatas, kept_ids, reused, stats
@@ -110,9 +110,40 @@ QDRANT_CONFIG = {
     "hnsw_m": 32,                # Reduced connections for speed
     "hnsw_ef_search": 100,       # Reduced search quality for speed
     "quantization_enabled": True, # Enable quantization for speed
+    "quantization_type": "scalar", # "scalar" (int8, 4x smaller) or "binary" (32x smaller, needs rescore)
+    "scalar_quantile": 0.99,     # Clip outliers when choosing the int8 range
+    "quantization_always_ram": True, # Keep quantized vectors in RAM, originals may stay on disk
     "oversampling": 1.0,         # No oversampling needed
     "rescore": False,            # Disable rescore for speed
-    "top_k_retrieval": 5         # Retrieve less context for speed
+    "top_k_retrieval": 5,        # Retrieve less context for speed
+    "payload_indexes": ["doc_id", "company", "digit_signature"], # Keyword indexes for filtered retrieval and dedup scans
+    # Indexing pipeline (add_texts)
+    "embedding_workers": 4,             # Concurrent embedding requests
+    "embedding_batch_size": 25,         # Starting batch size, adapted to observed latency
+    "embedding_min_batch_size": 8,
+    "embedding_max_batch_size": 128,
+    "embedding_target_latency": 2.0,    # Seconds per embedding call before batches shrink
+    "embedding_max_batch_bytes": 256 * 1024,
+    "upsert_max_points": 256,
+    "upsert_max_bytes": 4 * 1024 * 1024  # Per upsert request (vectors + payloads)
+}
+
+# Vector store backend: "qdrant" (remote cluster) or "local" (in-process, works offline)
+VECTOR_STORE_BACKEND = "qdrant"
+
+# When pipeline_main builds the vector index: "background" (alongside field extraction),
+# "on_demand" (only when FIELD_EXTRACTION_CONFIG["rag_fallback"] needs it), "sync" or "off"
+VECTOR_INDEXING_MODE = "background"
+
+LOCAL_VECTOR_STORE_CONFIG = {
+    "path": "local_vector_index",   # One sub-directory per collection
+    "search_mode": "exact",         # "exact" or "ivf" (approximate)
+    "ivf_min_points": 2000,         # Below this, IVF mode still searches exactly
+    "ivf_lists": None,              # Default: sqrt(number of points)
+    "ivf_nprobe": 8,                # Lists scanned per query
+    "ivf_rebuild_growth": 1.2,      # Rebuild lists once the store grew by 20%
+    "embedding_batch_size": 64,
+    "payload_indexes": ["doc_id", "company", "digit_signature"], # In-memory value -> rows maps for filtered search
 }
 
 # Optimized Download Configuration for VM performance
@@ -156,6 +187,73 @@ FIELD_EXTRACTION_CONFIG = {
     "cross_validation_enabled": False,  # Disabled for speed
     "medical_context_enhancement": False, # Disabled for speed
     "structured_prompting": False,   # Disabled for speed
+    "chunk_concurrency": 3,          # Parallel chunk requests in enhanced chunking
+    "prompt_compaction": True,       # Send only line windows around field labels to the LLM
+    "prompt_token_budget": 1500,     # Approximate token cap for the compacted document text
+    "structured_output": "function", # "function" (schema-enforced tool call), "json_mode" or None
+    "hybrid_extraction": True,       # Ask the LLM only for fields the patterns missed
+    "hybrid_tokens_per_field": 60,   # Response token allowance per requested field
+    "hedging_enabled": True,         # Race Ollama against Azure when Azure is slower than usual
+    "hedge_latency_percentile": 90,  # Hedge once Azure exceeds this percentile of recent latencies
+    "hedge_min_samples": 20,         # Latencies needed before the percentile is trusted
+    "hedge_default_delay": 10.0,     # Hedge delay (seconds) until enough samples exist
+    "hedge_min_delay": 2.0,          # Never hedge sooner than this (seconds)
+    "hedge_latency_window": 200,     # Recent Azure latencies kept for the percentile
+    "hedge_workers": 4,
+    "azure_breaker_failures": 5,     # Consecutive Azure failures before the circuit opens
+    "azure_breaker_cooldown": 60.0,  # Seconds to skip Azure before probing it again
+    "packing_enabled": True,         # Pack several short orders into one LLM request
+    "packing_max_chars": 1500,       # Only documents shorter than this are packed
+    "packing_max_docs": 5,           # Documents per packed request
+    "packing_tokens_per_doc": 400,   # Response token allowance per packed document
+    "rag_fallback": False,           # Retry POOR/FAILED extractions with RAG (waits for the vector index)
+    "rag_retrieval_cache_size": 256, # (document, query) retrieval results kept in memory
+    "rag_context_chunks": 8,         # Chunks passed to the RAG chain, merged across the batched queries
+}
+
+# Orders database (SQLite)
+DATABASE_CONFIG = {
+    "journal_mode": "WAL",          # Readers do not block the writer
+    "synchronous": "NORMAL",        # No fsync per commit in WAL mode (durable at checkpoints)
+    "busy_timeout": 30.0,           # Seconds to wait on a locked database
+    "batch_rows": 50,               # OrderBatchWriter: rows per transaction
+    "batch_seconds": 5.0,           # OrderBatchWriter: write at least this often while rows arrive
+}
+
+# Near-duplicate chunk suppression before embedding (SimHash over word shingles)
+CHUNK_DEDUP_CONFIG = {
+    "enabled": True,
+    "max_hamming_distance": 3,      # Of 64 bits; chunks this close are treated as copies
+    "shingle_size": 3,              # Words per shingle
+    "scan_collection": True,        # Also match against stored chunks with the same digit signature
+}
+
+# Persistent embedding cache (memory-mapped float32 vectors + SQLite index)
+EMBEDDING_CACHE_CONFIG = {
+    "enabled": True,
+    "cache_dir": "embedding_cache",
+    "max_entries": 100000,          # Matrix rows; ~600 MB at 1536 dims when full
+    "evict_fraction": 0.1,          # Share of least recently used entries dropped when full
+}
+
+# Persistent LLM response cache (skips repeat Azure/Ollama calls on reprocessing)
+LLM_CACHE_CONFIG = {
+    "enabled": True,
+    "db_file": "llm_response_cache.db",
+    "max_entries": 50000,           # Least recently used entries are evicted beyond this
+    "ttl_days": 90,                 # Entries older than this are dropped on eviction
+    "eviction_interval": 100,       # Run eviction every N writes
+}
+
+# Shared LLM gateway: pooled clients, global concurrency limits and retry policy
+LLM_GATEWAY_CONFIG = {
+    "azure_api_version": "2024-02-15-preview",
+    "azure_max_concurrency": 8,     # Concurrent Azure OpenAI requests across the process
+    "ollama_max_concurrency": 2,    # Local model is CPU/GPU bound
+    "request_timeout": 60,          # Seconds per request
+    "max_retries": 3,
+    "backoff_base": 1.0,            # Seconds; full jitter on base * 2**attempt
+    "backoff_cap": 10.0,
 }
 
 # ===========================================
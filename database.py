@@ -1,18 +1,46 @@
 import sqlite3
 import json
+import time
+import zlib
+import atexit
+import logging
 import pandas as pd
 from typing import List, Dict, Any
 from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 
+from config import DATABASE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+ORDER_COLUMNS = [
+    "docId", "orderno", "orderdate", "mrn", "soc", "cert_period_soe", "cert_period_eoe",
+    "icd_codes", "icd_codes_validated", "patient_name", "dob", "address", "patient_sex",
+    "extraction_method", "extraction_error", "error"
+]
+
+# raw_text lives zlib-compressed in order_texts (migration 4); orders.raw_text is left NULL
+INSERT_TEXT_SQL = "INSERT OR REPLACE INTO order_texts (docId, raw_text, raw_length) VALUES (?, ?, ?)"
+TEXT_COMPRESSION_LEVEL = 6
+
+INSERT_ORDER_SQL = (
+    f"INSERT OR REPLACE INTO orders ({', '.join(ORDER_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(ORDER_COLUMNS))})"
+)
+
 def create_connection(db_file):
-    """Create a database connection to the SQLite database."""
-    conn = sqlite3.connect(db_file)
+    """Create a database connection to the SQLite database (WAL journal, tuned fsync)."""
+    conn = sqlite3.connect(db_file, timeout=DATABASE_CONFIG.get("busy_timeout", 30.0))
+    try:
+        conn.execute(f"PRAGMA journal_mode={DATABASE_CONFIG.get('journal_mode', 'WAL')}")
+        # NORMAL skips the fsync per commit in WAL mode; a power loss can drop the last
+        # transactions but never corrupts the database
+        conn.execute(f"PRAGMA synchronous={DATABASE_CONFIG.get('synchronous', 'NORMAL')}")
+    except sqlite3.DatabaseError as e:
+        logger.warning(f"Could not apply journal settings to {db_file}: {e}")
     return conn
 
-def create_table(conn):
-    """Create the orders table if it doesn't exist."""
-    cur = conn.cursor()
-    cur.execute("""
+def _create_orders_table(conn):
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS orders (
         docId INTEGER PRIMARY KEY,
         orderno TEXT,
@@ -33,33 +61,104 @@ def create_table(conn):
         error TEXT
     );
 """)
+
+def _add_patient_columns(conn):
+    # Databases created before these columns existed; newer ones already have them
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(orders)")}
+    for column in ("patient_name", "dob", "address", "patient_sex"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE orders ADD COLUMN {column} TEXT")
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress((text or "").encode("utf-8"), TEXT_COMPRESSION_LEVEL)
+
+def decompress_text(blob) -> str:
+    return zlib.decompress(blob).decode("utf-8") if blob else ""
+
+def _text_row(fields) -> tuple:
+    text = fields.get("raw_text") or ""
+    return (str(fields.get("docId")), compress_text(text), len(text))
+
+def _move_raw_text(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS order_texts (
+        docId INTEGER PRIMARY KEY,
+        raw_text BLOB,
+        raw_length INTEGER
+    )
+""")
+    cur = conn.execute("SELECT docId, raw_text FROM orders WHERE raw_text IS NOT NULL AND raw_text != ''")
+    while True:
+        rows = cur.fetchmany(500)
+        if not rows:
+            break
+        conn.executemany(INSERT_TEXT_SQL, [_text_row({"docId": doc_id, "raw_text": text}) for doc_id, text in rows])
+    conn.execute("UPDATE orders SET raw_text = NULL")
+
+def _create_filter_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_extraction_method ON orders (extraction_method)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_mrn ON orders (mrn)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_orderdate ON orders (orderdate)")
+
+# Ordered schema migrations: (version, description, function). Append only; never edit applied ones.
+MIGRATIONS = [
+    (1, "create orders table", _create_orders_table),
+    (2, "add patient_name, dob, address, patient_sex", _add_patient_columns),
+    (3, "index extraction_method, mrn, orderdate", _create_filter_indexes),
+    (4, "move raw_text to compressed order_texts", _move_raw_text),
+]
+
+# Migrations that free enough pages to be worth a VACUUM afterwards
+_VACUUM_AFTER = {4}
+
+def schema_version(conn) -> int:
+    """Highest applied migration version (0 for a new database)."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT
+    )
+""")
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def migrate(conn, target: int = None) -> int:
+    """Apply pending migrations in order, each in its own transaction; returns the new version."""
+    current = schema_version(conn)
     conn.commit()
+    vacuum = False
+    for version, description, apply in MIGRATIONS:
+        if version <= current or (target is not None and version > target):
+            continue
+        # Explicit BEGIN so the DDL and its version row commit (or roll back) together
+        conn.execute("BEGIN")
+        try:
+            apply(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, datetime('now'))",
+                (version, description)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"Applied database migration {version}: {description}")
+        current = version
+        vacuum = vacuum or version in _VACUUM_AFTER
+    if vacuum:
+        conn.execute("VACUUM")
+    return current
+
+def create_table(conn):
+    """Create the orders table if it doesn't exist (brings the schema up to date)."""
+    migrate(conn)
 
 def ensure_new_columns(conn):
-    """Ensure all required columns exist in the database."""
-    cur = conn.cursor()
-    try: 
-        cur.execute("ALTER TABLE orders ADD COLUMN patient_name TEXT")
-    except sqlite3.OperationalError: 
-        pass
-    try: 
-        cur.execute("ALTER TABLE orders ADD COLUMN dob TEXT")
-    except sqlite3.OperationalError: 
-        pass
-    try: 
-        cur.execute("ALTER TABLE orders ADD COLUMN address TEXT")
-    except sqlite3.OperationalError: 
-        pass
-    try: 
-        cur.execute("ALTER TABLE orders ADD COLUMN patient_sex TEXT")
-    except sqlite3.OperationalError: 
-        pass
-    conn.commit()
+    """Ensure all required columns exist in the database (brings the schema up to date)."""
+    migrate(conn)
 
-def insert_order(conn, fields):
-    """Insert or update an order record in the database."""
-    cur = conn.cursor()
-    
+def _order_row(fields) -> tuple:
+    """Column values for one order, in ORDER_COLUMNS order."""
     # Handle cert_period structure - it can be either a dict or separate fields
     cert_period = fields.get("cert_period", {})
     if isinstance(cert_period, dict):
@@ -76,50 +175,150 @@ def insert_order(conn, fields):
             return None
         return str(val)
     
-    cur.execute("""
-    INSERT OR REPLACE INTO orders (
-        docId, orderno, orderdate, mrn, soc, cert_period_soe, cert_period_eoe,
-        icd_codes, icd_codes_validated, patient_name, dob, address, patient_sex,
-        raw_text, extraction_method, extraction_error, error
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-""", (
-    safe_value(fields.get("docId")),
-    safe_value(fields.get("orderno")),
-    safe_value(fields.get("orderdate")),
-    safe_value(fields.get("mrn")),
-    safe_value(fields.get("soc")),
-    safe_value(cert_period_soe),
-    safe_value(cert_period_eoe),
-    json.dumps(fields.get("icd_codes", [])),
-    json.dumps(fields.get("icd_codes_validated", [])),
-    safe_value(fields.get("patient_name")),
-    safe_value(fields.get("dob")),
-    safe_value(fields.get("address")),
-    safe_value(fields.get("patient_sex")),
-    safe_value(fields.get("raw_text", "")),
-    safe_value(fields.get("extraction_method", "")),
-    safe_value(fields.get("extraction_error", "")),
-    safe_value(fields.get("error"))
-))
+    return (
+        safe_value(fields.get("docId")),
+        safe_value(fields.get("orderno")),
+        safe_value(fields.get("orderdate")),
+        safe_value(fields.get("mrn")),
+        safe_value(fields.get("soc")),
+        safe_value(cert_period_soe),
+        safe_value(cert_period_eoe),
+        json.dumps(fields.get("icd_codes", [])),
+        json.dumps(fields.get("icd_codes_validated", [])),
+        safe_value(fields.get("patient_name")),
+        safe_value(fields.get("dob")),
+        safe_value(fields.get("address")),
+        safe_value(fields.get("patient_sex")),
+        safe_value(fields.get("extraction_method", "")),
+        safe_value(fields.get("extraction_error", "")),
+        safe_value(fields.get("error"))
+    )
+
+def insert_order(conn, fields):
+    """Insert or update an order record in the database."""
+    conn.execute(INSERT_ORDER_SQL, _order_row(fields))
+    if "raw_text" in fields:
+        conn.execute(INSERT_TEXT_SQL, _text_row(fields))
     conn.commit()
 
-def fetch_all_orders(conn):
-    """Fetch all orders from the database."""
+class OrderBatchWriter:
+    """Buffers order rows and writes them with executemany in one transaction.
+    
+    A batch is written once batch_rows rows are buffered or batch_seconds have
+    passed since the last write (checked when a row is added). Call flush() or
+    close() before reading the rows back; pending rows are also flushed at
+    interpreter exit, which covers Ctrl-C and SystemExit.
+    """
+    
+    def __init__(self, conn, batch_rows: int = None, batch_seconds: float = None):
+        self.conn = conn
+        self.batch_rows = batch_rows or DATABASE_CONFIG.get("batch_rows", 50)
+        self.batch_seconds = batch_seconds or DATABASE_CONFIG.get("batch_seconds", 5.0)
+        self.pending = []
+        self.pending_texts = []
+        self.rows_written = 0
+        self.batches_written = 0
+        self.last_flush = time.time()
+        self._closed = False
+        atexit.register(self.close)
+    
+    def add(self, fields):
+        self.pending.append(_order_row(fields))
+        if "raw_text" in fields:
+            self.pending_texts.append(_text_row(fields))
+        if len(self.pending) >= self.batch_rows or time.time() - self.last_flush >= self.batch_seconds:
+            self.flush()
+    
+    def flush(self):
+        """Write all buffered rows in a single transaction."""
+        if self.pending:
+            rows = self.pending
+            with self.conn:
+                self.conn.executemany(INSERT_ORDER_SQL, rows)
+                if self.pending_texts:
+                    self.conn.executemany(INSERT_TEXT_SQL, self.pending_texts)
+            self.pending = []
+            self.pending_texts = []
+            self.rows_written += len(rows)
+            self.batches_written += 1
+            logger.debug(f"Wrote {len(rows)} orders in one transaction")
+        self.last_flush = time.time()
+    
+    def close(self):
+        if self._closed:
+            return
+        try:
+            self.flush()
+        except sqlite3.ProgrammingError as e:
+            # Connection already closed; nothing more can be written
+            logger.error(f"Dropped {len(self.pending)} unwritten orders: {e}")
+        self._closed = True
+        atexit.unregister(self.close)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def _fetch_orders(conn, where: str = "", params=(), include_raw_text: bool = False):
+    """Order dicts for a WHERE clause; raw_text is decompressed only when asked for."""
     cur = conn.cursor()
-    cur.execute("SELECT * FROM orders")
-    rows = cur.fetchall()
-    columns = [col[0] for col in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
+    cur.execute(f"SELECT {', '.join(ORDER_COLUMNS)} FROM orders {where}", tuple(params))
+    orders = [dict(zip(ORDER_COLUMNS, row)) for row in cur.fetchall()]
+    if include_raw_text:
+        texts = fetch_raw_texts(conn, [order["docId"] for order in orders])
+        for order in orders:
+            order["raw_text"] = texts.get(order["docId"], "")
+    return orders
 
-def fetch_order_by_docid(conn, docid):
+def fetch_all_orders(conn, include_raw_text: bool = False):
+    """Fetch all orders from the database."""
+    return _fetch_orders(conn, include_raw_text=include_raw_text)
+
+def fetch_orders_by_docids(conn, docids, include_raw_text: bool = False):
+    """Fetch the orders with the given document IDs."""
+    orders = []
+    docids = [str(docid) for docid in docids]
+    for i in range(0, len(docids), 500):
+        batch = docids[i:i + 500]
+        orders.extend(_fetch_orders(
+            conn, f"WHERE docId IN ({','.join('?' * len(batch))})", batch, include_raw_text
+        ))
+    return orders
+
+def fetch_orders_by_method(conn, methods: List[str], include_raw_text: bool = False):
+    """Orders whose extraction_method is one of methods (e.g. failures to reprocess)."""
+    placeholders = ",".join("?" * len(methods))
+    return _fetch_orders(conn, f"WHERE extraction_method IN ({placeholders})", methods, include_raw_text)
+
+def fetch_order_by_docid(conn, docid, include_raw_text: bool = False):
     """Fetch a specific order by document ID."""
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM orders WHERE docId = ?", (docid,))
-    row = cur.fetchone()
-    if row:
-        columns = [col[0] for col in cur.description]
-        return dict(zip(columns, row))
-    return None
+    orders = _fetch_orders(conn, "WHERE docId = ?", (docid,), include_raw_text)
+    return orders[0] if orders else None
+
+def fetch_raw_text(conn, docid) -> str:
+    """Decompressed raw_text of one order ("" when none is stored)."""
+    row = conn.execute("SELECT raw_text FROM order_texts WHERE docId = ?", (docid,)).fetchone()
+    return decompress_text(row[0]) if row else ""
+
+def fetch_raw_texts(conn, docids) -> Dict[Any, str]:
+    """Decompressed raw_text by docId for the given orders."""
+    texts = {}
+    docids = list(docids)
+    for i in range(0, len(docids), 500):
+        batch = docids[i:i + 500]
+        rows = conn.execute(
+            f"SELECT docId, raw_text FROM order_texts WHERE docId IN ({','.join('?' * len(batch))})", batch
+        ).fetchall()
+        texts.update((doc_id, decompress_text(blob)) for doc_id, blob in rows)
+    return texts
+
+def iter_raw_texts(conn):
+    """Yield (docId, raw_text) for every order with non-empty text, decompressing one at a time."""
+    cur = conn.execute("SELECT docId, raw_text FROM order_texts WHERE raw_length > 0")
+    for doc_id, blob in cur:
+        yield doc_id, decompress_text(blob)
 
 def clean_illegal_excel_chars(obj):
     """Clean illegal characters for Excel export."""
@@ -132,15 +331,126 @@ def clean_illegal_excel_chars(obj):
     else:
         return obj
 
-def export_db_to_excel(conn, output_excel="doctoralliance_orders_final.xlsx", filter_docids=None):
-    """Export database records to Excel file."""
-    all_orders = fetch_all_orders(conn)
+def export_db_to_excel(conn, output_excel="doctoralliance_orders_final.xlsx", filter_docids=None,
+                       include_raw_text=False):
+    """Export database records to Excel file (raw_text only when include_raw_text)."""
     if filter_docids:
-        orders = [r for r in all_orders if str(r.get("docId")) in [str(d) for d in filter_docids]]
+        orders = fetch_orders_by_docids(conn, filter_docids, include_raw_text)
     else:
-        orders = all_orders
+        orders = fetch_all_orders(conn, include_raw_text)
     results_clean = [clean_illegal_excel_chars(r) for r in orders]
     df = pd.json_normalize(results_clean)
     df.to_excel(output_excel, index=False)
     print(f"Done! Output written to {output_excel}")
-    print(f"[INFO] Exported {len(orders)} documents to Excel.") 
\ No newline at end of file
+    print(f"[INFO] Exported {len(orders)} documents to Excel.") 
+
+def benchmark_filter_queries(db_file: str = "orders_benchmark.db", rows: int = 1_000_000, repeats: int = 5):
+    """Time the filter queries on a synthetic orders table, before and after the index migration."""
+    import os
+    import random
+    
+    if os.path.exists(db_file):
+        os.remove(db_file)
+    conn = create_connection(db_file)
+    migrate(conn, target=2)
+    
+    rng = random.Random(0)
+    methods = ["pymupdf", "ocr", "hybrid", "download_failed", "error", "failed"]
+    writer = OrderBatchWriter(conn, batch_rows=10000, batch_seconds=3600)
+    for doc_id in range(rows):
+        writer.add({
+            "docId": doc_id,
+            "orderno": f"ORD{doc_id}",
+            "orderdate": f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(2020, 2024)}",
+            "mrn": f"MRN{rng.randint(0, rows // 4):07d}",
+            "extraction_method": rng.choices(methods, weights=[70, 20, 7, 1, 1, 1])[0],
+        })
+    writer.close()
+    
+    queries = {
+        "failed records": ("SELECT docId FROM orders WHERE extraction_method IN ('download_failed', 'error', 'failed')", ()),
+        "by mrn": ("SELECT * FROM orders WHERE mrn = ?", ("MRN0001234",)),
+        "by orderdate": ("SELECT docId FROM orders WHERE orderdate = ?", ("06/15/2023",)),
+        "count by method": ("SELECT extraction_method, COUNT(*) FROM orders GROUP BY extraction_method", ()),
+    }
+    
+    def run():
+        timings = {}
+        for name, (sql, params) in queries.items():
+            start = time.perf_counter()
+            for _ in range(repeats):
+                conn.execute(sql, params).fetchall()
+            timings[name] = (time.perf_counter() - start) / repeats * 1000
+        return timings
+    
+    before = run()
+    index_start = time.perf_counter()
+    migrate(conn, target=3)
+    index_seconds = time.perf_counter() - index_start
+    after = run()
+    conn.close()
+    
+    print(f"{rows} rows; index migration took {index_seconds:.1f}s")
+    for name in queries:
+        print(f"  {name:16s} {before[name]:9.2f}ms -> {after[name]:8.2f}ms")
+    return before, after
+
+def benchmark_raw_text_storage(db_file: str = "orders_text_benchmark.db", rows: int = 5000,
+                               text_chars: int = 6000, output_excel: str = "orders_text_benchmark.xlsx"):
+    """DB size and Excel export time with raw_text inline (schema 3) and compressed aside (schema 4)."""
+    import os
+    import random
+    
+    for path in (db_file, output_excel):
+        if os.path.exists(path):
+            os.remove(path)
+    conn = create_connection(db_file)
+    migrate(conn, target=3)
+    
+    # OCR-like text: order boilerplate with per-document values
+    rng = random.Random(0)
+    words = ("patient home health order physician diagnosis skilled nursing therapy episode "
+             "certification start care plan medication wound assessment vital signs").split()
+    for doc_id in range(rows):
+        text = []
+        while sum(len(word) + 1 for word in text) < text_chars:
+            text.append(rng.choice(words) if rng.random() < 0.85 else f"{rng.randint(0, 99999)}")
+        conn.execute(
+            "INSERT INTO orders (docId, orderno, mrn, raw_text, extraction_method) VALUES (?, ?, ?, ?, ?)",
+            (doc_id, f"ORD{doc_id}", f"MRN{doc_id:07d}", " ".join(text), "pymupdf")
+        )
+    conn.commit()
+    conn.execute("VACUUM")
+    
+    def measure():
+        start = time.perf_counter()
+        # Schema 3 had raw_text inline in SELECT *, so the old export always carried it
+        if schema_version(conn) < 4:
+            cur = conn.execute("SELECT * FROM orders")
+            columns = [col[0] for col in cur.description]
+            orders = [dict(zip(columns, row)) for row in cur.fetchall()]
+        else:
+            orders = fetch_all_orders(conn)
+        pd.json_normalize([clean_illegal_excel_chars(order) for order in orders]).to_excel(output_excel, index=False)
+        return os.path.getsize(db_file), time.perf_counter() - start
+    
+    before = measure()
+    migrate(conn)
+    after = measure()
+    conn.close()
+    os.remove(output_excel)
+    
+    print(f"{rows} orders, ~{text_chars} chars of raw_text each")
+    print(f"  inline raw_text:       {before[0] / 1e6:7.1f} MB, export {before[1]:.2f}s")
+    print(f"  compressed side table: {after[0] / 1e6:7.1f} MB, export {after[1]:.2f}s")
+    return before, after
+
+if __name__ == "__main__":
+    # python database.py [rows]            filter query benchmark (default 1M rows)
+    # python database.py raw_text [rows]   raw_text storage benchmark (default 5000 orders)
+    import sys
+    args = sys.argv[1:]
+    if args and args[0] == "raw_text":
+        benchmark_raw_text_storage(rows=int(args[1]) if len(args) > 1 else 5000)
+    else:
+        benchmark_filter_queries(rows=int(args[0]) if args else 1_000_000)
@@ -0,0 +1,121 @@
+import re
+from datetime import datetime, date
+from functools import lru_cache
+from typing import Any, Optional
+
+import pandas as pd
+from dateutil import parser as dateutil_parser
+
+STANDARD_DATE_FORMAT = "%m/%d/%Y"
+ISO_DATE_FORMAT = "%Y-%m-%d"
+
+# Each shape regex selects the few strptime formats worth trying for that layout,
+# so a value is parsed with one or two attempts instead of walking every format.
+_DATE_SHAPES = [
+    (re.compile(r'^\d{1,2}/\d{1,2}/\d{4}$'), ("%m/%d/%Y", "%d/%m/%Y")),
+    (re.compile(r'^\d{1,2}/\d{1,2}/\d{2}$'), ("%m/%d/%y",)),
+    (re.compile(r'^\d{1,2}-\d{1,2}-\d{4}$'), ("%m-%d-%Y", "%d-%m-%Y")),
+    (re.compile(r'^\d{1,2}-\d{1,2}-\d{2}$'), ("%m-%d-%y",)),
+    (re.compile(r'^\d{4}-\d{1,2}-\d{1,2}$'), ("%Y-%m-%d",)),
+    (re.compile(r'^\d{4}/\d{1,2}/\d{1,2}$'), ("%Y/%m/%d",)),
+    (re.compile(r'^[A-Za-z]{3,9} \d{1,2}, \d{4}$'), ("%b %d, %Y", "%B %d, %Y")),
+    (re.compile(r'^\d{1,2} [A-Za-z]{3,9} \d{4}$'), ("%d %b %Y", "%d %B %Y")),
+]
+
+# ISO timestamps returned by the DA / WAV APIs ("2024-05-01T00:00:00.000Z", "2024-05-01 00:00:00")
+_ISO_TIMESTAMP_RE = re.compile(r'^(\d{4}-\d{1,2}-\d{1,2})[T ]\d')
+
+_BLANK_VALUES = {"", "nan", "none", "nat", "null"}
+
+DATE_CACHE_SIZE = 65536
+
+def _fix_century(dt: datetime) -> datetime:
+    """Expand two-digit years that slipped through as years 0-99."""
+    if dt.year < 50:
+        return dt.replace(year=dt.year + 2000)
+    if dt.year < 100:
+        return dt.replace(year=dt.year + 1900)
+    return dt
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_text(text: str, lenient: bool) -> Optional[datetime]:
+    """Parse one stripped date string; memoized because the same dates repeat across rows."""
+    if text.lower() in _BLANK_VALUES:
+        return None
+
+    iso_match = _ISO_TIMESTAMP_RE.match(text)
+    candidate = iso_match.group(1) if iso_match else text
+
+    for shape, formats in _DATE_SHAPES:
+        if shape.match(candidate):
+            for fmt in formats:
+                try:
+                    return _fix_century(datetime.strptime(candidate, fmt))
+                except ValueError:
+                    continue
+            break
+
+    if lenient:
+        try:
+            return dateutil_parser.parse(text).replace(tzinfo=None)
+        except (ValueError, OverflowError, TypeError):
+            return None
+    return None
+
+def parse_date(value: Any, lenient: bool = False) -> Optional[datetime]:
+    """Parse a date-like value into a naive datetime, or None.
+
+    Strings are matched against the known layouts (MM/DD/YYYY first). With
+    lenient=True anything else falls back to dateutil, the way the pandas
+    to_datetime fallbacks used to behave.
+    """
+    if isinstance(value, str):
+        return _parse_text(value.strip(), lenient)
+    if value is None or value is pd.NaT or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, datetime):
+        if isinstance(value, pd.Timestamp):
+            value = value.to_pydatetime()
+        return value.replace(tzinfo=None)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return _parse_text(str(value).strip(), lenient)
+
+def format_date(value: Any, fmt: str = STANDARD_DATE_FORMAT, lenient: bool = False) -> Optional[str]:
+    """Parse a date-like value and render it with fmt, or None when it cannot be parsed."""
+    dt = parse_date(value, lenient)
+    return dt.strftime(fmt) if dt else None
+
+def parse_date_series(values: pd.Series, lenient: bool = False) -> pd.Series:
+    """Vectorized parse_date for a whole column.
+
+    The dominant MM/DD/YYYY layout goes through pandas' compiled parser in one
+    call; the remaining distinct strings are parsed once each through the
+    memoized engine and mapped back.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        parsed = pd.to_datetime(values, errors="coerce")
+        return parsed.dt.tz_localize(None) if parsed.dt.tz is not None else parsed
+
+    present = values.notna()
+    text = values.astype(object).where(present, "").astype(str).str.strip()
+    parsed = pd.to_datetime(text, format=STANDARD_DATE_FORMAT, errors="coerce")
+
+    pending = parsed.isna() & (text != "")
+    if pending.any():
+        lookup = {s: _parse_text(s, lenient) for s in text[pending].unique()}
+        parsed.loc[pending] = pd.to_datetime(text[pending].map(lookup), errors="coerce")
+    return parsed
+
+def normalize_date_series(
+    values: pd.Series, fmt: str = STANDARD_DATE_FORMAT, lenient: bool = False, keep_unparsed: bool = False
+) -> pd.Series:
+    """Vectorized format_date; unparseable values become "" or are kept as-is."""
+    parsed = parse_date_series(values, lenient)
+    formatted = parsed.dt.strftime(fmt).astype(object)
+    fallback = values.astype(object).where(values.notna(), "") if keep_unparsed else ""
+    return formatted.where(parsed.notna(), fallback)
+
+def date_cache_info():
+    """Hit/miss statistics of the memoized string parser."""
+    return _parse_text.cache_info()
@@ -0,0 +1,191 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import EMBEDDING_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+def embedding_cache_key(deployment: str, text: str) -> str:
+    """Cache key from the embedding deployment and a hash of the chunk text."""
+    return hashlib.sha256(f"{deployment}:{text}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """Disk-backed cache of embedding vectors.
+
+    Vectors live as float32 rows of a memory-mapped matrix file; a small SQLite
+    index maps each key to its row (slot). When every slot is used, the least
+    recently used evict_fraction of the entries is dropped and their slots reused.
+    """
+
+    def __init__(self, config: Dict = None):
+        self.config = config or EMBEDDING_CACHE_CONFIG
+        self.cache_dir = self.config.get("cache_dir", "embedding_cache")
+        self.max_entries = self.config.get("max_entries", 100000)
+        self.evict_fraction = self.config.get("evict_fraction", 0.1)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.matrix_file = os.path.join(self.cache_dir, "vectors.f32")
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.cache_dir, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                cache_key TEXT PRIMARY KEY,
+                slot INTEGER UNIQUE,
+                last_accessed REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_accessed ON embeddings (last_accessed)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.commit()
+
+        self.dim = self._meta("dim")
+        self.capacity = self._meta("capacity") or self.max_entries
+        self._matrix = None
+        self._free_slots = []
+        if self.dim:
+            self._open_matrix()
+
+    def _meta(self, name: str) -> Optional[int]:
+        row = self._conn.execute("SELECT value FROM cache_meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _open_matrix(self):
+        """Map the vector file; rows that were never written are zeros on disk (sparse file)."""
+        mode = "r+" if os.path.exists(self.matrix_file) else "w+"
+        self._matrix = np.memmap(self.matrix_file, dtype=np.float32, mode=mode, shape=(self.capacity, self.dim))
+        used = {row[0] for row in self._conn.execute("SELECT slot FROM embeddings")}
+        self._free_slots = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in used]
+
+    def _init_dimension(self, dim: int):
+        self.dim = dim
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO cache_meta (name, value) VALUES (?, ?)",
+            [("dim", dim), ("capacity", self.capacity)]
+        )
+        self._conn.commit()
+        self._open_matrix()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for the keys that are present (copies, safe to keep)."""
+        found = {}
+        with self._lock:
+            if self._matrix is not None and keys:
+                for i in range(0, len(keys), 500):
+                    batch = keys[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self._conn.execute(
+                        f"SELECT cache_key, slot FROM embeddings WHERE cache_key IN ({placeholders})", batch
+                    ).fetchall()
+                    for key, slot in rows:
+                        found[key] = np.array(self._matrix[slot])
+                if found:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_accessed = ? WHERE cache_key = ?",
+                        [(now, key) for key in found]
+                    )
+                    self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """Store vectors by key, evicting least recently used entries when the matrix is full."""
+        if not items:
+            return
+        with self._lock:
+            if self.dim is None:
+                self._init_dimension(len(next(iter(items.values()))))
+            now = time.time()
+            for key, vector in items.items():
+                if len(vector) != self.dim:
+                    logger.warning(f"Skipping embedding cache write: dimension {len(vector)} != {self.dim}")
+                    continue
+                existing = self._conn.execute("SELECT slot FROM embeddings WHERE cache_key = ?", (key,)).fetchone()
+                if existing:
+                    continue
+                if not self._free_slots:
+                    self._evict_locked()
+                slot = self._free_slots.pop()
+                self._matrix[slot] = np.asarray(vector, dtype=np.float32)
+                self._conn.execute(
+                    "INSERT INTO embeddings (cache_key, slot, last_accessed) VALUES (?, ?, ?)", (key, slot, now)
+                )
+            self._matrix.flush()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        count = max(1, int(self.capacity * self.evict_fraction))
+        rows = self._conn.execute(
+            "SELECT cache_key, slot FROM embeddings ORDER BY last_accessed ASC LIMIT ?", (count,)
+        ).fetchall()
+        self._conn.executemany("DELETE FROM embeddings WHERE cache_key = ?", [(key,) for key, _ in rows])
+        self._free_slots.extend(slot for _, slot in rows)
+        self.evictions += len(rows)
+        logger.info(f"Embedding cache evicted {len(rows)} entries")
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "capacity": self.capacity,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._conn.close()
+
+class CachedEmbeddings:
+    """Embeddings wrapper that serves chunk vectors from the EmbeddingCache and embeds only misses."""
+
+    def __init__(self, embeddings, cache: EmbeddingCache, deployment: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.deployment = deployment
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [embedding_cache_key(self.deployment, text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            try:
+                self.cache.put_many(fresh)
+            except Exception as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+            cached.update({key: np.asarray(vector, dtype=np.float32) for key, vector in fresh.items()})
+
+        return [cached[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed search queries in one request without caching them (they rarely repeat)."""
+        return self.embeddings.embed_documents(texts)
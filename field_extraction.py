@@ -1,17 +1,146 @@
-import json
 import re
 import time
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
-from openai import AzureOpenAI
-from langchain_community.llms import Ollama
 
 from validation import FieldExtractionResult, ExtractionQuality, MedicalFieldValidator
-from config import FIELD_EXTRACTION_CONFIG, api_key, azure_endpoint, deployment_name, OLLAMA_LLM_MODEL
+from date_normalization import parse_date
+from config import FIELD_EXTRACTION_CONFIG, LLM_CACHE_CONFIG, deployment_name, OLLAMA_LLM_MODEL
+from llm_cache import LLMResponseCache
+from llm_gateway import get_llm_gateway, is_content_policy_error, CircuitBreaker, CircuitOpenError
+from prompt_compaction import PromptCompactor
+from structured_output import (
+    ORDER_FIELDS_SCHEMA, PACKED_ORDER_FIELDS_SCHEMA, ORDER_FIELDS_FUNCTION, PACKED_ORDER_FIELDS_FUNCTION,
+    order_fields_subset_schema, structured_request_params, parse_structured_response, repair_json
+)
 
 logger = logging.getLogger(__name__)
 
+# Fields merged across chunk results in _extract_with_enhanced_chunking
+CHUNK_MERGE_KEYS = ['orderno', 'orderdate', 'mrn', 'soc', 'cert_period', 'icd_codes', 'patient_name', 'dob', 'address', 'patient_sex']
+
+# Bump a version whenever its prompt template changes so cached responses are not reused
+PROMPT_VERSIONS = {
+    "enhanced_chunked": "v1",
+    "azure_openai": "v1",
+    "ollama": "v1",
+    "packed": "v2",
+    "hybrid": "v1",
+}
+
+# Prompt lines per field, used to ask the LLM only for the fields patterns could not find
+FIELD_PROMPT_DESCRIPTIONS = {
+    "orderno": "- orderno (order number)",
+    "orderdate": "- orderdate (order date in MM/DD/YYYY)",
+    "mrn": "- mrn (medical record number, alphanumeric)",
+    "soc": "- soc (start of care date in MM/DD/YYYY)",
+    "cert_period": '- cert_period: {"soe": "start of episode date in MM/DD/YYYY", "eoe": "end of episode date in MM/DD/YYYY"}',
+    "icd_codes": "- icd_codes (list of ICD-10 codes)",
+    "patient_name": "- patient_name (full patient name)",
+    "dob": "- dob (date of birth in MM/DD/YYYY)",
+    "address": "- address (complete address)",
+    "patient_sex": '- patient_sex ("MALE" or "FEMALE")',
+}
+
+# Pattern extraction: one pass finds every field label, and only the
+# field patterns that can start with that label are tried there (anchored). The first
+# hit per pattern is the same match re.search would return, so per-field priority
+# order is unchanged while the text is scanned once instead of once per pattern.
+_DATE_VALUE = r'(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})'
+
+LABELED_FIELD_PATTERNS = {
+    "orderno_0": re.compile(r'(?:order\s*(?:number|no|#)[\s:]*)([\w\-]+)', re.IGNORECASE),
+    "orderno_2": re.compile(r'(?:reference|ref)[\s:]*([A-Z0-9\-]{6,})', re.IGNORECASE),
+    "mrn_0": re.compile(r'(?:mrn|medical\s*record)[\s:#]*([A-Z]?\d{6,}[A-Z]?)', re.IGNORECASE),
+    "mrn_1": re.compile(r'(?:patient\s*(?:id|number))[\s:#]*([A-Z]?\d{4,}[A-Z]?)', re.IGNORECASE),
+    "orderdate": re.compile(r'(?:order\s*date|date\s*of\s*order)[\s:]*' + _DATE_VALUE, re.IGNORECASE),
+    "soc": re.compile(r'(?:start\s*of\s*care|soc)[\s:]*' + _DATE_VALUE, re.IGNORECASE),
+    "dob": re.compile(r'(?:date\s*of\s*birth|dob|born)[\s:]*' + _DATE_VALUE, re.IGNORECASE),
+    "soe": re.compile(r'(?:start\s*of\s*episode|soe)[\s:]*' + _DATE_VALUE, re.IGNORECASE),
+    "eoe": re.compile(r'(?:end\s*of\s*episode|eoe)[\s:]*' + _DATE_VALUE, re.IGNORECASE),
+    "name_0": re.compile(r'(?:patient\s*name)[\s:]*([A-Za-z\s\-\'\.]+?)(?:\n|$)', re.MULTILINE),
+    "sex": re.compile(r'(?:sex|gender)[\s:]*(\w+)', re.IGNORECASE),
+    "address_0": re.compile(r'(?:address)[\s:]*([^\n]+(?:\n[^\n]+){0,2})', re.IGNORECASE | re.MULTILINE),
+}
+
+# Label keyword -> labeled patterns that can start with it
+_LABEL_PATTERNS = {
+    "order": ("orderno_0", "orderdate"),
+    "reference": ("orderno_2",),
+    "ref": ("orderno_2",),
+    "mrn": ("mrn_0",),
+    "medical": ("mrn_0",),
+    "patient": ("mrn_1", "name_0"),
+    "date": ("orderdate", "dob"),
+    "start": ("soc", "soe"),
+    "soc": ("soc",),
+    "dob": ("dob",),
+    "born": ("dob",),
+    "soe": ("soe",),
+    "end": ("eoe",),
+    "eoe": ("eoe",),
+    "sex": ("sex",),
+    "gender": ("sex",),
+    "address": ("address_0",),
+}
+_LABEL_ALTERNATION = "|".join(sorted(_LABEL_PATTERNS, key=len, reverse=True))
+# Matching lowercase keywords against text.lower() is ~8x faster than an IGNORECASE alternation
+_LABEL_RE = re.compile(_LABEL_ALTERNATION)
+_LABEL_RE_ANYCASE = re.compile(_LABEL_ALTERNATION, re.IGNORECASE)
+
+# Unlabeled fallbacks, only searched when the labeled patterns ahead of them found nothing
+FALLBACK_FIELD_PATTERNS = {
+    "orderno_1": re.compile(r'(?:^|\n)([A-Z]{2,}\-?\d{4,})', re.IGNORECASE | re.MULTILINE),
+    "mrn_2": re.compile(r'(?:^|\n)(?:MRN:?\s*)([A-Z]?\d{6,}[A-Z]?)', re.IGNORECASE | re.MULTILINE),
+    "name_1": re.compile(r'(?:^|\n)([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})(?:\s+(?:DOB|MRN))', re.MULTILINE),
+    "address_1": re.compile(
+        r'(\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Lane|Ln|Boulevard|Blvd)[^\n]*)',
+        re.IGNORECASE | re.MULTILINE
+    ),
+}
+
+# Every match of this shape already satisfies MedicalFieldValidator's ICD-10 format check
+ICD_CODE_RE = re.compile(r'\b([A-TV-Z]\d{2}\.?\d{0,2})\b')
+MAX_PATTERN_ICD_CODES = 6
+
+@lru_cache(maxsize=4096)
+def _normalize_labeled_date(date_str: str) -> str:
+    """MM/DD/YYYY form of a date string (memoized; the same dates repeat across documents)."""
+    is_valid, _, parsed_date = MedicalFieldValidator.validate_date(date_str)
+    if is_valid and parsed_date:
+        return parsed_date.strftime("%m/%d/%Y")
+    return date_str
+
+def scan_labeled_fields(text: str) -> Dict[str, str]:
+    """First match of every labeled field pattern, found in a single pass over text."""
+    found = {}
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        labels = _LABEL_RE.finditer(lowered)
+    else:
+        # Some non-ASCII characters change length when lowercased; positions would drift
+        labels = _LABEL_RE_ANYCASE.finditer(text)
+    for label in labels:
+        position = label.start()
+        for name in _LABEL_PATTERNS[label.group().lower()]:
+            if name not in found:
+                match = LABELED_FIELD_PATTERNS[name].match(text, position)
+                if match:
+                    found[name] = match.group(1)
+        if len(found) == len(LABELED_FIELD_PATTERNS):
+            break
+    return found
+
+def fallback_field_match(text: str, name: str) -> Optional[str]:
+    """Value of an unlabeled fallback pattern's first match, or None."""
+    match = FALLBACK_FIELD_PATTERNS[name].search(text)
+    return match.group(1) if match else None
+
 class AccuracyFocusedFieldExtractor:
     """Field extractor optimized for maximum accuracy using multiple validation approaches."""
     
@@ -19,15 +148,102 @@ class AccuracyFocusedFieldExtractor:
         self.config = config or FIELD_EXTRACTION_CONFIG
         self.validator = MedicalFieldValidator()
         
+        # Shared gateway holds the pooled Azure OpenAI / Ollama clients
+        self.gateway = get_llm_gateway()
+        
         # Initialize Ollama client for fallback
         self.ollama_client = None
+        self.ollama_params = {"format": "json"} if self.config.get("structured_output") else {}
         try:
-            self.ollama_client = Ollama(model=OLLAMA_LLM_MODEL)
+            self.ollama_client = self.gateway.ollama_llm(OLLAMA_LLM_MODEL, **self.ollama_params)
             logger.info(f"Ollama client initialized with model: {OLLAMA_LLM_MODEL}")
         except Exception as e:
             logger.warning(f"Failed to initialize Ollama client: {e}")
+        
+        # Schema-enforced responses (function calling / JSON mode) instead of parse-and-retry
+        self.structured_output = self.config.get("structured_output")
+        self.order_request_params = structured_request_params(
+            self.structured_output, ORDER_FIELDS_FUNCTION, ORDER_FIELDS_SCHEMA)
+        self.packed_request_params = structured_request_params(
+            self.structured_output, PACKED_ORDER_FIELDS_FUNCTION, PACKED_ORDER_FIELDS_SCHEMA)
+        
+        # Keyword-window prompt compaction (only the text around field labels is sent)
+        self.compactor = None
+        if self.config.get("prompt_compaction", False):
+            self.compactor = PromptCompactor(token_budget=self.config.get("prompt_token_budget", 1500))
+        self.compaction_stats = {"documents": 0, "original_tokens": 0, "compacted_tokens": 0, "seconds": 0.0}
+        
+        # Circuit breaker: after repeated Azure failures (outage, throttling, content-policy streaks)
+        # documents go straight to the pattern and Ollama paths until a probe succeeds
+        self.azure_breaker = CircuitBreaker(
+            "Azure OpenAI",
+            failure_threshold=self.config.get("azure_breaker_failures", 5),
+            cooldown=self.config.get("azure_breaker_cooldown", 60.0)
+        )
+        
+        # Hedging: fire Ollama in parallel when Azure is slower than its recent latency percentile
+        self.hedge_executor = None
+        self.azure_latencies = deque(maxlen=self.config.get("hedge_latency_window", 200))
+        self.hedge_stats = {"requests": 0, "hedged": 0, "azure_wins": 0, "ollama_wins": 0, "failed": 0}
+        self._hedge_lock = threading.Lock()
+        if self.config.get("hedging_enabled", False) and self.ollama_client:
+            self.hedge_executor = ThreadPoolExecutor(max_workers=self.config.get("hedge_workers", 4))
+        
+        # Persistent response cache so reprocessing does not pay for the same extraction twice
+        self.response_cache = None
+        if LLM_CACHE_CONFIG.get("enabled", False):
+            try:
+                self.response_cache = LLMResponseCache(LLM_CACHE_CONFIG)
+            except Exception as e:
+                logger.warning(f"Failed to open LLM response cache: {e}")
     
-
+    def _prompt_version(self, method: str, variant: str = "") -> str:
+        """Prompt template version, including the compaction budget when compaction is on."""
+        version = PROMPT_VERSIONS[method] + (f"-{variant}" if variant else "")
+        if self.compactor:
+            version += f"-compact{self.compactor.token_budget}"
+        return version
+    
+    def _compact_for_prompt(self, text: str, doc_id: str, max_chars: Optional[int] = None) -> str:
+        """Document text to embed in a prompt: compacted windows, or the raw text cut to max_chars."""
+        if not self.compactor:
+            return text[:max_chars] if max_chars else text
+        
+        result = self.compactor.compact(text)
+        self.compaction_stats["documents"] += 1
+        self.compaction_stats["original_tokens"] += result.original_tokens
+        self.compaction_stats["compacted_tokens"] += result.compacted_tokens
+        self.compaction_stats["seconds"] += result.elapsed
+        logger.info(f"Prompt compaction for {doc_id}: {result.original_tokens} -> {result.compacted_tokens} tokens "
+                    f"({result.savings_ratio*100:.0f}% saved, {result.windows} windows"
+                    f"{', no anchors' if result.fallback else ''}) in {result.elapsed*1000:.1f}ms")
+        return result.text
+    
+    def _azure_completion(self, **kwargs):
+        """Azure chat completion through the gateway, guarded by the circuit breaker."""
+        return self.azure_breaker.call(lambda: self.gateway.chat_completion(**kwargs))
+    
+    def _cache_lookup(self, model: str, method: str, text: str, doc_id: str, variant: str = "") -> Optional[Dict[str, Any]]:
+        """Return a cached extraction for this model/prompt/text, if any."""
+        if not self.response_cache:
+            return None
+        try:
+            cached = self.response_cache.get(model, self._prompt_version(method, variant), text)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed for {doc_id}: {e}")
+            return None
+        if cached is not None:
+            logger.info(f"LLM cache hit ({method}) for {doc_id}")
+        return cached
+    
+    def _cache_store(self, model: str, method: str, text: str, result: Dict[str, Any], variant: str = ""):
+        """Persist a successful extraction."""
+        if not self.response_cache or not result:
+            return
+        try:
+            self.response_cache.put(model, self._prompt_version(method, variant), text, result)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
     
     def _extract_with_ollama_fallback(self, text: str, doc_id: str) -> Optional[Dict[str, Any]]:
         """Extract fields using Ollama as fallback for sensitive content."""
@@ -35,7 +251,13 @@ class AccuracyFocusedFieldExtractor:
             logger.error("Ollama client not available for fallback extraction")
             return None
         
+        cached = self._cache_lookup(OLLAMA_LLM_MODEL, "ollama", text, doc_id)
+        if cached is not None:
+            return cached
+        
         try:
+            prompt_text = self._compact_for_prompt(text, doc_id, max_chars=6000)
+            
             # Create prompt for Ollama
             ollama_prompt = f"""
 You are a medical document expert. Extract ONLY valid JSON with these keys from the document:
@@ -56,43 +278,19 @@ Extract these fields:
 - patient_sex ("MALE" or "FEMALE")
 
 RETURN ONLY JSON. Document text:
-{text[:6000]}
+{prompt_text}
 """
             
-            # Call Ollama with retry logic
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    response = self.ollama_client.invoke(ollama_prompt)
-                    
-                    if response:
-                        # Extract JSON from response
-                        json_match = re.search(r'\{[\s\S]*\}', response)
-                        if json_match:
-                            json_str = json_match.group()
-                            try:
-                                parsed_result = json.loads(json_str)
-                                
-                                # Validate the structure
-                                if self._validate_extraction_structure(parsed_result):
-                                    logger.info(f"Ollama fallback extraction successful for {doc_id} on attempt {attempt + 1}")
-                                    return parsed_result
-                                else:
-                                    logger.warning(f"Ollama extraction structure invalid for {doc_id} on attempt {attempt + 1}")
-                            
-                            except json.JSONDecodeError as e:
-                                logger.warning(f"Ollama JSON parsing failed for {doc_id} on attempt {attempt + 1}: {e}")
-                    
-                    # Wait before retry
-                    if attempt < max_retries - 1:
-                        time.sleep(1 * (attempt + 1))
-                        
-                except Exception as e:
-                    logger.error(f"Ollama API error for {doc_id} on attempt {attempt + 1}: {e}")
-                    if attempt < max_retries - 1:
-                        time.sleep(2 * (attempt + 1))
+            # Transport retries happen in the gateway; malformed JSON is repaired locally
+            response = self.gateway.ollama_invoke(ollama_prompt, OLLAMA_LLM_MODEL, **self.ollama_params)
+            parsed_result = repair_json(response)
+            
+            if isinstance(parsed_result, dict) and self._validate_extraction_structure(parsed_result):
+                logger.info(f"Ollama fallback extraction successful for {doc_id}")
+                self._cache_store(OLLAMA_LLM_MODEL, "ollama", text, parsed_result)
+                return parsed_result
             
-            logger.error(f"Ollama fallback extraction failed after {max_retries} attempts for {doc_id}")
+            logger.error(f"Ollama fallback extraction returned no usable JSON for {doc_id}")
             return None
             
         except Exception as e:
@@ -101,6 +299,35 @@ RETURN ONLY JSON. Document text:
     
     def extract_fields_multi_approach(self, text: str, doc_id: str) -> FieldExtractionResult:
         """Smart field extraction with optimized approach selection."""
+        start_time = time.time()
+        result = self._extract_fields_multi_approach(text, doc_id)
+        logger.info(f"Field extraction for {doc_id} took {time.time() - start_time:.2f}s (method: {result.method})")
+        return result
+    
+    def _extract_fields_multi_approach(self, text: str, doc_id: str) -> FieldExtractionResult:
+        # Pattern extraction is cheap enough to run first on every document
+        pattern_result = self._extract_with_patterns(text, doc_id)
+        if pattern_result and not self._missing_field_keys(pattern_result):
+            logger.info(f"Pattern extraction found every field for {doc_id}, skipping LLM extraction")
+            return FieldExtractionResult(
+                fields=pattern_result,
+                confidence=0.75,
+                method="pattern_based",
+                quality=ExtractionQuality.GOOD
+            )
+        
+        # Keep what the patterns found and ask the LLM only for the missing fields; without a
+        # critical field the pattern result is not worth anchoring on, so use the full cascade
+        if self._has_critical_field(pattern_result) and self.config.get("hybrid_extraction", False):
+            logger.info(f"Pattern extraction partial, asking Azure OpenAI for missing fields of {doc_id}")
+            hybrid_result = self._extract_missing_fields_with_llm(text, doc_id, pattern_result)
+            if hybrid_result:
+                return FieldExtractionResult(
+                    fields=hybrid_result,
+                    confidence=0.80,
+                    method="pattern_llm_hybrid",
+                    quality=ExtractionQuality.GOOD
+                )
         
         # Quick text analysis to determine best approach
         text_characteristics = self._analyze_text_characteristics(text)
@@ -120,7 +347,6 @@ RETURN ONLY JSON. Document text:
         
         # Fallback to pattern-based extraction for speed
         logger.info(f"Using fast pattern-based extraction for {doc_id}")
-        pattern_result = self._extract_with_patterns(text, doc_id)
         if pattern_result and self._has_sufficient_fields(pattern_result):
             return FieldExtractionResult(
                 fields=pattern_result,
@@ -129,23 +355,27 @@ RETURN ONLY JSON. Document text:
                 quality=ExtractionQuality.GOOD
             )
         
-        # If pattern extraction didn't get enough fields, try Azure OpenAI
+        # If pattern extraction didn't get enough fields, try Azure OpenAI (hedged with Ollama when slow)
         logger.info(f"Pattern extraction insufficient, trying Azure OpenAI for {doc_id}")
-        azure_result = self._extract_with_azure_openai_enhanced(text, doc_id)
-        if azure_result:
+        if self.hedge_executor:
+            llm_method, llm_result = self._extract_with_hedging(text, doc_id)
+        else:
+            llm_method, llm_result = "azure_openai", self._extract_with_azure_openai_enhanced(text, doc_id)
+            if not llm_result:
+                # If Azure OpenAI fails, try Ollama as final fallback
+                logger.info(f"Azure OpenAI failed, trying Ollama fallback for {doc_id}")
+                llm_method, llm_result = "ollama_fallback", self._extract_with_ollama_fallback(text, doc_id)
+        
+        if llm_result and llm_method == "azure_openai":
             return FieldExtractionResult(
-                fields=azure_result,
+                fields=llm_result,
                 confidence=0.80,
                 method="azure_openai",
                 quality=ExtractionQuality.GOOD
             )
-        
-        # If Azure OpenAI fails, try Ollama as final fallback
-        logger.info(f"Azure OpenAI failed, trying Ollama fallback for {doc_id}")
-        ollama_result = self._extract_with_ollama_fallback(text, doc_id)
-        if ollama_result:
+        if llm_result:
             return FieldExtractionResult(
-                fields=ollama_result,
+                fields=llm_result,
                 confidence=0.65,
                 method="ollama_fallback",
                 quality=ExtractionQuality.FAIR
@@ -216,6 +446,10 @@ RETURN ONLY JSON. Document text:
     def _extract_with_enhanced_chunking(self, text: str, doc_id: str) -> Optional[Dict[str, Any]]:
         """Enhanced extraction using chunking for better date accuracy."""
         
+        cached = self._cache_lookup(deployment_name, "enhanced_chunked", text, doc_id)
+        if cached is not None:
+            return cached
+        
         def extract_one_chunk_enhanced(chunk):
             # Enhanced prompt with specific focus on date accuracy
             prompt = f"""
@@ -248,60 +482,56 @@ RETURN ONLY JSON. Document text:
 {chunk}
 """
             
-            openai_client = AzureOpenAI(
-                api_key=api_key,
-                azure_endpoint=azure_endpoint,
-                api_version="2024-02-15-preview"
-            )
-            
             max_retries = self.config.get("max_retries", 3)  # Reduced from 5 to 3
             
-            for retry in range(max_retries):
-                try:
-                    response = openai_client.chat.completions.create(
-                        model=deployment_name,
-                        messages=[
-                            {"role": "system", "content": "You are a medical records expert specializing in accurate date extraction from healthcare documents."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        temperature=0.1,  # Lower temperature for consistency
-                        max_tokens=600  # Reduced from 800 to 600
-                    )
-                    content = response.choices[0].message.content.strip()
-                    
-                    try:
-                        json_str = re.search(r'\{[\s\S]+\}', content).group()
-                        result = json.loads(json_str)
-                        
-                        # Post-process dates for accuracy
-                        result = self._post_process_dates_enhanced(result)
-                        
-                        logger.info(f"[Enhanced Chunked] JSON extracted on try {retry+1}")
-                        return result
-                    except Exception:
-                        if retry < max_retries - 1:  # Only log warning if not last attempt
-                            logger.warning(f"[Enhanced Chunked] JSON parsing failed (try {retry+1})")
-                        return None
-                except Exception as e:
-                    logger.error(f"[ERROR] Enhanced Chunked OpenAI error: {e}")
-                    if retry < max_retries - 1:  # Only sleep if not last attempt
-                        time.sleep(1 * (retry + 1))  # Reduced sleep time
-            return None
+            try:
+                response = self._azure_completion(
+                    messages=[
+                        {"role": "system", "content": "You are a medical records expert specializing in accurate date extraction from healthcare documents."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    model=deployment_name,
+                    max_retries=max_retries,
+                    temperature=0.1,  # Lower temperature for consistency
+                    max_tokens=600,  # Reduced from 800 to 600
+                    **self.order_request_params
+                )
+            except CircuitOpenError:
+                logger.info(f"[Enhanced Chunked] Azure OpenAI circuit open, skipping chunk for {doc_id}")
+                return None
+            except Exception as e:
+                logger.error(f"[ERROR] Enhanced Chunked OpenAI error: {e}")
+                return None
+            
+            result = parse_structured_response(response)
+            if not isinstance(result, dict):
+                logger.warning("[Enhanced Chunked] No usable JSON in response")
+                return None
+            
+            # Post-process dates for accuracy
+            result = self._post_process_dates_enhanced(result)
+            
+            logger.info("[Enhanced Chunked] JSON extracted")
+            return result
+        
+        # Compacted text usually fits in a single request
+        prompt_text = self._compact_for_prompt(text, doc_id)
         
         # Smart chunking - only chunk if text is very long
-        if len(text) < 4000:
+        if len(prompt_text) < 4000:
             # For shorter texts, process in one go
-            result = extract_one_chunk_enhanced(text)
+            result = extract_one_chunk_enhanced(prompt_text)
+            self._cache_store(deployment_name, "enhanced_chunked", text, result)
             return result if result else None
         else:
             # For longer texts, use smart chunking
             chunk_size = 3000  # Larger chunks to reduce API calls
             chunks = []
-            if len(text) < chunk_size:
-                chunks = [text]
+            if len(prompt_text) < chunk_size:
+                chunks = [prompt_text]
             else:
                 # Split by paragraphs to maintain context
-                paragraphs = text.split('\n\n')
+                paragraphs = prompt_text.split('\n\n')
                 current_chunk = ""
                 for para in paragraphs:
                     if len(current_chunk) + len(para) > chunk_size:
@@ -316,32 +546,417 @@ RETURN ONLY JSON. Document text:
             # Limit to 3 chunks maximum for speed
             chunks = chunks[:3]
             
-            results = []
-            for chunk in chunks:
-                result = extract_one_chunk_enhanced(chunk)
-                if result:
-                    results.append(result)
+            # Issue the chunk requests concurrently; merge stays in chunk order
+            chunk_results = [None] * len(chunks)
+            done_flags = [False] * len(chunks)
+            executor = ThreadPoolExecutor(max_workers=min(len(chunks), self.config.get("chunk_concurrency", 3)))
+            try:
+                futures = {executor.submit(extract_one_chunk_enhanced, chunk): idx for idx, chunk in enumerate(chunks)}
+                pending = set(futures)
+                while pending:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        idx = futures[future]
+                        try:
+                            chunk_results[idx] = future.result()
+                        except Exception as e:
+                            logger.error(f"[Enhanced Chunked] Chunk {idx + 1} failed for {doc_id}: {e}")
+                        done_flags[idx] = True
+                    if pending and self._chunk_merge_resolved(chunk_results, done_flags):
+                        logger.info(f"[Enhanced Chunked] All fields filled for {doc_id}, "
+                                    f"cancelling {len(pending)} remaining chunk(s)")
+                        break
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+            
+            results = [r for r in chunk_results if r]
+            if not results:
+                return None
             
-            # Merge results from chunks
+            # Merge results from chunks (first non-empty value in chunk order wins)
             merged = {}
-            for key in ['orderno', 'orderdate', 'mrn', 'soc', 'cert_period', 'icd_codes','patient_name', 'dob', 'address', 'patient_sex']:
+            for key in CHUNK_MERGE_KEYS:
                 found = False
                 for r in results:
-                    if r is None:
-                        continue
                     val = r.get(key)
-                    if val and (not isinstance(val, list) or len(val) > 0):
+                    if self._is_filled(val):
                         merged[key] = val
                         found = True
                         break
                 if not found:
                     merged[key] = None if key != 'icd_codes' else []
             
-            return merged if results else None
+            self._cache_store(deployment_name, "enhanced_chunked", text, merged)
+            return merged
+    
+    @staticmethod
+    def _is_filled(val) -> bool:
+        """A merged value counts once it is non-empty (empty lists do not count)."""
+        return bool(val) and (not isinstance(val, list) or len(val) > 0)
+    
+    def _chunk_merge_resolved(self, chunk_results: List, done_flags: List[bool]) -> bool:
+        """True once every merge key is decided: some finished chunk has it and all earlier chunks finished."""
+        for key in CHUNK_MERGE_KEYS:
+            resolved = False
+            for result, done in zip(chunk_results, done_flags):
+                if not done:
+                    break
+                if result and self._is_filled(result.get(key)):
+                    resolved = True
+                    break
+            if not resolved:
+                return False
+        return True
+    
+    def extract_fields_packed(self, documents: List[Tuple[str, str]]) -> Dict[str, FieldExtractionResult]:
+        """Extract short documents several at a time, one Azure request per group.
+        
+        documents is a list of (doc_id, text). Only short documents that would be
+        routed to LLM extraction are packed; the rest are left out of the returned
+        mapping for the caller's usual single-document path. Packed documents whose
+        result is missing or fails validation fall back to single-document calls.
+        """
+        if not self.config.get("packing_enabled", False):
+            return {}
+        
+        results = {}
+        pending = []
+        for doc_id, text in documents:
+            if not self._is_packable(text):
+                continue
+            cached = self._cache_lookup(deployment_name, "packed", text, doc_id)
+            if cached is not None:
+                results[doc_id] = self._packed_result(cached)
+            else:
+                pending.append((doc_id, text))
+        
+        max_docs = max(1, self.config.get("packing_max_docs", 5))
+        fallback_ids = []
+        for start in range(0, len(pending), max_docs):
+            group = pending[start:start + max_docs]
+            if len(group) == 1:
+                fallback_ids.append(group[0][0])
+                continue
+            
+            group_start = time.time()
+            packed = self._extract_packed_group(group)
+            logger.info(f"[Packed] {len(group)} documents in one request, "
+                        f"{len(packed)} valid, took {time.time() - group_start:.2f}s")
+            for doc_id, text in group:
+                if doc_id in packed:
+                    self._cache_store(deployment_name, "packed", text, packed[doc_id])
+                    results[doc_id] = self._packed_result(packed[doc_id])
+                else:
+                    fallback_ids.append(doc_id)
+        
+        texts = dict(pending)
+        for doc_id in fallback_ids:
+            logger.info(f"[Packed] Falling back to single-document extraction for {doc_id}")
+            results[doc_id] = self.extract_fields_multi_approach(texts[doc_id], doc_id)
+        
+        return results
+    
+    def _is_packable(self, text: str) -> bool:
+        """Short document that would otherwise get its own enhanced LLM request."""
+        if not text or len(text) >= self.config.get("packing_max_chars", 1500):
+            return False
+        characteristics = self._analyze_text_characteristics(text)
+        return characteristics["has_structured_dates"] and characteristics["has_medical_terms"]
+    
+    @staticmethod
+    def _packed_result(fields: Dict[str, Any]) -> FieldExtractionResult:
+        return FieldExtractionResult(
+            fields=fields,
+            confidence=0.85,
+            method="enhanced_packed",
+            quality=ExtractionQuality.EXCELLENT
+        )
+    
+    def _extract_packed_group(self, group: List[Tuple[str, str]]) -> Dict[str, Dict[str, Any]]:
+        """One request for several documents; returns the validated fields per doc ID."""
+        documents_block = "\n\n".join(
+            f"=== DOCUMENT {doc_id} ===\n{self._compact_for_prompt(text, doc_id)}"
+            for doc_id, text in group
+        )
+        
+        prompt = f"""
+You are a medical document expert. Each document below starts with a "=== DOCUMENT <id> ===" line.
+Return ONLY a JSON object {{"documents": [...]}} with one entry per document, in the same order, paying SPECIAL ATTENTION to date accuracy.
+
+CRITICAL DATE EXTRACTION RULES:
+- SOC (Start of Care): Look for "Start of Care", "SOC", "Care Start Date", "Service Start"
+- SOE (Start of Episode): Look for "Start of Episode", "SOE", "Episode Start", "From Date"  
+- EOE (End of Episode): Look for "End of Episode", "EOE", "Episode End", "To Date", "Through Date"
+- All dates MUST be in MM/DD/YYYY format
+- If you see dates like "12/15/2024 - 02/12/2025", the first is SOE, second is EOE
+- Never copy a value from one document into another
+
+Each object has these keys:
+- doc_id (the document id exactly as given)
+- orderno (order number)
+- orderdate (order date in MM/DD/YYYY)
+- mrn (medical record number, alphanumeric)
+- soc (start of care date in MM/DD/YYYY)
+- cert_period: {{
+    "soe": "start of episode date in MM/DD/YYYY", 
+    "eoe": "end of episode date in MM/DD/YYYY"
+}}
+- icd_codes (list of ICD-10 codes)
+- patient_name (full patient name)
+- dob (date of birth in MM/DD/YYYY)
+- address (complete address)
+- patient_sex ("MALE" or "FEMALE")
+
+Use null for any field not present in that document. RETURN ONLY JSON. Documents:
+{documents_block}
+"""
+        
+        try:
+            response = self._azure_completion(
+                messages=[
+                    {"role": "system", "content": "You are a medical records expert specializing in accurate date extraction from healthcare documents."},
+                    {"role": "user", "content": prompt}
+                ],
+                model=deployment_name,
+                max_retries=self.config.get("max_retries", 3),
+                temperature=0.1,
+                max_tokens=self.config.get("packing_tokens_per_doc", 400) * len(group),
+                **self.packed_request_params
+            )
+        except CircuitOpenError:
+            logger.info("[Packed] Azure OpenAI circuit open, skipping packed request")
+            return {}
+        except Exception as e:
+            if is_content_policy_error(e):
+                logger.warning(f"[Packed] Azure OpenAI content policy restriction for packed request: {e}")
+            else:
+                logger.error(f"[Packed] Azure OpenAI error for packed request: {e}")
+            return {}
+        
+        items = parse_structured_response(response)
+        if isinstance(items, dict):
+            items = items.get("documents")
+        if not isinstance(items, list):
+            logger.warning("[Packed] No usable JSON documents array in response")
+            return {}
+        
+        expected_ids = {doc_id for doc_id, _ in group}
+        packed = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            doc_id = str(item.pop("doc_id", "")).strip()
+            if doc_id not in expected_ids or doc_id in packed:
+                continue
+            if not self._validate_packed_item(item):
+                logger.warning(f"[Packed] Result for {doc_id} failed validation")
+                continue
+            packed[doc_id] = self._post_process_dates_enhanced(item)
+        return packed
+    
+    def _validate_packed_item(self, item: Dict[str, Any]) -> bool:
+        """Packed results need the full structure, a critical field, and a valid MRN when one is given."""
+        if not self._validate_extraction_structure(item) or not isinstance(item.get("cert_period"), dict):
+            return False
+        if not self._has_critical_field(item):
+            return False
+        if item.get("mrn"):
+            is_valid, _ = self.validator.validate_mrn(str(item["mrn"]))
+            if not is_valid:
+                return False
+        return True
+    
+    def _has_critical_field(self, fields: Optional[Dict[str, Any]]) -> bool:
+        """True when at least one of MRN, SOC or patient name is filled."""
+        return bool(fields) and any(self._is_filled(fields.get(key)) for key in ('mrn', 'soc', 'patient_name'))
+    
+    def _validated_llm_value(self, key: str, value):
+        """LLM-supplied value for a missing field, or None when it fails the field's validator."""
+        if not self._is_filled(value):
+            return None
+        if key == "mrn":
+            is_valid, _ = self.validator.validate_mrn(str(value))
+            return self._clean_mrn(value) if is_valid else None
+        if key in ("orderdate", "soc", "dob", "soe", "eoe"):
+            is_valid, _, _ = self.validator.validate_date(str(value), key)
+            return value if is_valid else None
+        if key == "patient_name":
+            is_valid, _ = self.validator.validate_patient_name(str(value))
+            return value if is_valid else None
+        return value
+    
+    def _missing_field_keys(self, fields: Dict[str, Any]) -> List[str]:
+        """Field keys still empty after pattern extraction (cert_period counts if either date is missing)."""
+        missing = []
+        for key in ORDER_FIELDS_SCHEMA["required"]:
+            value = fields.get(key)
+            if key == "cert_period":
+                value = value if isinstance(value, dict) else {}
+                if not (value.get("soe") and value.get("eoe")):
+                    missing.append(key)
+            elif not self._is_filled(value):
+                missing.append(key)
+        return missing
+    
+    def _extract_missing_fields_with_llm(self, text: str, doc_id: str, pattern_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Ask Azure OpenAI only for the fields the patterns missed and merge them into the pattern result."""
+        missing = self._missing_field_keys(pattern_result)
+        if not missing:
+            return pattern_result
+        
+        variant = ",".join(missing)
+        llm_fields = self._cache_lookup(deployment_name, "hybrid", text, doc_id, variant)
+        if llm_fields is None:
+            prompt_text = self._compact_for_prompt(text, doc_id, max_chars=8000)
+            field_lines = "\n".join(FIELD_PROMPT_DESCRIPTIONS[key] for key in missing)
+            prompt = f"""
+You are a medical document expert. Extract ONLY these fields as valid JSON, using null for any field that is not in the document:
+{field_lines}
+
+All dates MUST be in MM/DD/YYYY format. SOE/EOE are the first/second dates of the certification (episode) period.
+
+RETURN ONLY JSON. Document text:
+{prompt_text}
+"""
+            try:
+                response = self._azure_completion(
+                    messages=[
+                        {"role": "system", "content": "You are a medical records expert. Extract information accurately and return only valid JSON. If unsure about any field, use null."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    model=deployment_name,
+                    max_retries=self.config.get("max_retries", 3),
+                    temperature=0.1,
+                    max_tokens=min(800, 80 + self.config.get("hybrid_tokens_per_field", 60) * len(missing)),
+                    **structured_request_params(self.structured_output, ORDER_FIELDS_FUNCTION,
+                                                order_fields_subset_schema(missing))
+                )
+            except CircuitOpenError:
+                logger.info(f"Azure OpenAI circuit open, skipping missing-field request for {doc_id}")
+                return None
+            except Exception as e:
+                if is_content_policy_error(e):
+                    logger.warning(f"Azure OpenAI content policy restriction detected for {doc_id}: {e}")
+                else:
+                    logger.error(f"Azure OpenAI API error (missing fields) for {doc_id}: {e}")
+                return None
+            
+            llm_fields = parse_structured_response(response)
+            if not isinstance(llm_fields, dict):
+                logger.warning(f"Azure OpenAI returned no usable JSON for missing fields of {doc_id}")
+                return None
+            llm_fields = {key: llm_fields.get(key) for key in missing}
+            self._cache_store(deployment_name, "hybrid", text, llm_fields, variant)
+        
+        merged = dict(pattern_result)
+        for key in missing:
+            value = llm_fields.get(key)
+            if key == "cert_period":
+                found = dict(merged.get("cert_period") or {})
+                value = value if isinstance(value, dict) else {}
+                for sub_key in ("soe", "eoe"):
+                    if not found.get(sub_key):
+                        found[sub_key] = self._validated_llm_value(sub_key, value.get(sub_key))
+                merged["cert_period"] = found
+            else:
+                value = self._validated_llm_value(key, value)
+                if value is not None:
+                    merged[key] = value
+        
+        filled = len(missing) - len(self._missing_field_keys(merged))
+        merged = self._post_process_dates_enhanced(merged)
+        logger.info(f"Hybrid extraction for {doc_id}: LLM filled {filled}/{len(missing)} missing fields")
+        if not filled:
+            # Nothing gained over the pattern result; let the rest of the cascade try
+            return None
+        return merged
+    
+    def _record_azure_latency(self, seconds: float):
+        with self._hedge_lock:
+            self.azure_latencies.append(seconds)
+    
+    def _hedge_delay(self) -> float:
+        """Seconds to wait for Azure before hedging: the configured percentile of recent latencies."""
+        with self._hedge_lock:
+            samples = sorted(self.azure_latencies)
+        if len(samples) < self.config.get("hedge_min_samples", 20):
+            return self.config.get("hedge_default_delay", 10.0)
+        percentile = self.config.get("hedge_latency_percentile", 90)
+        idx = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return max(self.config.get("hedge_min_delay", 2.0), samples[idx])
+    
+    def _extract_with_hedging(self, text: str, doc_id: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Azure OpenAI with an Ollama request fired in parallel once Azure exceeds the hedge delay.
+        
+        The first valid result wins. The losing call cannot be interrupted mid-request; it
+        finishes in the background and its result is discarded (pending starts are cancelled).
+        Returns (method, fields) with fields None when both providers fail.
+        """
+        methods = {}
+        azure_future = self.hedge_executor.submit(self._extract_with_azure_openai_enhanced, text, doc_id)
+        methods[azure_future] = "azure_openai"
+        pending = {azure_future}
+        hedge_delay = self._hedge_delay()
+        hedged = False
+        ollama_started = False
+        
+        while pending:
+            done, pending = wait(pending, timeout=None if ollama_started else hedge_delay,
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                logger.info(f"Azure OpenAI slower than {hedge_delay:.1f}s for {doc_id}, hedging with Ollama")
+                hedged = ollama_started = True
+                ollama_future = self.hedge_executor.submit(self._extract_with_ollama_fallback, text, doc_id)
+                methods[ollama_future] = "ollama_fallback"
+                pending.add(ollama_future)
+                continue
+            
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"{methods[future]} extraction raised for {doc_id}: {e}")
+                    result = None
+                if result:
+                    for other in pending:
+                        other.cancel()
+                    self._record_hedge_outcome(hedged, methods[future])
+                    if hedged:
+                        logger.info(f"Hedged request for {doc_id} won by {methods[future]}")
+                    return methods[future], result
+            
+            if not pending and not ollama_started:
+                # Azure failed before the hedge fired: plain sequential fallback
+                logger.info(f"Azure OpenAI failed, trying Ollama fallback for {doc_id}")
+                ollama_started = True
+                ollama_future = self.hedge_executor.submit(self._extract_with_ollama_fallback, text, doc_id)
+                methods[ollama_future] = "ollama_fallback"
+                pending.add(ollama_future)
+        
+        self._record_hedge_outcome(hedged, None)
+        return "failed", None
+    
+    def _record_hedge_outcome(self, hedged: bool, winner: Optional[str]):
+        with self._hedge_lock:
+            self.hedge_stats["requests"] += 1
+            if hedged:
+                self.hedge_stats["hedged"] += 1
+                if winner == "azure_openai":
+                    self.hedge_stats["azure_wins"] += 1
+                elif winner == "ollama_fallback":
+                    self.hedge_stats["ollama_wins"] += 1
+            if winner is None:
+                self.hedge_stats["failed"] += 1
     
     def _extract_with_azure_openai_enhanced(self, text: str, doc_id: str) -> Optional[Dict[str, Any]]:
         """Enhanced Azure OpenAI extraction with better prompting and error handling."""
         
+        cached = self._cache_lookup(deployment_name, "azure_openai", text, doc_id)
+        if cached is not None:
+            return cached
+        
+        prompt_text = self._compact_for_prompt(text, doc_id, max_chars=8000)
+        
         # Enhanced prompt with specific focus on date accuracy
         enhanced_prompt = f"""
 You are a medical document expert. Extract ONLY valid JSON with these keys, paying SPECIAL ATTENTION to date accuracy:
@@ -370,72 +985,55 @@ Extract these fields:
 - patient_sex ("MALE" or "FEMALE")
 
 RETURN ONLY JSON. Document text:
-{text[:8000]}
+{prompt_text}
 """
 
-        openai_client = AzureOpenAI(
-            api_key=api_key,
-            azure_endpoint=azure_endpoint,
-            api_version="2024-02-15-preview"
-        )
+        # Transport retries (rate limits, timeouts) happen inside the gateway; the
+        # schema-enforced response is parsed and repaired locally, never re-asked.
+        call_start = time.time()
+        try:
+            response = self._azure_completion(
+                messages=[
+                    {
+                        "role": "system", 
+                        "content": "You are a medical records expert. Extract information accurately and return only valid JSON. If unsure about any field, use null."
+                    },
+                    {
+                        "role": "user", 
+                        "content": enhanced_prompt
+                    }
+                ],
+                model=deployment_name,
+                max_retries=self.config.get("max_retries", 4),
+                temperature=0.1,  # Low temperature for consistency
+                max_tokens=800,  # Reduced from 1000 to 800
+                top_p=0.9,
+                **self.order_request_params
+            )
+        except CircuitOpenError:
+            logger.info(f"Azure OpenAI circuit open, skipping extraction for {doc_id}")
+            return None
+        except Exception as e:
+            # Check for content policy violations or restrictions
+            if is_content_policy_error(e):
+                logger.warning(f"Azure OpenAI content policy restriction detected for {doc_id}: {e}")
+            else:
+                logger.error(f"Azure OpenAI API error for {doc_id}: {e}")
+            return None
+        self._record_azure_latency(time.time() - call_start)
         
-        max_retries = self.config.get("max_retries", 4)  # Reduced from 8 to 4
+        parsed_result = parse_structured_response(response)
+        if not isinstance(parsed_result, dict):
+            logger.error(f"Azure OpenAI returned no usable JSON for {doc_id}")
+            return None
         
-        for attempt in range(max_retries):
-            try:
-                response = openai_client.chat.completions.create(
-                    model=deployment_name,
-                    messages=[
-                        {
-                            "role": "system", 
-                            "content": "You are a medical records expert. Extract information accurately and return only valid JSON. If unsure about any field, use null."
-                        },
-                        {
-                            "role": "user", 
-                            "content": enhanced_prompt
-                        }
-                    ],
-                    temperature=0.1,  # Low temperature for consistency
-                    max_tokens=800,  # Reduced from 1000 to 800
-                    top_p=0.9
-                )
-                
-                content = response.choices[0].message.content.strip()
-                
-                # Extract JSON from response
-                json_match = re.search(r'\{[\s\S]*\}', content)
-                if json_match:
-                    json_str = json_match.group()
-                    try:
-                        parsed_result = json.loads(json_str)
-                        
-                        # Validate the structure
-                        if self._validate_extraction_structure(parsed_result):
-                            logger.info(f"Azure OpenAI extraction successful for {doc_id} on attempt {attempt + 1}")
-                            return parsed_result
-                        else:
-                            logger.warning(f"Azure OpenAI extraction structure invalid for {doc_id} on attempt {attempt + 1}")
-                    
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"JSON parsing failed for {doc_id} on attempt {attempt + 1}: {e}")
-                
-                # Wait before retry
-                if attempt < max_retries - 1:
-                    time.sleep(1 * (attempt + 1))  # Reduced from 2 to 1
-                    
-            except Exception as e:
-                error_msg = str(e).lower()
-                # Check for content policy violations or restrictions
-                if any(keyword in error_msg for keyword in ['content', 'policy', 'restriction', 'violation', 'sensitive']):
-                    logger.warning(f"Azure OpenAI content policy restriction detected for {doc_id}: {e}")
-                    return None  # Don't retry for content policy violations
-                
-                logger.error(f"Azure OpenAI API error for {doc_id} on attempt {attempt + 1}: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 * (attempt + 1))  # Reduced from 3 to 2
+        if not self._validate_extraction_structure(parsed_result):
+            logger.error(f"Azure OpenAI extraction structure invalid for {doc_id}")
+            return None
         
-        logger.error(f"Azure OpenAI extraction failed after {max_retries} attempts for {doc_id}")
-        return None
+        logger.info(f"Azure OpenAI extraction successful for {doc_id}")
+        self._cache_store(deployment_name, "azure_openai", text, parsed_result)
+        return parsed_result
     
     def _extract_with_patterns(self, text: str, doc_id: str) -> Optional[Dict[str, Any]]:
         """Extract fields using regex patterns and NLP techniques."""
@@ -443,120 +1041,70 @@ RETURN ONLY JSON. Document text:
         extracted = self._get_empty_fields_structure()
         
         try:
-            # Order number patterns
-            order_patterns = [
-                r'(?:order\s*(?:number|no|#)[\s:]*)([\w\-]+)',
-                r'(?:^|\n)([A-Z]{2,}\-?\d{4,})',
-                r'(?:reference|ref)[\s:]*([A-Z0-9\-]{6,})'
-            ]
-            
-            for pattern in order_patterns:
-                match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-                if match and not extracted.get("orderno"):
-                    extracted["orderno"] = match.group(1).strip()
-                    break
+            found = scan_labeled_fields(text)
             
-            # MRN patterns
-            mrn_patterns = [
-                r'(?:mrn|medical\s*record)[\s:#]*([A-Z]?\d{6,}[A-Z]?)',
-                r'(?:patient\s*(?:id|number))[\s:#]*([A-Z]?\d{4,}[A-Z]?)',
-                r'(?:^|\n)(?:MRN:?\s*)([A-Z]?\d{6,}[A-Z]?)'
-            ]
+            def first_value(names):
+                """Values of the patterns in priority order, fallbacks searched only when reached."""
+                for name in names:
+                    value = found.get(name) if name in LABELED_FIELD_PATTERNS else fallback_field_match(text, name)
+                    if value is not None:
+                        yield value
             
-            for pattern in mrn_patterns:
-                match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    mrn_candidate = self._clean_mrn(match.group(1))
-                    if mrn_candidate and len(mrn_candidate) >= 4:
-                        extracted["mrn"] = mrn_candidate
-                        break
-            
-            # Date patterns with context
-            date_pattern = r'(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})'
-            
-            # Order date
-            order_date_context = r'(?:order\s*date|date\s*of\s*order)[\s:]*' + date_pattern
-            match = re.search(order_date_context, text, re.IGNORECASE)
-            if match:
-                extracted["orderdate"] = self._normalize_date(match.group(1))
+            # Order number
+            for value in first_value(("orderno_0", "orderno_1", "orderno_2")):
+                extracted["orderno"] = value.strip()
+                break
             
-            # Start of care
-            soc_context = r'(?:start\s*of\s*care|soc)[\s:]*' + date_pattern
-            match = re.search(soc_context, text, re.IGNORECASE)
-            if match:
-                extracted["soc"] = self._normalize_date(match.group(1))
+            # MRN: the first match of each pattern is tried in priority order
+            for value in first_value(("mrn_0", "mrn_1", "mrn_2")):
+                mrn_candidate = self._clean_mrn(value)
+                if mrn_candidate and len(mrn_candidate) >= 4:
+                    extracted["mrn"] = mrn_candidate
+                    break
             
-            # Date of birth
-            dob_context = r'(?:date\s*of\s*birth|dob|born)[\s:]*' + date_pattern
-            match = re.search(dob_context, text, re.IGNORECASE)
-            if match:
-                extracted["dob"] = self._normalize_date(match.group(1))
+            # Dates with context
+            for field_key in ("orderdate", "soc", "dob"):
+                if field_key in found:
+                    extracted[field_key] = self._normalize_date(found[field_key])
             
             # Certification period
             cert_period = {}
-            
-            soe_context = r'(?:start\s*of\s*episode|soe)[\s:]*' + date_pattern
-            match = re.search(soe_context, text, re.IGNORECASE)
-            if match:
-                cert_period["soe"] = self._normalize_date(match.group(1))
-            
-            eoe_context = r'(?:end\s*of\s*episode|eoe)[\s:]*' + date_pattern
-            match = re.search(eoe_context, text, re.IGNORECASE)
-            if match:
-                cert_period["eoe"] = self._normalize_date(match.group(1))
-            
+            for field_key in ("soe", "eoe"):
+                if field_key in found:
+                    cert_period[field_key] = self._normalize_date(found[field_key])
             extracted["cert_period"] = cert_period
             
             # ICD codes
-            icd_pattern = r'\b([A-TV-Z]\d{2}\.?\d{0,2})\b'
-            icd_matches = re.findall(icd_pattern, text)
+            icd_matches = []
+            for match in ICD_CODE_RE.finditer(text):
+                icd_matches.append(match.group(1).upper())
+                if len(icd_matches) == MAX_PATTERN_ICD_CODES:
+                    break
             if icd_matches:
-                # Validate and clean ICD codes
-                valid_icds = []
-                for icd in icd_matches[:6]:  # Limit to 6
-                    is_valid, _ = self.validator.validate_icd_code(icd)
-                    if is_valid:
-                        valid_icds.append(icd.upper())
-                extracted["icd_codes"] = valid_icds
+                extracted["icd_codes"] = icd_matches
             
             # Patient name
-            name_patterns = [
-                r'(?:patient\s*name)[\s:]*([A-Za-z\s\-\'\.]+?)(?:\n|$)',
-                r'(?:^|\n)([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})(?:\s+(?:DOB|MRN))',
-            ]
-            
-            for pattern in name_patterns:
-                match = re.search(pattern, text, re.MULTILINE)
-                if match:
-                    name_candidate = match.group(1).strip()
-                    is_valid, _ = self.validator.validate_patient_name(name_candidate)
-                    if is_valid:
-                        extracted["patient_name"] = name_candidate
-                        break
+            for value in first_value(("name_0", "name_1")):
+                name_candidate = value.strip()
+                is_valid, _ = self.validator.validate_patient_name(name_candidate)
+                if is_valid:
+                    extracted["patient_name"] = name_candidate
+                    break
             
             # Patient sex
-            sex_pattern = r'(?:sex|gender)[\s:]*(\w+)'
-            match = re.search(sex_pattern, text, re.IGNORECASE)
-            if match:
-                sex_value = match.group(1).strip().upper()
+            if "sex" in found:
+                sex_value = found["sex"].strip().upper()
                 if sex_value.startswith(('M', 'MALE')):
                     extracted["patient_sex"] = "MALE"
                 elif sex_value.startswith(('F', 'FEMALE')):
                     extracted["patient_sex"] = "FEMALE"
             
             # Address
-            address_patterns = [
-                r'(?:address)[\s:]*([^\n]+(?:\n[^\n]+){0,2})',
-                r'(\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Lane|Ln|Boulevard|Blvd)[^\n]*)'
-            ]
-            
-            for pattern in address_patterns:
-                match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    address_candidate = match.group(1).strip()
-                    if len(address_candidate) > 10:  # Reasonable address length
-                        extracted["address"] = address_candidate
-                        break
+            for value in first_value(("address_0", "address_1")):
+                address_candidate = value.strip()
+                if len(address_candidate) > 10:  # Reasonable address length
+                    extracted["address"] = address_candidate
+                    break
             
             logger.info(f"Pattern-based extraction completed for {doc_id}")
             return extracted
@@ -763,29 +1311,7 @@ RETURN ONLY JSON. Document text:
         def parse_date_flexible(date_str):
             if not date_str or not isinstance(date_str, str):
                 return None
-            
-            # Clean the date string
-            date_str = date_str.strip()
-            
-            # Try multiple formats including common variations
-            formats = [
-                "%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%m-%d-%y",
-                "%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y", "%d-%m-%Y",
-                "%b %d, %Y", "%B %d, %Y", "%d %b %Y", "%d %B %Y"
-            ]
-            
-            for fmt in formats:
-                try:
-                    dt = datetime.strptime(date_str, fmt)
-                    # Ensure 4-digit year
-                    if dt.year < 50:
-                        dt = dt.replace(year=dt.year + 2000)
-                    elif dt.year < 100:
-                        dt = dt.replace(year=dt.year + 1900)
-                    return dt
-                except ValueError:
-                    continue
-            return None
+            return parse_date(date_str)
         
         def format_date(dt):
             return dt.strftime("%m/%d/%Y") if dt else None
@@ -871,10 +1397,7 @@ RETURN ONLY JSON. Document text:
     
     def _normalize_date(self, date_str: str) -> str:
         """Normalize date to MM/DD/YYYY format."""
-        is_valid, _, parsed_date = self.validator.validate_date(date_str)
-        if is_valid and parsed_date:
-            return parsed_date.strftime("%m/%d/%Y")
-        return date_str
+        return _normalize_labeled_date(date_str)
     
     def _parse_date_safe(self, date_str: str) -> Optional[datetime]:
         """Safely parse date string."""
@@ -900,4 +1423,4 @@ RETURN ONLY JSON. Document text:
         val = re.sub(r'[^A-Za-z0-9]', '', str(val))
         if not val or len(val) < 3:
             return None
-        return val 
\ No newline at end of file
+        return val
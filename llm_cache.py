@@ -0,0 +1,138 @@
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from config import LLM_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_text_for_cache(text: str) -> str:
+    """Collapse whitespace so re-extracted OCR text with different spacing still hits."""
+    return _WHITESPACE_RE.sub(" ", text or "").strip()
+
+class LLMResponseCache:
+    """Disk-backed cache of parsed LLM extraction results.
+
+    Entries are keyed by model/deployment name, prompt template version and a
+    hash of the normalized document text, so changing a prompt or a model
+    never serves stale answers.
+    """
+
+    def __init__(self, config: Dict = None):
+        self.config = config or LLM_CACHE_CONFIG
+        self.db_file = self.config.get("db_file", "llm_response_cache.db")
+        self.max_entries = self.config.get("max_entries", 50000)
+        self.ttl_seconds = self.config.get("ttl_days", 90) * 86400
+        self.eviction_interval = self.config.get("eviction_interval", 100)
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT,
+                prompt_version TEXT,
+                response TEXT,
+                created_at REAL,
+                last_accessed REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_accessed ON llm_responses (last_accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, prompt_version: str, text: str) -> str:
+        """Build the cache key from model, prompt version and normalized text hash."""
+        text_hash = hashlib.sha256(normalize_text_for_cache(text).encode("utf-8")).hexdigest()
+        return f"{model}:{prompt_version}:{text_hash}"
+
+    def get(self, model: str, prompt_version: str, text: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response, or None on a miss or an expired entry."""
+        key = self.make_key(model, prompt_version, text)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_accessed = ? WHERE cache_key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, model: str, prompt_version: str, text: str, response: Dict[str, Any]):
+        """Store a successful response and periodically evict old entries."""
+        key = self.make_key(model, prompt_version, text)
+        now = time.time()
+        try:
+            payload = json.dumps(response)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Skipping LLM cache write, response not serializable: {e}")
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (cache_key, model, prompt_version, response, created_at, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, payload, now, now)
+            )
+            self._conn.commit()
+            self.writes += 1
+            if self.writes % self.eviction_interval == 0:
+                self._evict_locked(now)
+
+    def evict(self):
+        """Drop expired entries and trim the cache to max_entries (least recently used first)."""
+        with self._lock:
+            self._evict_locked(time.time())
+
+    def _evict_locked(self, now: float):
+        removed = 0
+        if self.ttl_seconds:
+            removed += self._conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            removed += self._conn.execute(
+                "DELETE FROM llm_responses WHERE cache_key IN "
+                "(SELECT cache_key FROM llm_responses ORDER BY last_accessed ASC LIMIT ?)",
+                (overflow,)
+            ).rowcount
+        self._conn.commit()
+        if removed:
+            self.evictions += removed
+            logger.info(f"LLM cache evicted {removed} entries")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "entries": entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,268 @@
+import time
+import random
+import logging
+import threading
+from typing import Dict, Any, List, Callable
+
+import openai
+from openai import AzureOpenAI
+from langchain_community.llms import Ollama
+
+from config import LLM_GATEWAY_CONFIG, api_key, azure_endpoint, deployment_name, OLLAMA_LLM_MODEL
+
+logger = logging.getLogger(__name__)
+
+# Errors that will not succeed on retry (bad request / content filter, auth, missing deployment)
+NON_RETRYABLE_ERRORS = (
+    openai.BadRequestError,
+    openai.AuthenticationError,
+    openai.PermissionDeniedError,
+    openai.NotFoundError,
+)
+
+CONTENT_POLICY_KEYWORDS = ['content', 'policy', 'restriction', 'violation', 'sensitive']
+
+def is_content_policy_error(error: Exception) -> bool:
+    """Check whether an API error is an Azure content policy rejection."""
+    error_msg = str(error).lower()
+    return any(keyword in error_msg for keyword in CONTENT_POLICY_KEYWORDS)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider while its circuit breaker is open."""
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    Closed: calls pass. After failure_threshold consecutive failures the circuit
+    opens and calls are refused for cooldown seconds. After the cool-down a single
+    probe call is let through (half-open): success closes the circuit, failure
+    re-opens it for another cool-down.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.stats = {"opened": 0, "rejected": 0, "probes": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if self.probe_in_flight or time.time() - self.opened_at >= self.cooldown:
+                return "half_open"
+            return "open"
+
+    def allow_request(self) -> bool:
+        """True if a call may go out now (closed, or this call is the half-open probe)."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self.probe_in_flight and time.time() - self.opened_at >= self.cooldown:
+                self.probe_in_flight = True
+                self.stats["probes"] += 1
+                logger.info(f"{self.name} circuit half-open, probing")
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"{self.name} circuit closed after successful probe")
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.probe_in_flight or (self.opened_at is None and self.consecutive_failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    self.stats["opened"] += 1
+                    logger.warning(f"{self.name} circuit opened after {self.consecutive_failures} consecutive failures; "
+                                   f"cooling down {self.cooldown:.0f}s")
+                else:
+                    logger.warning(f"{self.name} probe failed; circuit stays open for {self.cooldown:.0f}s")
+                self.opened_at = time.time()
+                self.probe_in_flight = False
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Run fn through the breaker, raising CircuitOpenError while the circuit is open."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            result = fn()
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+class LLMGateway:
+    """Single entry point for LLM calls.
+
+    Holds long-lived, pooled Azure OpenAI and Ollama clients and applies the
+    same concurrency limits, retry policy, timeouts and token accounting to
+    every caller (field extraction, RAG extraction, supreme sheet).
+    """
+
+    def __init__(self, config: Dict = None):
+        self.config = config or LLM_GATEWAY_CONFIG
+        self.request_timeout = self.config.get("request_timeout", 60)
+        self.max_retries = self.config.get("max_retries", 3)
+        self.backoff_base = self.config.get("backoff_base", 1.0)
+        self.backoff_cap = self.config.get("backoff_cap", 10.0)
+
+        self._limits = {
+            "azure": threading.BoundedSemaphore(self.config.get("azure_max_concurrency", 8)),
+            "ollama": threading.BoundedSemaphore(self.config.get("ollama_max_concurrency", 2)),
+        }
+        self._clients_lock = threading.Lock()
+        self._azure_clients = {}
+        self._ollama_clients = {}
+
+        self._usage_lock = threading.Lock()
+        self._usage = {}
+
+    # ------------------------------------------------------------------
+    # Pooled clients
+    # ------------------------------------------------------------------
+
+    def azure_client(self, key: str = None, endpoint: str = None, api_version: str = None) -> AzureOpenAI:
+        """Return the shared AzureOpenAI client for these credentials (its HTTP pool is reused)."""
+        key = key or api_key
+        endpoint = endpoint or azure_endpoint
+        api_version = api_version or self.config.get("azure_api_version", "2024-02-15-preview")
+        cache_key = (key, endpoint, api_version)
+        with self._clients_lock:
+            client = self._azure_clients.get(cache_key)
+            if client is None:
+                client = AzureOpenAI(
+                    api_key=key,
+                    azure_endpoint=endpoint,
+                    api_version=api_version,
+                    timeout=self.request_timeout,
+                    max_retries=0  # Retries are owned by the gateway
+                )
+                self._azure_clients[cache_key] = client
+        return client
+
+    def ollama_llm(self, model: str = None, **params) -> Ollama:
+        """Return the shared Ollama LLM for this model and generation settings."""
+        model = model or OLLAMA_LLM_MODEL
+        cache_key = (model, tuple(sorted(params.items())))
+        with self._clients_lock:
+            llm = self._ollama_clients.get(cache_key)
+            if llm is None:
+                llm = Ollama(model=model, timeout=self.request_timeout, **params)
+                self._ollama_clients[cache_key] = llm
+        return llm
+
+    # ------------------------------------------------------------------
+    # Calls
+    # ------------------------------------------------------------------
+
+    def call(self, provider: str, fn: Callable[[], Any], max_retries: int = None, description: str = "") -> Any:
+        """Run fn under the provider's concurrency limit with jittered exponential backoff.
+
+        Non-retryable errors and the last failure are re-raised to the caller.
+        """
+        max_retries = max_retries or self.max_retries
+        limit = self._limits[provider]
+        for attempt in range(max_retries):
+            try:
+                with limit:
+                    return fn()
+            except NON_RETRYABLE_ERRORS:
+                raise
+            except Exception as e:
+                if is_content_policy_error(e) or attempt == max_retries - 1:
+                    raise
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+                logger.warning(f"{provider} call {description} failed (attempt {attempt + 1}/{max_retries}): {e}; "
+                               f"retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = None,
+        key: str = None,
+        endpoint: str = None,
+        max_retries: int = None,
+        timeout: float = None,
+        **params
+    ):
+        """Azure OpenAI chat completion through the pooled client."""
+        model = model or deployment_name
+        client = self.azure_client(key, endpoint)
+        start = time.time()
+        response = self.call(
+            "azure",
+            lambda: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                timeout=timeout or self.request_timeout,
+                **params
+            ),
+            max_retries=max_retries,
+            description=model
+        )
+        usage = getattr(response, "usage", None)
+        self._record_usage(
+            f"azure:{model}",
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            latency=time.time() - start
+        )
+        return response
+
+    def ollama_invoke(self, prompt: str, model: str = None, max_retries: int = None, **params) -> str:
+        """Invoke the pooled Ollama LLM; token counts are estimated (~4 chars per token)."""
+        model = model or OLLAMA_LLM_MODEL
+        llm = self.ollama_llm(model, **params)
+        start = time.time()
+        response = self.call("ollama", lambda: llm.invoke(prompt), max_retries=max_retries, description=model)
+        self._record_usage(
+            f"ollama:{model}",
+            prompt_tokens=len(prompt) // 4,
+            completion_tokens=len(response or "") // 4,
+            latency=time.time() - start
+        )
+        return response
+
+    # ------------------------------------------------------------------
+    # Token accounting
+    # ------------------------------------------------------------------
+
+    def _record_usage(self, name: str, prompt_tokens: int, completion_tokens: int, latency: float):
+        with self._usage_lock:
+            entry = self._usage.setdefault(name, {
+                "requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_latency": 0.0
+            })
+            entry["requests"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["total_latency"] += latency
+
+    def usage(self) -> Dict[str, Dict[str, Any]]:
+        """Per model request, token and latency totals."""
+        with self._usage_lock:
+            return {name: dict(entry) for name, entry in self._usage.items()}
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+def get_llm_gateway() -> LLMGateway:
+    """Process-wide gateway instance."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway(LLM_GATEWAY_CONFIG)
+        return _gateway
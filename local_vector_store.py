@@ -0,0 +1,475 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+from langchain.vectorstores.base import VectorStore
+from langchain.schema import Document
+
+from config import LOCAL_VECTOR_STORE_CONFIG, COLLECTION_NAME
+
+logger = logging.getLogger(__name__)
+
+def _payload_matches(payload: Dict[str, Any], filter: Optional[dict]) -> bool:
+    """Simple payload filter: {"key": value} or {"key": [allowed values]}, all keys must match."""
+    if not filter:
+        return True
+    for key, expected in filter.items():
+        value = payload.get(key)
+        if isinstance(expected, (list, tuple, set)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store with the EnhancedQdrantVectorStore interface.
+
+    Normalized float32 embeddings live in a memory-mapped matrix file and point
+    IDs / payloads in a SQLite file, both under path. Searches are exact (one
+    matrix-vector product) or approximate with an IVF index (k-means lists,
+    nprobe lists scanned), which is rebuilt when the store has grown enough.
+    """
+
+    def __init__(self, path: str, embedding_function, config: Dict[str, Any] = None):
+        self.path = path
+        self.embedding_function = embedding_function
+        self.config = config or LOCAL_VECTOR_STORE_CONFIG
+        self.search_mode = self.config.get("search_mode", "exact")
+        os.makedirs(path, exist_ok=True)
+        self.matrix_file = os.path.join(path, "vectors.f32")
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(path, "points.db"), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS points (
+                row INTEGER PRIMARY KEY,
+                point_id TEXT UNIQUE,
+                payload TEXT
+            )
+        """)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS store_meta (name TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.commit()
+
+        rows = self._conn.execute("SELECT point_id, payload FROM points ORDER BY row").fetchall()
+        self.point_ids = [row[0] for row in rows]
+        self.payloads = [json.loads(row[1]) for row in rows]
+        self.row_of = {point_id: idx for idx, point_id in enumerate(self.point_ids)}
+        self.indexed_fields = list(self.config.get("payload_indexes", []))
+        self._payload_index = {field_name: {} for field_name in self.indexed_fields}
+        for row, payload in enumerate(self.payloads):
+            self._index_payload(row, payload)
+
+        meta = dict(self._conn.execute("SELECT name, value FROM store_meta").fetchall())
+        self.dim = meta.get("dim")
+        self.capacity = meta.get("capacity", 0)
+        self._matrix = None
+        if self.dim:
+            self._matrix = np.memmap(self.matrix_file, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+
+        self._ivf_centroids = None
+        self._ivf_lists = None
+        self._ivf_size = 0
+        self._load_ivf()
+
+    @property
+    def count(self) -> int:
+        return len(self.point_ids)
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _ensure_capacity(self, rows: int):
+        """Grow the memory-mapped matrix (doubling) so it can hold rows vectors."""
+        if rows <= self.capacity:
+            return
+        new_capacity = max(rows, self.capacity * 2, self.config.get("initial_capacity", 1024))
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self.matrix_file, "ab") as handle:
+            handle.truncate(new_capacity * self.dim * 4)
+        self._matrix = np.memmap(self.matrix_file, dtype=np.float32, mode="r+", shape=(new_capacity, self.dim))
+        self.capacity = new_capacity
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO store_meta (name, value) VALUES (?, ?)",
+            [("dim", self.dim), ("capacity", self.capacity)]
+        )
+
+    def _index_payload(self, row: int, payload: Dict[str, Any]):
+        for field_name, values in self._payload_index.items():
+            if payload.get(field_name) is not None:
+                values.setdefault(payload[field_name], []).append(row)
+
+    def doc_filter(self, doc_id: str) -> dict:
+        """Payload filter restricting a search to one document's chunks."""
+        return {"doc_id": str(doc_id)}
+
+    def _vectors(self) -> np.ndarray:
+        return self._matrix[:self.count] if self._matrix is not None else np.zeros((0, self.dim or 0), np.float32)
+
+    def existing_ids(self, ids: List[str]) -> set:
+        """IDs from ids already stored."""
+        with self._lock:
+            return {point_id for point_id in ids if point_id in self.row_of}
+
+    def _rows_matching(self, key: str, values) -> set:
+        """Rows whose payload key is one of values (via the payload index when the key has one)."""
+        wanted = {str(value) for value in values}
+        if key in self._payload_index:
+            return {row for value in wanted for row in self._payload_index[key].get(value, ())}
+        return {row for row, payload in enumerate(self.payloads) if payload.get(key) in wanted}
+
+    def stored_payloads(
+        self, fields: List[str], doc_ids: Optional[List[str]] = None, digit_signatures: Optional[List[str]] = None
+    ):
+        """Yield (point_id, payload) for stored points, restricted to the given payload fields.
+
+        doc_ids and digit_signatures restrict the result to points whose doc_id /
+        digit_signature is one of the values.
+        """
+        with self._lock:
+            rows = set(range(self.count))
+            for key, values in (("doc_id", doc_ids), ("digit_signature", digit_signatures)):
+                if values is not None:
+                    rows &= self._rows_matching(key, values)
+            items = [(self.point_ids[row], self.payloads[row]) for row in sorted(rows)]
+        for point_id, payload in items:
+            yield point_id, {key: payload[key] for key in fields if key in payload}
+
+    def add_duplicate_texts(
+        self, texts: List[str], metadatas: List[dict], ids: List[str], source_ids: List[str]
+    ) -> List[str]:
+        """Add texts under their own IDs, copying the stored vectors of the points they duplicate.
+
+        No embedding call is made; texts whose source point is not stored are
+        embedded through add_texts instead. Already stored IDs are skipped.
+        """
+        copies, missing = [], []
+        seen = set()
+        with self._lock:
+            for text, metadata, point_id, source_id in zip(texts, metadatas, ids, source_ids):
+                point_id = str(point_id)
+                if point_id in self.row_of or point_id in seen:
+                    continue
+                seen.add(point_id)
+                row = self.row_of.get(str(source_id))
+                if row is None:
+                    missing.append((text, metadata, point_id))
+                else:
+                    copies.append(((text, metadata, point_id), row))
+            if copies:
+                self._append([item for item, _ in copies], np.array(self._matrix[[row for _, row in copies]]), normalized=True)
+        added = [point_id for (_, _, point_id), _ in copies]
+        if missing:
+            logger.info(f"Embedding {len(missing)} duplicated chunks whose stored vector was not found")
+            missing_texts, missing_metadatas, missing_ids = (list(column) for column in zip(*missing))
+            added += self.add_texts(missing_texts, missing_metadatas, missing_ids)
+        elif copies:
+            self.persist()
+        logger.info(f"Added {len(copies)} chunks reusing stored vectors to local vector store")
+        return added
+
+    def add_texts(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs
+    ) -> List[str]:
+        """Embed and store texts whose IDs are not stored yet; returns all IDs."""
+        if not texts:
+            return []
+        if ids is None:
+            ids = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+        if metadatas is None:
+            metadatas = [{}] * len(texts)
+
+        new_items = []
+        seen = set()
+        backfilled = []
+        with self._lock:
+            for text, metadata, point_id in zip(texts, metadatas, ids):
+                point_id = str(point_id)
+                row = self.row_of.get(point_id)
+                if row is not None:
+                    # Points stored before chunk payloads carried doc_id get it now
+                    if metadata.get("doc_id") is not None and self.payloads[row].get("doc_id") is None:
+                        self.payloads[row]["doc_id"] = metadata["doc_id"]
+                        self._index_payload(row, {"doc_id": metadata["doc_id"]})
+                        backfilled.append((json.dumps(self.payloads[row]), row))
+                elif point_id not in seen:
+                    seen.add(point_id)
+                    new_items.append((text, metadata, point_id))
+            if backfilled:
+                self._conn.executemany("UPDATE points SET payload = ? WHERE row = ?", backfilled)
+
+        skipped = len(set(map(str, ids))) - len(new_items)
+        if skipped:
+            logger.info(f"Skipping {skipped} chunks already in local vector store")
+
+        batch_size = self.config.get("embedding_batch_size", 64)
+        for i in range(0, len(new_items), batch_size):
+            batch = new_items[i:i + batch_size]
+            try:
+                embeddings = self.embedding_function.embed_documents([text for text, _, _ in batch])
+            except Exception as e:
+                logger.error(f"Failed to embed local batch {i//batch_size + 1}: {e}")
+                continue
+            self._append(batch, np.asarray(embeddings, dtype=np.float32))
+
+        self.persist()
+        logger.info(f"Local vector store holds {self.count} points")
+        return [str(point_id) for point_id in dict.fromkeys(ids) if str(point_id) in self.row_of]
+
+    def _append(self, batch, vectors: np.ndarray, normalized: bool = False):
+        if not normalized:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            start = self.count
+            self._ensure_capacity(start + len(batch))
+            self._matrix[start:start + len(batch)] = vectors
+            rows = []
+            for offset, (text, metadata, point_id) in enumerate(batch):
+                payload = {
+                    "text": text,
+                    "text_length": len(text),
+                    "word_count": len(text.split()),
+                    **metadata
+                }
+                self.point_ids.append(point_id)
+                self.payloads.append(payload)
+                self.row_of[point_id] = start + offset
+                self._index_payload(start + offset, payload)
+                rows.append((start + offset, point_id, json.dumps(payload)))
+            self._conn.executemany("INSERT INTO points (row, point_id, payload) VALUES (?, ?, ?)", rows)
+
+    def persist(self):
+        """Flush vectors, index and IVF lists to disk."""
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._conn.commit()
+            if self._ivf_centroids is not None:
+                np.save(os.path.join(self.path, "ivf_centroids.npy"), self._ivf_centroids)
+                np.save(os.path.join(self.path, "ivf_assignments.npy"), self._ivf_assignments)
+
+    # ------------------------------------------------------------------
+    # IVF index
+    # ------------------------------------------------------------------
+
+    def _load_ivf(self):
+        centroids_file = os.path.join(self.path, "ivf_centroids.npy")
+        assignments_file = os.path.join(self.path, "ivf_assignments.npy")
+        if os.path.exists(centroids_file) and os.path.exists(assignments_file):
+            self._set_ivf(np.load(centroids_file), np.load(assignments_file))
+
+    def _set_ivf(self, centroids: np.ndarray, assignments: np.ndarray):
+        self._ivf_centroids = centroids
+        self._ivf_assignments = assignments
+        self._ivf_lists = [np.flatnonzero(assignments == idx) for idx in range(len(centroids))]
+        self._ivf_size = len(assignments)
+
+    def build_ivf(self, n_lists: Optional[int] = None, iterations: int = 10):
+        """Cluster the stored vectors into IVF lists with spherical k-means."""
+        with self._lock:
+            vectors = np.array(self._vectors())
+        if len(vectors) == 0:
+            return
+        n_lists = n_lists or self.config.get("ivf_lists") or max(1, int(np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+        rng = np.random.default_rng(0)
+        centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)]
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            for idx in range(n_lists):
+                members = vectors[assignments == idx]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[idx] = centroid / (np.linalg.norm(centroid) or 1)
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        with self._lock:
+            self._set_ivf(centroids.astype(np.float32), assignments)
+        logger.info(f"Built IVF index: {n_lists} lists over {len(vectors)} points")
+
+    def _ivf_candidates(self, query_vector: np.ndarray) -> np.ndarray:
+        """Rows in the nprobe closest lists, plus rows added since the index was built."""
+        if self._ivf_centroids is None or self.count > self._ivf_size * self.config.get("ivf_rebuild_growth", 1.2):
+            self.build_ivf()
+            self.persist()
+        nprobe = min(self.config.get("ivf_nprobe", 8), len(self._ivf_centroids))
+        closest = np.argpartition(-(self._ivf_centroids @ query_vector), nprobe - 1)[:nprobe]
+        candidates = [self._ivf_lists[idx] for idx in closest]
+        if self.count > self._ivf_size:
+            candidates.append(np.arange(self._ivf_size, self.count))
+        return np.concatenate(candidates)
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs
+    ) -> List[Document]:
+        """Cosine similarity search (exact or IVF per search_mode)."""
+        try:
+            query_vector = np.asarray(self.embedding_function.embed_query(query), dtype=np.float32)
+            return self.similarity_search_by_vector(query_vector, k=k, filter=filter, **kwargs)
+        except Exception as e:
+            logger.error(f"Local similarity search failed: {e}")
+            return []
+
+    def similarity_search_by_vector(
+        self,
+        query_vector,
+        k: int = 4,
+        filter: Optional[dict] = None,
+        mode: Optional[str] = None,
+        **kwargs
+    ) -> List[Document]:
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        query_vector = query_vector / (np.linalg.norm(query_vector) or 1)
+        mode = mode or self.search_mode
+
+        with self._lock:
+            if self.count == 0:
+                return []
+            indexed_key = next((key for key in (filter or {}) if key in self._payload_index
+                                and not isinstance(filter[key], (list, tuple, set))), None)
+            use_ivf = mode == "ivf" and self.count >= self.config.get("ivf_min_points", 2000)
+            if indexed_key:
+                # Indexed filters (doc_id, company) select few rows; score them exactly
+                rows = np.array(self._payload_index[indexed_key].get(filter[indexed_key], []), dtype=np.int64)
+            elif use_ivf:
+                rows = self._ivf_candidates(query_vector)
+            else:
+                rows = np.arange(self.count)
+            if filter:
+                rows = np.array([row for row in rows if _payload_matches(self.payloads[row], filter)], dtype=np.int64)
+                if len(rows) == 0:
+                    return []
+            scores = self._vectors()[rows] @ query_vector
+            top = np.argsort(-scores)[:k] if len(rows) <= k else np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            documents = []
+            for idx in top:
+                payload = self.payloads[rows[idx]]
+                documents.append(Document(
+                    page_content=payload.get("text", ""),
+                    metadata={
+                        "score": float(scores[idx]),
+                        **{key: value for key, value in payload.items() if key != "text"}
+                    }
+                ))
+        return documents
+
+    def similarity_search_batch(
+        self,
+        queries: List[str],
+        k: int = 4,
+        filter: Optional[Union[dict, List[Optional[dict]]]] = None,
+        **kwargs
+    ) -> List[List[Document]]:
+        """Search many queries with one embedding call; filter is shared or given per query."""
+        if not queries:
+            return []
+        filters = filter if isinstance(filter, list) else [filter] * len(queries)
+        try:
+            embed = getattr(self.embedding_function, "embed_queries", self.embedding_function.embed_documents)
+            query_vectors = np.asarray(embed(queries), dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Local batch query embedding failed: {e}")
+            return [[] for _ in queries]
+        return [
+            self.similarity_search_by_vector(vector, k=k, filter=query_filter, **kwargs)
+            for vector, query_filter in zip(query_vectors, filters)
+        ]
+
+    def as_retriever(self, **kwargs):
+        """Return retriever interface."""
+        from langchain.schema.retriever import BaseRetriever
+
+        class LocalVectorRetriever(BaseRetriever):
+            def __init__(self, vectorstore, search_kwargs=None):
+                self.vectorstore = vectorstore
+                self.search_kwargs = search_kwargs or {}
+
+            def _get_relevant_documents(self, query: str) -> List[Document]:
+                return self.vectorstore.similarity_search(query, **self.search_kwargs)
+
+        search_kwargs = kwargs.get("search_kwargs", kwargs)
+        return LocalVectorRetriever(self, search_kwargs)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        collection_name: str = COLLECTION_NAME,
+        **kwargs
+    ):
+        """Open (or create) the local store for collection_name and add texts."""
+        config = kwargs.get("config") or LOCAL_VECTOR_STORE_CONFIG
+        path = os.path.join(config.get("path", "local_vector_index"), collection_name)
+        vector_store = cls(path, embedding, config)
+        if texts:
+            vector_store.add_texts(texts, metadatas, ids)
+        return vector_store
+
+    def close(self):
+        self.persist()
+        with self._lock:
+            self._conn.close()
+
+def benchmark_vector_stores(
+    stores: Dict[str, Any], queries: List[str], k: int = 5, reference: Optional[str] = None
+) -> Dict[str, Dict[str, float]]:
+    """Recall@k and latency of each store's similarity_search against a reference store.
+
+    Results are compared by chunk text, so stores built from the same chunks are
+    comparable whatever their point IDs. The reference defaults to the first store
+    (use an exact-mode LocalVectorStore for ground truth). Latency includes embedding
+    the query, which every store pays the same way.
+    """
+    reference = reference or next(iter(stores))
+    truth = [
+        {doc.page_content for doc in stores[reference].similarity_search(query, k=k)}
+        for query in queries
+    ]
+
+    report = {}
+    for name, store in stores.items():
+        latencies = []
+        recall_sum = 0.0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            results = store.similarity_search(query, k=k)
+            latencies.append(time.perf_counter() - start)
+            if expected:
+                recall_sum += len(expected & {doc.page_content for doc in results}) / len(expected)
+        latencies.sort()
+        report[name] = {
+            "recall_at_k": recall_sum / max(1, len(queries)),
+            "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000 if latencies else 0.0,
+        }
+        logger.info(f"{name}: recall@{k}={report[name]['recall_at_k']:.3f}, "
+                    f"p50={report[name]['p50_ms']:.1f}ms, p95={report[name]['p95_ms']:.1f}ms")
+    return report
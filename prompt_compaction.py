@@ -0,0 +1,134 @@
+import re
+import time
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+# Labels that sit next to the fields we extract (orders, 485s, plan of care headers)
+FIELD_ANCHOR_RE = re.compile(
+    r'start\s*of\s*care|\bsoc\b|start\s*of\s*episode|end\s*of\s*episode|\bsoe\b|\beoe\b|'
+    r'certification\s*period|cert\.?\s*period|episode|from\s*date|through\s*date|'
+    r'\bmrn\b|medical\s*record|patient\s*(?:id|number|name)|'
+    r'date\s*of\s*birth|\bdob\b|\bborn\b|'
+    r'order\s*(?:number|no|#|date)|date\s*of\s*order|'
+    r'\bicd\b|diagnos[ie]s|\b[A-TV-Z]\d{2}\.\d{1,4}\b|'
+    r'address|\bsex\b|gender',
+    re.IGNORECASE
+)
+
+PAGE_MARKER_RE = re.compile(r'^-+\s*page\b.*-*$', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English prose)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+@dataclass
+class CompactionResult:
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+    windows: int
+    elapsed: float
+    fallback: bool = False
+    dropped_lines: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.compacted_tokens)
+
+    @property
+    def savings_ratio(self) -> float:
+        return self.tokens_saved / self.original_tokens if self.original_tokens else 0.0
+
+@dataclass
+class PromptCompactor:
+    """Selects the line windows around field-bearing labels to shrink LLM prompts.
+
+    Repeated header/footer lines (agency letterhead, fax banners repeated on
+    every page) are kept once, then only the lines near field anchors are
+    retained, within a token budget. Documents without anchors fall back to
+    the leading text, cut to the budget.
+    """
+    token_budget: int = 1500
+    lines_before: int = 1
+    lines_after: int = 2
+    min_anchor_windows: int = 1
+    min_dedupe_chars: int = 20  # Short lines (bare dates, codes) are values, not boilerplate
+    gap_marker: str = "..."
+    anchor_re: re.Pattern = field(default=FIELD_ANCHOR_RE)
+
+    def compact(self, text: str) -> CompactionResult:
+        start = time.time()
+        text = text or ""
+        original_tokens = estimate_tokens(text)
+
+        lines, dropped = self._dedupe_lines(text.splitlines())
+        windows = self._anchor_windows(lines)
+
+        if len(windows) < self.min_anchor_windows:
+            compacted = self._truncate_to_budget("\n".join(lines))
+            return CompactionResult(compacted, original_tokens, estimate_tokens(compacted),
+                                    0, time.time() - start, fallback=True, dropped_lines=dropped)
+
+        budget_chars = self.token_budget * CHARS_PER_TOKEN
+        parts = []
+        used = 0
+        kept_windows = 0
+        previous_end = None
+        for begin, end in windows:
+            block = "\n".join(lines[begin:end + 1])
+            cost = len(block) + len(self.gap_marker) + 2
+            if used + cost > budget_chars:
+                if kept_windows == 0:
+                    parts.append(block[:budget_chars])
+                    kept_windows = 1
+                break
+            if previous_end is not None and begin > previous_end + 1:
+                parts.append(self.gap_marker)
+            parts.append(block)
+            used += cost
+            kept_windows += 1
+            previous_end = end
+
+        compacted = "\n".join(parts)
+        return CompactionResult(compacted, original_tokens, estimate_tokens(compacted),
+                                kept_windows, time.time() - start, dropped_lines=dropped)
+
+    def _dedupe_lines(self, lines: List[str]) -> Tuple[List[str], int]:
+        """Drop blank lines, page markers and repeats of lines already seen (headers/footers)."""
+        seen = set()
+        kept = []
+        dropped = 0
+        for line in lines:
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if PAGE_MARKER_RE.match(stripped):
+                dropped += 1
+                continue
+            key = _WHITESPACE_RE.sub(" ", stripped).lower()
+            if key in seen and len(key) >= self.min_dedupe_chars:
+                dropped += 1
+                continue
+            seen.add(key)
+            kept.append(stripped)
+        return kept, dropped
+
+    def _anchor_windows(self, lines: List[str]) -> List[Tuple[int, int]]:
+        """Merged [begin, end] line ranges around every anchor line, in document order."""
+        windows = []
+        for idx, line in enumerate(lines):
+            if not self.anchor_re.search(line):
+                continue
+            begin = max(0, idx - self.lines_before)
+            end = min(len(lines) - 1, idx + self.lines_after)
+            if windows and begin <= windows[-1][1] + 1:
+                windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+            else:
+                windows.append((begin, end))
+        return windows
+
+    def _truncate_to_budget(self, text: str) -> str:
+        return text[:self.token_budget * CHARS_PER_TOKEN]
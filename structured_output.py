@@ -0,0 +1,163 @@
+import re
+import json
+import logging
+from typing import Dict, Any, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Fixed schema for one extracted order; used for function calling and documented in JSON mode
+_DATE_FIELD = {"type": ["string", "null"], "description": "Date in MM/DD/YYYY"}
+
+ORDER_FIELDS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "orderno": {"type": ["string", "null"], "description": "Order number"},
+        "orderdate": _DATE_FIELD,
+        "mrn": {"type": ["string", "null"], "description": "Medical record number, alphanumeric"},
+        "soc": _DATE_FIELD,
+        "cert_period": {
+            "type": "object",
+            "properties": {"soe": _DATE_FIELD, "eoe": _DATE_FIELD},
+            "required": ["soe", "eoe"],
+        },
+        "icd_codes": {"type": "array", "items": {"type": "string"}, "description": "ICD-10 codes"},
+        "patient_name": {"type": ["string", "null"]},
+        "dob": _DATE_FIELD,
+        "address": {"type": ["string", "null"]},
+        "patient_sex": {"type": ["string", "null"], "enum": ["MALE", "FEMALE", None]},
+    },
+    "required": ["orderno", "orderdate", "mrn", "soc", "cert_period", "icd_codes",
+                 "patient_name", "dob", "address", "patient_sex"],
+}
+
+PACKED_ORDER_FIELDS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "documents": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": dict(ORDER_FIELDS_SCHEMA["properties"], doc_id={"type": "string"}),
+                "required": ["doc_id"] + ORDER_FIELDS_SCHEMA["required"],
+            },
+        }
+    },
+    "required": ["documents"],
+}
+
+def order_fields_subset_schema(keys) -> Dict[str, Any]:
+    """ORDER_FIELDS_SCHEMA restricted to the given field keys."""
+    keys = [key for key in ORDER_FIELDS_SCHEMA["required"] if key in set(keys)]
+    return {
+        "type": "object",
+        "properties": {key: ORDER_FIELDS_SCHEMA["properties"][key] for key in keys},
+        "required": keys,
+    }
+
+ORDER_FIELDS_FUNCTION = "record_order_fields"
+PACKED_ORDER_FIELDS_FUNCTION = "record_packed_order_fields"
+
+_CODE_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$', re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+_PYTHON_LITERALS_RE = re.compile(r'\b(None|True|False)\b')
+_PYTHON_LITERALS = {"None": "null", "True": "true", "False": "false"}
+_PARTIAL_LITERAL_RE = re.compile(r':\s*[A-Za-z]*$')
+
+def structured_request_params(mode: Optional[str], function_name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Extra chat completion arguments for the structured-output mode.
+
+    mode is "function" (forced function call against the schema), "json_mode"
+    (response_format json_object) or None for plain text responses.
+    """
+    if mode == "function":
+        return {
+            "tools": [{
+                "type": "function",
+                "function": {
+                    "name": function_name,
+                    "description": "Record the fields extracted from the medical order document(s).",
+                    "parameters": schema,
+                },
+            }],
+            "tool_choice": {"type": "function", "function": {"name": function_name}},
+        }
+    if mode == "json_mode":
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+def response_payload(response) -> str:
+    """Raw JSON text of a chat completion: the forced tool call arguments, else the message content."""
+    message = response.choices[0].message
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        return tool_calls[0].function.arguments or ""
+    return message.content or ""
+
+def _close_truncated(text: str) -> str:
+    """Close strings, objects and arrays left open by a response cut off at max_tokens."""
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]' and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = _PARTIAL_LITERAL_RE.sub(': null', text.rstrip().rstrip(','))
+    return text + ''.join(reversed(stack))
+
+def repair_json(text: str) -> Optional[Union[Dict[str, Any], list]]:
+    """Parse LLM JSON output, repairing the usual defects locally instead of re-asking.
+
+    Handles code fences, prose around the JSON, trailing commas, Python literals
+    (None/True/False), single-quoted JSON and output truncated at max_tokens.
+    Returns None when nothing usable can be recovered.
+    """
+    if not text:
+        return None
+    text = _CODE_FENCE_RE.sub('', text.strip())
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    starts = [pos for pos in (text.find('{'), text.find('[')) if pos != -1]
+    if not starts:
+        return None
+    start = min(starts)
+    closer = '}' if text[start] == '{' else ']'
+    end = text.rfind(closer)
+    candidate = text[start:end + 1] if end > start else text[start:]
+
+    attempts = [candidate]
+    fixed = _TRAILING_COMMA_RE.sub(r'\1', candidate)
+    fixed = _PYTHON_LITERALS_RE.sub(lambda m: _PYTHON_LITERALS[m.group(1)], fixed)
+    attempts.append(fixed)
+    if '"' not in fixed:
+        attempts.append(fixed.replace("'", '"'))
+    attempts.append(_TRAILING_COMMA_RE.sub(r'\1', _close_truncated(_PYTHON_LITERALS_RE.sub(
+        lambda m: _PYTHON_LITERALS[m.group(1)], text[start:]))))
+
+    for attempt in attempts:
+        try:
+            return json.loads(attempt)
+        except json.JSONDecodeError:
+            continue
+    logger.debug(f"JSON repair failed for response: {text[:200]}")
+    return None
+
+def parse_structured_response(response) -> Optional[Union[Dict[str, Any], list]]:
+    """Parsed JSON from a chat completion in any structured-output mode."""
+    return repair_json(response_payload(response))
@@ -12,6 +12,7 @@ from typing import Dict, List, Tuple, Optional
 import time
 from functools import lru_cache
 from performance_monitor import start_monitoring, update_progress, stop_monitoring
+from date_normalization import parse_date, format_date, normalize_date_series
 import signal
 
 # Global stop flag for graceful Ctrl+C handling
@@ -71,14 +72,7 @@ def clean_doc_id(val):
 
 def try_date(dtstr):
     if not dtstr: return ""
-    for fmt in ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%m/%d/%Y", "%Y-%m-%dT%H:%M:%SZ"):
-        try:
-            return datetime.strptime(dtstr[:19], fmt).strftime("%m/%d/%Y")
-        except: continue
-    try:
-        return pd.to_datetime(dtstr).strftime("%m/%d/%Y")
-    except:
-        return dtstr[:10]
+    return format_date(dtstr, lenient=True) or str(dtstr)[:10]
 
 async def get_order_doc_api_async(session: aiohttp.ClientSession, doc_id: str) -> Dict:
     """Async version of get_order_doc_api with caching and retries."""
@@ -211,6 +205,26 @@ def get_all_patients():
         print(f"  [PATIENT_API] Error: {e}")
         return []
 
+SHEET_DATE_COLUMNS = ["orderdate", "dob", "soc", "cert_period_soe", "cert_period_eoe"]
+
+def normalize_sheet_dates(out_df):
+    """Render every date column as MM/DD/YYYY in one vectorized pass (episode dates arrive as ISO timestamps)."""
+    for col in SHEET_DATE_COLUMNS:
+        if col in out_df.columns:
+            out_df[col] = normalize_date_series(out_df[col], lenient=True, keep_unparsed=True)
+
+def report_sheet_validation(out_df):
+    """Validate the built sheet column-wise in one pass and print per-column issue counts."""
+    if out_df.empty:
+        return
+    try:
+        from validation import MedicalFieldValidator
+        sheet_validation = MedicalFieldValidator.validate_dataframe(out_df)
+        invalid_rows = int((~sheet_validation.valid_rows).sum())
+        print(f"[VALIDATE] {invalid_rows}/{len(out_df)} rows have field issues. Invalid per column: {sheet_validation.summary()}")
+    except Exception as e:
+        print(f"[VALIDATE] Error validating sheet: {e}")
+
 def get_valid_icds(icd_codes_validated):
     if not isinstance(icd_codes_validated, list):
         try:
@@ -354,17 +368,13 @@ def fill_episode_dates(patient, orderdate):
         return "", "", ""
     agency = patient.get("agencyInfo", {})
     episode_diag = agency.get("episodeDiagnoses", [])
-    try:
-        odt = pd.to_datetime(orderdate)
-    except:
+    odt = parse_date(orderdate, lenient=True)
+    if odt is None:
         return "", "", ""
     for ep in episode_diag:
-        try:
-            start_ep = pd.to_datetime(ep.get("startOfEpisode", ""))
-            end_ep = pd.to_datetime(ep.get("endOfEpisode", ""))
-        except:
-            continue
-        if pd.notna(start_ep) and pd.notna(end_ep) and start_ep <= odt <= end_ep:
+        start_ep = parse_date(ep.get("startOfEpisode", ""), lenient=True)
+        end_ep = parse_date(ep.get("endOfEpisode", ""), lenient=True)
+        if start_ep and end_ep and start_ep <= odt <= end_ep:
             soc = ep.get("startOfCare", "")
             soe = ep.get("startOfEpisode", "")
             eoe = ep.get("endOfEpisode", "")
@@ -392,17 +402,15 @@ def guess_gender_with_gpt(name):
         "Do NOT reply with any other word, phrase, or empty string."
     )
     try:
-        from openai import AzureOpenAI
+        from llm_gateway import get_llm_gateway
         
-        client = AzureOpenAI(
-            api_key=AZURE_OPENAI_KEY,
-            azure_endpoint=AZURE_OPENAI_ENDPOINT,
-            api_version="2024-02-15-preview"
-        )
-        
-        response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT,
+        # Pooled client from the shared gateway instead of a new TLS connection per name
+        response = get_llm_gateway().chat_completion(
             messages=[{"role": "user", "content": prompt}],
+            model=AZURE_OPENAI_DEPLOYMENT,
+            key=AZURE_OPENAI_KEY,
+            endpoint=AZURE_OPENAI_ENDPOINT,
+            max_retries=2,
             max_tokens=1,
             temperature=0.1  # Reduce randomness for more consistent answers
         )
@@ -680,6 +688,8 @@ async def main_async():
     stop_monitoring()
     
     out_df = pd.DataFrame(output_rows)
+    normalize_sheet_dates(out_df)
+    report_sheet_validation(out_df)
     # Ensure output directory exists when a path is provided
     try:
         out_dir = os.path.dirname(output_file)
@@ -786,6 +796,8 @@ def main_sync():
     stop_monitoring()
     
     out_df = pd.DataFrame(output_rows)
+    normalize_sheet_dates(out_df)
+    report_sheet_validation(out_df)
     # Ensure output directory exists when a path is provided
     try:
         out_dir = os.path.dirname(output_file)
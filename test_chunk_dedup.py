@@ -0,0 +1,69 @@
+from chunk_dedup import NearDuplicateIndex, chunk_fingerprint, simhash, suppress_near_duplicates
+
+CONFIG = {"max_hamming_distance": 3, "shingle_size": 3}
+TEMPLATE = ("Home health certification and plan of care for the patient named below, "
+            "skilled nursing visits twice weekly, start of care {date}")
+
+
+def test_simhash_is_stable_and_close_for_near_copies():
+    text = TEMPLATE.format(date="01/02/2024")
+    assert simhash(text) == simhash(text)
+    assert bin(simhash(text) ^ simhash(text + " .")).count("1") <= 3
+
+
+def test_index_requires_matching_digit_signature():
+    index = NearDuplicateIndex(max_distance=3)
+    first = chunk_fingerprint(TEMPLATE.format(date="01/02/2024"))
+    other = chunk_fingerprint(TEMPLATE.format(date="05/06/2024"))
+    index.add("p1", int(first["simhash"], 16), first["digit_signature"])
+
+    assert index.find(int(first["simhash"], 16), first["digit_signature"]) == "p1"
+    assert index.find(int(other["simhash"], 16), other["digit_signature"]) is None
+
+
+def test_duplicates_within_a_document_are_dropped():
+    text = TEMPLATE.format(date="01/02/2024")
+    texts, metadatas, ids, reused, stats = suppress_near_duplicates(
+        [text, text], [{"doc_id": "1"}, {"doc_id": "1"}], ["a", "b"], config=CONFIG)
+
+    assert ids == ["a"]
+    assert reused == []
+    assert stats.within_run == 1
+    assert "simhash" in metadatas[0] and "digit_signature" in metadatas[0]
+
+
+def test_chunk_shared_across_documents_reuses_the_stored_vector():
+    # Boilerplate repeated on another order is not embedded again, but stays retrievable under its doc_id
+    text = TEMPLATE.format(date="01/02/2024")
+    stored = [("old", {**chunk_fingerprint(text), "doc_id": "1"})]
+
+    texts, metadatas, ids, reused, stats = suppress_near_duplicates(
+        [text, text, text], [{"doc_id": "1"}, {"doc_id": "2"}, {"doc_id": "2"}], ["a", "b", "c"],
+        existing=stored, config=CONFIG)
+
+    assert ids == []
+    assert [(point_id, source_id, metadata["doc_id"]) for _, metadata, point_id, source_id in reused] == [
+        ("b", "old", "2")]
+    assert "simhash" in reused[0][1]
+    assert stats.against_collection == 3 and stats.reused == 1
+
+
+def test_chunk_shared_within_a_run_reuses_the_kept_chunk():
+    text = TEMPLATE.format(date="01/02/2024")
+
+    _, _, ids, reused, stats = suppress_near_duplicates(
+        [text, text], [{"doc_id": "1"}, {"doc_id": "2"}], ["a", "b"], config=CONFIG)
+
+    assert ids == ["a"]
+    assert [(point_id, source_id) for _, _, point_id, source_id in reused] == [("b", "a")]
+    assert stats.within_run == 1
+
+
+def test_chunk_keeps_itself_when_its_own_point_is_stored():
+    text = TEMPLATE.format(date="01/02/2024")
+    stored = [("a", {**chunk_fingerprint(text), "doc_id": "1"})]
+
+    _, _, ids, _, stats = suppress_near_duplicates([text], [{"doc_id": "1"}], ["a"], existing=stored, config=CONFIG)
+
+    assert ids == ["a"]
+    assert stats.skipped == 0
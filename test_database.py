@@ -0,0 +1,155 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("openpyxl")
+
+import database
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = database.create_connection(str(tmp_path / "orders.db"))
+    database.migrate(conn)
+    yield conn
+    conn.close()
+
+
+def test_raw_text_is_stored_compressed_and_loaded_on_demand(conn):
+    database.insert_order(conn, {"docId": "11", "raw_text": "Start of Care 01/02/2024", "extraction_method": "ocr"})
+
+    order = database.fetch_order_by_docid(conn, "11")
+    assert "raw_text" not in order
+    assert conn.execute("SELECT raw_text FROM orders WHERE docId = 11").fetchone()[0] is None
+    assert database.fetch_order_by_docid(conn, "11", include_raw_text=True)["raw_text"] == "Start of Care 01/02/2024"
+    assert database.fetch_raw_text(conn, 11) == "Start of Care 01/02/2024"
+
+
+def test_existing_orders_get_their_text_back_by_fetched_doc_id(conn):
+    # pipeline_main reuses existing orders: fetch the rows, then bulk-load their texts by row docId
+    database.insert_order(conn, {"docId": "21", "raw_text": "first order"})
+    database.insert_order(conn, {"docId": "22", "raw_text": "second order"})
+    existing = {doc_id: database.fetch_order_by_docid(conn, doc_id) for doc_id in ("21", "22")}
+
+    texts = database.fetch_raw_texts(conn, [order["docId"] for order in existing.values()])
+
+    assert texts == {21: "first order", 22: "second order"}
+
+
+def test_migration_moves_inline_raw_text_to_side_table(tmp_path):
+    db_file = str(tmp_path / "legacy.db")
+    conn = database.create_connection(db_file)
+    database.migrate(conn, target=3)
+    conn.execute("INSERT INTO orders (docId, raw_text, extraction_method) VALUES (5, 'legacy text', 'ocr')")
+    conn.commit()
+
+    assert database.migrate(conn) == 4
+    assert conn.execute("SELECT raw_text FROM orders WHERE docId = 5").fetchone()[0] is None
+    assert list(database.iter_raw_texts(conn)) == [(5, "legacy text")]
+    conn.close()
+
+
+def test_export_leaves_raw_text_out_unless_asked(conn, tmp_path):
+    pd = pytest.importorskip("pandas")
+    database.insert_order(conn, {"docId": "31", "orderno": "A1", "raw_text": "text"})
+    database.insert_order(conn, {"docId": "32", "orderno": "A2", "raw_text": "text"})
+    output = tmp_path / "orders.xlsx"
+
+    database.export_db_to_excel(conn, output_excel=str(output), filter_docids=["32"])
+
+    exported = pd.read_excel(output)
+    assert list(exported["orderno"]) == ["A2"]
+    assert "raw_text" not in exported.columns
+
+
+def test_connection_uses_wal(conn):
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_batch_writer_buffers_until_the_batch_is_full(conn):
+    writer = database.OrderBatchWriter(conn, batch_rows=3, batch_seconds=3600)
+    writer.add({"docId": "1", "raw_text": "one"})
+    writer.add({"docId": "2"})
+    assert conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0] == 0
+
+    writer.add({"docId": "3", "raw_text": "three"})
+
+    assert conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0] == 3
+    assert database.fetch_raw_texts(conn, [1, 2, 3]) == {1: "one", 3: "three"}
+    assert (writer.rows_written, writer.batches_written) == (3, 1)
+    writer.close()
+
+
+def test_batch_writer_flushes_on_close_and_replaces_rows(conn):
+    with database.OrderBatchWriter(conn, batch_rows=100, batch_seconds=3600) as writer:
+        writer.add({"docId": "7", "mrn": "OLD1234"})
+        writer.add({"docId": "7", "mrn": "NEW1234"})
+
+    assert database.fetch_order_by_docid(conn, "7")["mrn"] == "NEW1234"
+    assert writer.batches_written == 1
+
+
+def test_batch_writer_rolls_back_a_failed_batch(conn):
+    writer = database.OrderBatchWriter(conn, batch_rows=100, batch_seconds=3600)
+    writer.add({"docId": "8"})
+    writer.add({"docId": "not a number"})
+
+    with pytest.raises(sqlite3.IntegrityError):
+        writer.flush()
+
+    assert conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0] == 0
+    writer.pending = []
+    writer.close()
+
+
+def test_migrate_is_versioned_and_idempotent(tmp_path):
+    conn = database.create_connection(str(tmp_path / "new.db"))
+
+    assert database.migrate(conn, target=2) == 2
+    assert database.schema_version(conn) == 2
+    assert database.migrate(conn) == len(database.MIGRATIONS)
+    assert database.migrate(conn) == len(database.MIGRATIONS)
+
+    versions = [row[0] for row in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+    assert versions == [version for version, _, _ in database.MIGRATIONS]
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(orders)")}
+    assert {"idx_orders_extraction_method", "idx_orders_mrn", "idx_orders_orderdate"} <= indexes
+    conn.close()
+
+
+def test_migration_adds_patient_columns_to_legacy_table(tmp_path):
+    conn = database.create_connection(str(tmp_path / "legacy.db"))
+    conn.execute("CREATE TABLE orders (docId INTEGER PRIMARY KEY, orderno TEXT, orderdate TEXT, mrn TEXT, soc TEXT, "
+                 "cert_period_soe TEXT, cert_period_eoe TEXT, icd_codes TEXT, icd_codes_validated TEXT, "
+                 "raw_text TEXT, extraction_method TEXT, extraction_error TEXT, error TEXT)")
+    conn.commit()
+
+    database.migrate(conn)
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(orders)")}
+    assert {"patient_name", "dob", "address", "patient_sex"} <= columns
+    conn.close()
+
+
+def test_failed_migration_rolls_back_with_its_version(tmp_path, monkeypatch):
+    conn = database.create_connection(str(tmp_path / "broken.db"))
+
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError("migration failed")
+
+    monkeypatch.setattr(database, "MIGRATIONS", database.MIGRATIONS[:1] + [(2, "broken", broken)])
+
+    with pytest.raises(RuntimeError):
+        database.migrate(conn)
+
+    assert database.schema_version(conn) == 1
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+    conn.close()
+
+
+def test_filter_queries_use_the_indexes(conn):
+    plan = " ".join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT docId FROM orders WHERE extraction_method = ?", ("ocr",)))
+
+    assert "idx_orders_extraction_method" in plan
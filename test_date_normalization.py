@@ -0,0 +1,59 @@
+from datetime import date, datetime
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("dateutil")
+
+from date_normalization import format_date, normalize_date_series, parse_date, parse_date_series
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("01/02/2024", datetime(2024, 1, 2)),
+    (" 1/2/2024 ", datetime(2024, 1, 2)),
+    ("25/12/2024", datetime(2024, 12, 25)),
+    ("1/2/24", datetime(2024, 1, 2)),
+    ("03-04-2024", datetime(2024, 3, 4)),
+    ("2024-03-04", datetime(2024, 3, 4)),
+    ("2024/03/04", datetime(2024, 3, 4)),
+    ("2024-05-01T00:00:00.000Z", datetime(2024, 5, 1)),
+    ("Mar 4, 2024", datetime(2024, 3, 4)),
+    ("4 March 2024", datetime(2024, 3, 4)),
+    (date(2024, 3, 4), datetime(2024, 3, 4)),
+    (pd.Timestamp("2024-03-04 10:00", tz="UTC"), datetime(2024, 3, 4, 10)),
+])
+def test_parse_date_known_layouts(value, expected):
+    assert parse_date(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "nan", "None", None, float("nan"), pd.NaT, "13/13/2024", "next tuesday"])
+def test_parse_date_rejects_blank_and_unknown_values(value):
+    assert parse_date(value) is None
+
+
+def test_lenient_falls_back_to_dateutil():
+    assert parse_date("March 4th 2024") is None
+    assert parse_date("March 4th 2024", lenient=True) == datetime(2024, 3, 4)
+
+
+def test_format_date_renders_standard_and_custom_formats():
+    assert format_date("2024-03-04") == "03/04/2024"
+    assert format_date("03/04/2024", fmt="%Y-%m-%d") == "2024-03-04"
+    assert format_date("garbage") is None
+
+
+def test_series_matches_scalar_parser():
+    values = pd.Series(["01/02/2024", "2024-03-04", "1/2/24", None, "", "garbage", "25/12/2024"])
+
+    parsed = parse_date_series(values)
+
+    for value, result in zip(values, parsed):
+        expected = parse_date(value)
+        assert (pd.isna(result) and expected is None) or result == pd.Timestamp(expected)
+
+
+def test_normalize_date_series_keeps_unparsed_values_on_request():
+    values = pd.Series(["2024-03-04", "garbage", None])
+
+    assert normalize_date_series(values).tolist() == ["03/04/2024", "", ""]
+    assert normalize_date_series(values, keep_unparsed=True).tolist() == ["03/04/2024", "garbage", ""]
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from embedding_cache import CachedEmbeddings, EmbeddingCache, embedding_cache_key
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0, 0.5]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache({"cache_dir": str(tmp_path / "cache"), "max_entries": 4, "evict_fraction": 0.5})
+    yield cache
+    cache.close()
+
+
+def test_only_cache_misses_are_embedded(cache):
+    base = CountingEmbeddings()
+    embeddings = CachedEmbeddings(base, cache, "text-embedding-3-small")
+
+    first = embeddings.embed_documents(["a", "bb", "a"])
+    second = embeddings.embed_documents(["bb", "ccc"])
+
+    assert base.calls == [["a", "bb"], ["ccc"]]
+    assert first == [[1.0, 1.0, 0.5], [2.0, 1.0, 0.5], [1.0, 1.0, 0.5]]
+    assert second[0] == first[1]
+    assert cache.stats()["hits"] == 1
+
+
+def test_deployment_is_part_of_the_key():
+    assert embedding_cache_key("small", "text") != embedding_cache_key("large", "text")
+
+
+def test_vectors_survive_reopening(tmp_path):
+    config = {"cache_dir": str(tmp_path / "cache"), "max_entries": 4}
+    cache = EmbeddingCache(config)
+    cache.put_many({"k": [1.0, 2.0, 3.0]})
+    cache.close()
+
+    reopened = EmbeddingCache(config)
+    np.testing.assert_array_equal(reopened.get_many(["k"])["k"], np.array([1.0, 2.0, 3.0], dtype=np.float32))
+    reopened.close()
+
+
+def test_full_cache_evicts_least_recently_used(cache):
+    for idx in range(4):
+        cache.put_many({f"k{idx}": [float(idx), 0.0, 0.0]})
+        time.sleep(0.01)
+    cache.get_many(["k0", "k1"])
+
+    cache.put_many({"k4": [4.0, 0.0, 0.0]})
+
+    assert set(cache.get_many(["k0", "k1", "k2", "k3", "k4"])) == {"k0", "k1", "k4"}
+    assert cache.stats()["evictions"] == 2
+
+
+def test_wrong_dimension_is_not_stored(cache):
+    cache.put_many({"k": [1.0, 2.0, 3.0]})
+    cache.put_many({"bad": [1.0, 2.0]})
+
+    assert cache.get_many(["bad"]) == {}
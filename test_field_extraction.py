@@ -0,0 +1,312 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("langchain_community")
+
+import field_extraction
+from field_extraction import AccuracyFocusedFieldExtractor, FieldExtractionResult
+from llm_gateway import CircuitBreaker
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    monkeypatch.setitem(field_extraction.LLM_CACHE_CONFIG, "enabled", False)
+    config = dict(field_extraction.FIELD_EXTRACTION_CONFIG, hedging_enabled=False, packing_enabled=True,
+                  prompt_compaction=False)
+    return AccuracyFocusedFieldExtractor(config)
+
+
+def _completion(payload):
+    """Chat completion shaped like a forced function-call response."""
+    call = SimpleNamespace(function=SimpleNamespace(arguments=json.dumps(payload)))
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[call], content=None))])
+
+
+def _fallback_recorder(extractor, monkeypatch):
+    calls = []
+
+    def fake_single(text, doc_id):
+        calls.append(doc_id)
+        return FieldExtractionResult(fields={}, confidence=0.0, method="single")
+
+    monkeypatch.setattr(extractor, "extract_fields_multi_approach", fake_single)
+    return calls
+
+
+def test_packed_group_falls_back_per_document_when_circuit_is_open(extractor, monkeypatch):
+    extractor.azure_breaker = CircuitBreaker("Azure OpenAI", failure_threshold=1, cooldown=3600)
+    extractor.azure_breaker.record_failure()
+    assert extractor.azure_breaker.state == "open"
+
+    def unreachable(**kwargs):
+        raise AssertionError("Azure must not be called while the circuit is open")
+
+    monkeypatch.setattr(extractor.gateway, "chat_completion", unreachable)
+    fallbacks = _fallback_recorder(extractor, monkeypatch)
+    documents = [("1", "Patient order, start of care 01/02/2024"),
+                 ("2", "Patient order, start of care 03/04/2024")]
+
+    results = extractor.extract_fields_packed(documents)
+
+    assert fallbacks == ["1", "2"]
+    assert set(results) == {"1", "2"}
+    assert extractor.azure_breaker.stats["rejected"] == 1
+
+
+def test_partial_pattern_result_goes_to_hybrid_before_enhanced_chunking(extractor, monkeypatch):
+    extractor.config = dict(extractor.config, hybrid_extraction=True)
+    pattern_fields = {"mrn": "MRN123", "soc": "01/02/2024"}
+    pattern_calls, hybrid_inputs = [], []
+
+    def fake_patterns(text, doc_id):
+        pattern_calls.append(doc_id)
+        return dict(pattern_fields)
+
+    def fake_hybrid(text, doc_id, pattern_result):
+        hybrid_inputs.append(pattern_result)
+        return {**pattern_result, "patient_name": "JANE DOE"}
+
+    def no_chunking(text, doc_id):
+        raise AssertionError("enhanced chunking must not run before the hybrid request")
+
+    monkeypatch.setattr(extractor, "_extract_with_patterns", fake_patterns)
+    monkeypatch.setattr(extractor, "_extract_missing_fields_with_llm", fake_hybrid)
+    monkeypatch.setattr(extractor, "_extract_with_enhanced_chunking", no_chunking)
+
+    result = extractor.extract_fields_multi_approach("Patient order, start of care 01/02/2024", "7")
+
+    assert result.method == "pattern_llm_hybrid"
+    assert result.fields["patient_name"] == "JANE DOE"
+    assert pattern_calls == ["7"]
+    assert hybrid_inputs == [pattern_fields]
+
+
+def test_chunk_requests_run_concurrently_and_merge_in_chunk_order(extractor, monkeypatch):
+    chunk_fields = {
+        "CHUNK-A": {"mrn": "MRNA1", "icd_codes": []},
+        "CHUNK-B": {"mrn": "MRNB2", "patient_name": "JANE DOE", "icd_codes": ["I10"]},
+        "CHUNK-C": {},
+    }
+    in_flight, peak = [], []
+
+    def fake_completion(messages, **kwargs):
+        marker = next(key for key in chunk_fields if key in messages[-1]["content"])
+        in_flight.append(marker)
+        peak.append(len(in_flight))
+        # The first chunk answers last; its values must still win the merge
+        time.sleep(0.3 if marker == "CHUNK-A" else 0.05)
+        in_flight.remove(marker)
+        return _completion(chunk_fields[marker])
+
+    monkeypatch.setattr(extractor.gateway, "chat_completion", fake_completion)
+    text = "\n\n".join(f"{marker} " + "x" * 2900 for marker in chunk_fields)
+
+    merged = extractor._extract_with_enhanced_chunking(text, "9")
+
+    assert max(peak) > 1
+    assert merged["mrn"] == "MRNA1"
+    assert merged["patient_name"] == "JANE DOE"
+    assert merged["icd_codes"] == ["I10"]
+    assert merged["dob"] is None
+
+
+def _order(**fields):
+    order = {key: None for key in ("orderno", "orderdate", "mrn", "soc", "icd_codes", "patient_name", "dob",
+                                   "address", "patient_sex")}
+    order.update(cert_period={"soe": None, "eoe": None}, icd_codes=[])
+    order.update(fields)
+    return order
+
+
+def test_short_documents_share_one_packed_request(extractor, monkeypatch):
+    requests = []
+
+    def fake_completion(messages, **kwargs):
+        requests.append(kwargs)
+        return _completion({"documents": [
+            _order(doc_id="1", mrn="MRN12345", soc="01/02/2024"),
+            _order(doc_id="2", mrn="ABC"),
+            _order(doc_id="99", mrn="MRN99999"),
+        ]})
+
+    monkeypatch.setattr(extractor.gateway, "chat_completion", fake_completion)
+    fallbacks = _fallback_recorder(extractor, monkeypatch)
+    documents = [("1", "Patient order, start of care 01/02/2024"),
+                 ("2", "Patient order, start of care 03/04/2024"),
+                 ("3", "Patient order, start of care 05/06/2024"),
+                 ("4", "Patient order, start of care 07/08/2024 " + "x" * 2000)]
+
+    results = extractor.extract_fields_packed(documents)
+
+    assert len(requests) == 1
+    assert requests[0]["max_tokens"] == extractor.config["packing_tokens_per_doc"] * 3
+    assert set(results) == {"1", "2", "3"}
+    assert results["1"].method == "enhanced_packed"
+    assert results["1"].fields["mrn"] == "MRN12345"
+    # Invalid (bad MRN) and missing packed results fall back to single-document extraction
+    assert fallbacks == ["2", "3"]
+
+
+def test_packing_disabled_leaves_every_document_to_the_caller(extractor):
+    extractor.config = dict(extractor.config, packing_enabled=False)
+
+    assert extractor.extract_fields_packed([("1", "Patient order, start of care 01/02/2024")]) == {}
+
+
+def test_missing_field_request_asks_only_for_missing_keys(extractor, monkeypatch):
+    requests = []
+
+    def fake_completion(messages, **kwargs):
+        requests.append(kwargs)
+        return _completion({"mrn": "LLM99999", "cert_period": {"soe": "01/02/2024", "eoe": "03/01/2024"},
+                            "patient_name": "JANE DOE"})
+
+    monkeypatch.setattr(extractor.gateway, "chat_completion", fake_completion)
+    pattern_result = _order(orderno="A100", orderdate="01/01/2024", mrn="MRN12345", soc="01/02/2024",
+                            cert_period={"soe": "01/02/2024", "eoe": None}, icd_codes=["I10"],
+                            dob="05/06/1950", address="1 Main Street, Springfield", patient_sex="FEMALE")
+
+    merged = extractor._extract_missing_fields_with_llm("order text", "5", pattern_result)
+
+    schema = requests[0]["tools"][0]["function"]["parameters"]
+    assert schema["required"] == ["cert_period", "patient_name"]
+    assert merged["mrn"] == "MRN12345"
+    assert merged["patient_name"] == "JANE DOE"
+    assert merged["cert_period"] == {"soe": "01/02/2024", "eoe": "03/01/2024"}
+
+
+def test_pattern_result_without_a_critical_field_skips_hybrid(extractor, monkeypatch):
+    extractor.config = dict(extractor.config, hybrid_extraction=True)
+
+    def no_hybrid(text, doc_id, pattern_result):
+        raise AssertionError("hybrid extraction needs a critical field from the patterns")
+
+    monkeypatch.setattr(extractor, "_extract_with_patterns", lambda text, doc_id: _order(orderno="A100"))
+    monkeypatch.setattr(extractor, "_extract_missing_fields_with_llm", no_hybrid)
+    monkeypatch.setattr(extractor, "_extract_with_hedging", lambda text, doc_id: (None, None))
+    monkeypatch.setattr(extractor, "_extract_with_azure_openai_enhanced", lambda text, doc_id: None)
+    monkeypatch.setattr(extractor, "_extract_with_ollama_fallback", lambda text, doc_id: None)
+
+    result = extractor.extract_fields_multi_approach("Patient order", "8")
+
+    assert result.method != "pattern_llm_hybrid"
+
+
+def test_missing_field_request_rejects_invalid_values_and_yields_when_nothing_is_filled(extractor, monkeypatch):
+    monkeypatch.setattr(extractor.gateway, "chat_completion", lambda messages, **kwargs: _completion(
+        {"mrn": "N/A", "patient_name": "12345", "soc": "13/45/2024"}))
+    pattern_result = _order(orderno="A100", orderdate="01/01/2024", cert_period={"soe": "01/02/2024", "eoe": "03/01/2024"},
+                            icd_codes=["I10"], dob="05/06/1950", address="1 Main Street, Springfield",
+                            patient_sex="FEMALE")
+
+    assert extractor._extract_missing_fields_with_llm("order text", "6", pattern_result) is None
+
+
+def test_missing_field_request_keeps_only_valid_llm_values(extractor, monkeypatch):
+    monkeypatch.setattr(extractor.gateway, "chat_completion", lambda messages, **kwargs: _completion(
+        {"mrn": "0000", "patient_name": "JANE DOE", "soc": "01/02/2024"}))
+    pattern_result = _order(orderno="A100", orderdate="01/01/2024", cert_period={"soe": "01/02/2024", "eoe": "03/01/2024"},
+                            icd_codes=["I10"], dob="05/06/1950", address="1 Main Street, Springfield",
+                            patient_sex="FEMALE")
+
+    merged = extractor._extract_missing_fields_with_llm("order text", "6", pattern_result)
+
+    assert merged["mrn"] is None
+    assert merged["patient_name"] == "JANE DOE"
+    assert merged["soc"] == "01/02/2024"
+
+
+SAMPLE_ORDER = """HOME HEALTH CERTIFICATION AND PLAN OF CARE
+Order Number: A-10023
+Order Date: 1/5/2024
+patient name: Jane Doe
+MRN: 1234567
+Date of Birth: 05/06/1950
+Sex: Female
+Start of Care: 01/02/2024
+Start of Episode: 01/02/2024   End of Episode: 03/01/2024
+Address: 12 Oak Street, Springfield
+Diagnoses: I10 Hypertension, E11.9 Type 2 diabetes
+"""
+
+
+@pytest.mark.parametrize("text", [SAMPLE_ORDER, SAMPLE_ORDER.upper(), "Ref: XY-123456 soc 2/3/2024", "İstanbul order no 77"])
+def test_single_scan_matches_searching_each_pattern(text):
+    expected = {}
+    for name, pattern in field_extraction.LABELED_FIELD_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            expected[name] = match.group(1)
+
+    assert field_extraction.scan_labeled_fields(text) == expected
+
+
+def test_pattern_extraction_reads_labeled_fields(extractor):
+    fields = extractor._extract_with_patterns(SAMPLE_ORDER, "1")
+
+    assert fields["orderno"] == "A-10023"
+    assert fields["orderdate"] == "01/05/2024"
+    assert fields["mrn"] == "1234567"
+    assert fields["soc"] == "01/02/2024"
+    assert fields["cert_period"] == {"soe": "01/02/2024", "eoe": "03/01/2024"}
+    assert fields["dob"] == "05/06/1950"
+    assert fields["patient_sex"] == "FEMALE"
+    assert fields["icd_codes"] == ["I10", "E11.9"]
+
+
+@pytest.fixture
+def hedged(extractor):
+    extractor.config = dict(extractor.config, hedge_default_delay=0.05, hedge_min_samples=20)
+    extractor.hedge_executor = ThreadPoolExecutor(max_workers=2)
+    yield extractor
+    extractor.hedge_executor.shutdown(wait=True)
+
+
+def _providers(extractor, monkeypatch, azure_seconds, azure_result):
+    def azure(text, doc_id):
+        time.sleep(azure_seconds)
+        return azure_result
+
+    monkeypatch.setattr(extractor, "_extract_with_azure_openai_enhanced", azure)
+    monkeypatch.setattr(extractor, "_extract_with_ollama_fallback", lambda text, doc_id: {"mrn": "OLLAMA1"})
+
+
+def test_slow_azure_is_hedged_with_ollama(hedged, monkeypatch):
+    _providers(hedged, monkeypatch, azure_seconds=0.5, azure_result={"mrn": "AZURE1"})
+
+    assert hedged._extract_with_hedging("text", "1") == ("ollama_fallback", {"mrn": "OLLAMA1"})
+    assert hedged.hedge_stats == {"requests": 1, "hedged": 1, "azure_wins": 0, "ollama_wins": 1, "failed": 0}
+
+
+def test_fast_azure_is_not_hedged(hedged, monkeypatch):
+    _providers(hedged, monkeypatch, azure_seconds=0.0, azure_result={"mrn": "AZURE1"})
+
+    assert hedged._extract_with_hedging("text", "1") == ("azure_openai", {"mrn": "AZURE1"})
+    assert hedged.hedge_stats["hedged"] == 0
+
+
+def test_failed_azure_falls_back_to_ollama_without_hedging(hedged, monkeypatch):
+    _providers(hedged, monkeypatch, azure_seconds=0.0, azure_result=None)
+
+    assert hedged._extract_with_hedging("text", "1") == ("ollama_fallback", {"mrn": "OLLAMA1"})
+    assert hedged.hedge_stats["hedged"] == 0
+
+
+def test_hedge_delay_follows_the_latency_percentile(extractor):
+    extractor.config = dict(extractor.config, hedge_min_samples=10, hedge_latency_percentile=50,
+                            hedge_min_delay=2.0, hedge_default_delay=10.0)
+    assert extractor._hedge_delay() == 10.0
+
+    for seconds in range(1, 11):
+        extractor._record_azure_latency(float(seconds))
+    assert extractor._hedge_delay() == 6.0
+
+    extractor.azure_latencies.clear()
+    for _ in range(10):
+        extractor._record_azure_latency(0.5)
+    assert extractor._hedge_delay() == 2.0
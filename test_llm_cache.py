@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from llm_cache import LLMResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMResponseCache({"db_file": str(tmp_path / "cache.db"), "max_entries": 2, "ttl_days": 1,
+                              "eviction_interval": 1000})
+    yield cache
+    cache.close()
+
+
+def test_hit_ignores_whitespace_differences(cache):
+    cache.put("gpt-4o", "v1", "MRN:  123\nSOC 01/02/2024", {"mrn": "123"})
+
+    assert cache.get("gpt-4o", "v1", "MRN: 123 SOC 01/02/2024") == {"mrn": "123"}
+    assert cache.stats()["hits"] == 1
+
+
+def test_model_and_prompt_version_are_part_of_the_key(cache):
+    cache.put("gpt-4o", "v1", "text", {"mrn": "123"})
+
+    assert cache.get("gpt-4o", "v2", "text") is None
+    assert cache.get("llama3", "v1", "text") is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_expired_entries_miss_and_are_evicted(cache):
+    cache.put("gpt-4o", "v1", "text", {"mrn": "123"})
+    cache._conn.execute("UPDATE llm_responses SET created_at = ?", (time.time() - 2 * 86400,))
+
+    assert cache.get("gpt-4o", "v1", "text") is None
+    cache.evict()
+    assert cache.stats()["entries"] == 0
+
+
+def test_eviction_trims_least_recently_used(cache):
+    for name in ("a", "b", "c"):
+        cache.put("gpt-4o", "v1", name, {"name": name})
+        time.sleep(0.01)
+    cache.get("gpt-4o", "v1", "a")
+
+    cache.evict()
+
+    assert cache.get("gpt-4o", "v1", "b") is None
+    assert cache.get("gpt-4o", "v1", "a") == {"name": "a"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_unserializable_response_is_skipped(cache):
+    cache.put("gpt-4o", "v1", "text", {"when": object()})
+
+    assert cache.stats()["writes"] == 0
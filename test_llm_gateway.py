@@ -0,0 +1,87 @@
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("langchain_community")
+
+from llm_gateway import CircuitBreaker, CircuitOpenError, LLMGateway
+
+
+def _fail():
+    raise RuntimeError("azure down")
+
+
+def test_breaker_opens_after_consecutive_failures_and_rejects_calls():
+    breaker = CircuitBreaker("test", failure_threshold=2, cooldown=3600)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            breaker.call(_fail)
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "never")
+    assert breaker.stats == {"opened": 1, "rejected": 1, "probes": 0}
+
+
+def test_success_resets_the_failure_streak():
+    breaker = CircuitBreaker("test", failure_threshold=2, cooldown=3600)
+    with pytest.raises(RuntimeError):
+        breaker.call(_fail)
+    assert breaker.call(lambda: "ok") == "ok"
+    with pytest.raises(RuntimeError):
+        breaker.call(_fail)
+
+    assert breaker.state == "closed"
+
+
+def test_half_open_probe_closes_or_reopens_the_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=1, cooldown=0)
+    with pytest.raises(RuntimeError):
+        breaker.call(_fail)
+    assert breaker.state == "half_open"
+
+    with pytest.raises(RuntimeError):
+        breaker.call(_fail)
+    assert breaker.opened_at is not None
+    assert breaker.stats["probes"] == 1
+
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+    assert breaker.stats["probes"] == 2
+
+
+def _gateway():
+    return LLMGateway({"max_retries": 3, "backoff_base": 0.0, "backoff_cap": 0.0, "azure_max_concurrency": 1})
+
+
+def test_gateway_retries_transient_failures():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("timeout")
+        return "ok"
+
+    assert _gateway().call("azure", flaky) == "ok"
+    assert len(attempts) == 3
+
+
+def test_gateway_does_not_retry_content_policy_errors():
+    attempts = []
+
+    def blocked():
+        attempts.append(1)
+        raise RuntimeError("response filtered by content policy")
+
+    with pytest.raises(RuntimeError):
+        _gateway().call("azure", blocked)
+    assert len(attempts) == 1
+
+
+def test_gateway_reuses_pooled_clients():
+    gateway = _gateway()
+
+    assert gateway.azure_client("key", "https://example.openai.azure.com") is \
+        gateway.azure_client("key", "https://example.openai.azure.com")
+    assert gateway.ollama_llm("llama3", format="json") is gateway.ollama_llm("llama3", format="json")
+    assert gateway.ollama_llm("llama3") is not gateway.ollama_llm("llama3", format="json")
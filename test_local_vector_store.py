@@ -0,0 +1,145 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain")
+
+from local_vector_store import LocalVectorStore
+
+
+class FakeEmbeddings:
+    """Deterministic 8-dimensional character-count vectors."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        vector = [0.0] * 8
+        for char in text:
+            vector[ord(char) % 8] += 1.0
+        return vector
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "orders"), FakeEmbeddings(), {"payload_indexes": ["doc_id"]})
+    store.add_texts(
+        ["start of care", "diagnosis codes", "patient address"],
+        [{"doc_id": "101", "simhash": "a"}, {"doc_id": "101", "simhash": "b"}, {"doc_id": "102", "simhash": "c"}],
+        ["p1", "p2", "p3"]
+    )
+    yield store
+    store.close()
+
+
+def test_stored_payloads_scoped_to_doc_ids(store):
+    assert list(store.stored_payloads(["simhash"], doc_ids=["101"])) == [("p1", {"simhash": "a"}), ("p2", {"simhash": "b"})]
+    assert list(store.stored_payloads(["simhash"], doc_ids=[])) == []
+    assert [point_id for point_id, _ in store.stored_payloads(["simhash"])] == ["p1", "p2", "p3"]
+
+
+def test_stored_payloads_scoped_without_payload_index(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "plain"), FakeEmbeddings(), {"payload_indexes": []})
+    store.add_texts(["start of care", "patient address"], [{"doc_id": "1"}, {"doc_id": "2"}], ["p1", "p2"])
+
+    assert list(store.stored_payloads(["doc_id"], doc_ids=[2])) == [("p2", {"doc_id": "2"})]
+    store.close()
+
+
+def test_duplicate_texts_copy_the_stored_vector_without_embedding(store, monkeypatch):
+    monkeypatch.setattr(store.embedding_function, "embed_documents", None)
+
+    assert store.add_duplicate_texts(["start of care"], [{"doc_id": "102"}], ["p4"], ["p1"]) == ["p4"]
+
+    assert np.array_equal(store._matrix[store.row_of["p4"]], store._matrix[store.row_of["p1"]])
+    assert [doc.page_content for doc in store.similarity_search("start of care", k=1, filter=store.doc_filter("102"))] == [
+        "start of care"]
+    assert store.add_duplicate_texts(["start of care"], [{"doc_id": "102"}], ["p4"], ["p1"]) == []
+
+
+def test_doc_filter_search_returns_only_that_documents_chunks(store):
+    results = store.similarity_search("start of care", k=5, filter=store.doc_filter("102"))
+
+    assert [doc.page_content for doc in results] == ["patient address"]
+
+
+class RandomEmbeddings:
+    """Fixed random 16-dimensional vector per text."""
+
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.vectors = {}
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        if text not in self.vectors:
+            self.vectors[text] = self.rng.normal(size=16).tolist()
+        return self.vectors[text]
+
+
+def test_exact_search_ranks_the_matching_chunk_first(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "exact"), RandomEmbeddings(), {"payload_indexes": []})
+    texts = [f"chunk {idx}" for idx in range(50)]
+    store.add_texts(texts, ids=[f"p{idx}" for idx in range(50)])
+
+    results = store.similarity_search("chunk 17", k=3)
+
+    assert results[0].page_content == "chunk 17"
+    assert results[0].metadata["score"] == pytest.approx(1.0, abs=1e-5)
+    assert len(results) == 3
+    store.close()
+
+
+def test_ivf_with_every_list_probed_matches_exact_search(tmp_path):
+    embeddings = RandomEmbeddings()
+    config = {"payload_indexes": [], "search_mode": "ivf", "ivf_min_points": 10, "ivf_lists": 4, "ivf_nprobe": 4}
+    store = LocalVectorStore(str(tmp_path / "ivf"), embeddings, config)
+    store.add_texts([f"chunk {idx}" for idx in range(200)], ids=[f"p{idx}" for idx in range(200)])
+    query = embeddings.embed_query("chunk 3")
+
+    approximate = store.similarity_search_by_vector(query, k=5)
+    exact = store.similarity_search_by_vector(query, k=5, mode="exact")
+
+    assert [doc.page_content for doc in approximate] == [doc.page_content for doc in exact]
+    assert store._ivf_centroids.shape == (4, 16)
+    store.close()
+
+
+def test_store_reopens_with_points_and_skips_stored_ids(tmp_path):
+    embeddings = RandomEmbeddings()
+    path = str(tmp_path / "persisted")
+    store = LocalVectorStore(path, embeddings, {"payload_indexes": ["doc_id"]})
+    store.add_texts(["chunk a", "chunk b"], [{"doc_id": "1"}, {"doc_id": "2"}], ["pa", "pb"])
+    store.close()
+
+    reopened = LocalVectorStore(path, embeddings, {"payload_indexes": ["doc_id"]})
+    assert reopened.count == 2
+    assert reopened.existing_ids(["pa", "pc"]) == {"pa"}
+    assert reopened.add_texts(["chunk a", "chunk c"], ids=["pa", "pc"]) == ["pa", "pc"]
+    assert reopened.count == 3
+    assert [doc.page_content for doc in reopened.similarity_search("chunk b", k=1, filter={"doc_id": "2"})] == ["chunk b"]
+    reopened.close()
+
+
+def test_batch_search_embeds_once_and_keeps_query_order(tmp_path):
+    embeddings = RandomEmbeddings()
+    calls = []
+    embed_documents = embeddings.embed_documents
+
+    def embed_queries(texts):
+        calls.append(list(texts))
+        return embed_documents(texts)
+
+    embeddings.embed_queries = embed_queries
+    store = LocalVectorStore(str(tmp_path / "batch"), embeddings, {"payload_indexes": ["doc_id"]})
+    store.add_texts(["chunk a", "chunk b", "chunk c"], [{"doc_id": "1"}, {"doc_id": "1"}, {"doc_id": "2"}],
+                    ["pa", "pb", "pc"])
+
+    results = store.similarity_search_batch(["chunk c", "chunk a", "chunk c"], k=1,
+                                            filter=[None, None, store.doc_filter("1")])
+
+    assert calls == [["chunk c", "chunk a", "chunk c"]]
+    assert [docs[0].page_content for docs in results[:2]] == ["chunk c", "chunk a"]
+    assert results[2][0].page_content in {"chunk a", "chunk b"}
+    store.close()
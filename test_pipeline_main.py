@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+for module in ("pandas", "pytesseract", "pdfplumber", "openai", "langchain_community", "qdrant_client"):
+    pytest.importorskip(module)
+
+import vector_store
+from pipeline_main import BackgroundVectorIndex
+
+
+def test_index_builds_on_a_worker_thread(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def fake_build(texts, collection_name, doc_ids, company=None):
+        calls.append((texts, collection_name, doc_ids, company))
+        release.wait(5)
+        return "vectordb"
+
+    monkeypatch.setattr(vector_store, "build_enhanced_vectordb_with_qdrant", fake_build)
+    index = BackgroundVectorIndex(["text"], "orders", ["1"], company="acme")
+
+    index.start()
+    assert index.status == "running"
+    release.set()
+
+    assert index.result() == "vectordb"
+    assert index.status == "ready"
+    assert calls == [(["text"], "orders", ["1"], "acme")]
+
+
+@pytest.mark.parametrize("outcome, error", [(None, "build returned no vector store"), (RuntimeError("down"), "down")])
+def test_failed_build_is_reported_not_raised(monkeypatch, outcome, error):
+    def fake_build(*args, **kwargs):
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(vector_store, "build_enhanced_vectordb_with_qdrant", fake_build)
+    index = BackgroundVectorIndex(["text"], "orders", ["1"])
+
+    index.start()
+
+    assert index.result() is None
+    assert index.status == "failed"
+    assert index.error == error
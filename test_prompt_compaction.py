@@ -0,0 +1,57 @@
+from prompt_compaction import PromptCompactor, estimate_tokens
+
+LETTERHEAD = "Sunrise Home Health Agency, 100 Main Street, Springfield"
+FILLER = "Narrative visit note describing the skilled nursing plan in general terms."
+
+
+def _document():
+    pages = []
+    for page in range(3):
+        pages.append("\n".join([
+            LETTERHEAD,
+            f"------ Page {page + 1} ------",
+            *[FILLER] * 20,
+        ]))
+    pages.insert(1, "\n".join(["Patient Name: JANE DOE", "MRN: MRN12345", "Start of Care: 01/02/2024",
+                               "Skilled nursing twice weekly"]))
+    return "\n".join(pages)
+
+
+def test_keeps_anchor_windows_and_drops_repeated_boilerplate():
+    result = PromptCompactor(token_budget=1500).compact(_document())
+
+    assert "MRN: MRN12345" in result.text
+    assert "Start of Care: 01/02/2024" in result.text
+    assert "Page 2" not in result.text
+    assert result.dropped_lines >= 5
+    assert result.compacted_tokens < result.original_tokens
+    assert not result.fallback
+
+
+def test_windows_respect_the_token_budget():
+    text = "\n".join(f"MRN: MRN{idx:05d}\n" + FILLER * 2 for idx in range(200))
+
+    result = PromptCompactor(token_budget=200).compact(text)
+
+    assert result.compacted_tokens <= 200
+    assert result.text.startswith("MRN: MRN00000")
+
+
+def test_falls_back_to_leading_text_without_anchors():
+    text = "\n".join(f"{FILLER} {idx}" for idx in range(500))
+
+    result = PromptCompactor(token_budget=100).compact(text)
+
+    assert result.fallback
+    assert result.windows == 0
+    assert estimate_tokens(result.text) <= 100
+    assert text.startswith(result.text)
+
+
+def test_gap_marker_separates_distant_windows():
+    lines = ["MRN: 12345", *[f"{FILLER} {idx}" for idx in range(10)], "DOB: 01/01/1950"]
+
+    result = PromptCompactor(token_budget=1500).compact("\n".join(lines))
+
+    assert result.windows == 2
+    assert "\n...\n" in result.text
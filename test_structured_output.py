@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+from structured_output import (
+    ORDER_FIELDS_FUNCTION, ORDER_FIELDS_SCHEMA, order_fields_subset_schema, parse_structured_response,
+    repair_json, structured_request_params
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"mrn": "123"}', {"mrn": "123"}),
+    ('```json\n{"mrn": "123"}\n```', {"mrn": "123"}),
+    ('Here is the result: {"mrn": "123"} Hope this helps.', {"mrn": "123"}),
+    ('{"icd_codes": ["I10", "E11.9",],}', {"icd_codes": ["I10", "E11.9"]}),
+    ('{"mrn": None, "flag": True}', {"mrn": None, "flag": True}),
+    ("{'mrn': '123'}", {"mrn": "123"}),
+    ('{"mrn": "123", "cert_period": {"soe": "01/02/2024", "eoe": "03/0',
+     {"mrn": "123", "cert_period": {"soe": "01/02/2024", "eoe": "03/0"}}),
+    ('{"mrn": "123", "dob": nu', {"mrn": "123", "dob": None}),
+    ('[{"doc_id": "1"}, {"doc_id": "2"}]', [{"doc_id": "1"}, {"doc_id": "2"}]),
+])
+def test_repair_json_recovers_common_defects(text, expected):
+    assert repair_json(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "no json here", None])
+def test_repair_json_gives_up_without_json(text):
+    assert repair_json(text) is None
+
+
+def test_request_params_per_mode():
+    function_params = structured_request_params("function", ORDER_FIELDS_FUNCTION, ORDER_FIELDS_SCHEMA)
+    assert function_params["tools"][0]["function"]["parameters"] is ORDER_FIELDS_SCHEMA
+    assert function_params["tool_choice"]["function"]["name"] == ORDER_FIELDS_FUNCTION
+    assert structured_request_params("json_mode", ORDER_FIELDS_FUNCTION, ORDER_FIELDS_SCHEMA) == \
+        {"response_format": {"type": "json_object"}}
+    assert structured_request_params(None, ORDER_FIELDS_FUNCTION, ORDER_FIELDS_SCHEMA) == {}
+
+
+def test_subset_schema_keeps_schema_order():
+    schema = order_fields_subset_schema({"dob", "mrn", "unknown"})
+
+    assert schema["required"] == ["mrn", "dob"]
+    assert set(schema["properties"]) == {"mrn", "dob"}
+
+
+def test_parse_structured_response_prefers_tool_call_arguments():
+    call = SimpleNamespace(function=SimpleNamespace(arguments='{"mrn": "123"}'))
+    tool_response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[call], content=None))])
+    text_response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='```{"mrn": "456"}```'))])
+
+    assert parse_structured_response(tool_response) == {"mrn": "123"}
+    assert parse_structured_response(text_response) == {"mrn": "456"}
@@ -0,0 +1,61 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("requests")
+
+from validation import MedicalFieldValidator
+
+MRNS = ["MRN12345", "12-34-56", "ABCDEFG", "A1", "1234567890123456", "MR00001", "", None]
+DATES = ["01/02/2024", "1/2/24", "2024-03-04", "13/25/2024", "02/30/2024", "01/01/1850", "tomorrow", ""]
+ICD_CODES = ["I10", "E11.9", "z79.4", "250.00", "U07.1", "XYZ", ""]
+NAMES = ["JANE DOE", "O'Neil-Smith", "J", "Jane2 Doe", "1234", "x" * 101, ""]
+
+
+def test_series_validators_match_the_per_value_rules():
+    validator = MedicalFieldValidator
+    cases = [
+        (MRNS, validator.validate_mrn, validator.validate_mrn_series),
+        (ICD_CODES, validator.validate_icd_code, validator.validate_icd_code_series),
+        (NAMES, validator.validate_patient_name, validator.validate_patient_name_series),
+    ]
+    for values, scalar, vectorized in cases:
+        mask, errors = vectorized(pd.Series(values, dtype=object))
+        for value, valid, error in zip(values, mask, errors):
+            expected_valid, expected_message = scalar(value)
+            assert valid == expected_valid, value
+            if not expected_valid:
+                assert error == expected_message, value
+
+
+def test_date_series_matches_validate_date_and_returns_parsed_values():
+    mask, errors, parsed = MedicalFieldValidator.validate_date_series(pd.Series(DATES), field_name="Order Date")
+    for value, valid, error, parsed_value in zip(DATES, mask, errors, parsed):
+        expected_valid, expected_message, expected_date = MedicalFieldValidator.validate_date(value, "Order Date")
+        assert valid == expected_valid, value
+        if expected_valid:
+            assert parsed_value == pd.Timestamp(expected_date)
+        else:
+            assert error == expected_message and pd.isna(parsed_value)
+
+
+def test_allow_empty_accepts_blank_values():
+    mask, errors = MedicalFieldValidator.validate_icd_code_series(pd.Series(["", None, "I10"]), allow_empty=True)
+    assert mask.tolist() == [True, True, True]
+    assert errors.tolist() == ["", "", ""]
+
+
+def test_validate_dataframe_reports_per_row_errors():
+    df = pd.DataFrame({
+        "mrn": ["MRN12345", "ABC"],
+        "orderdate": ["01/02/2024", "not a date"],
+        "Diagnosis 1": ["I10", ""],
+        "unvalidated": ["x", "y"],
+    })
+
+    result = MedicalFieldValidator.validate_dataframe(df)
+
+    assert list(result.masks.columns) == ["mrn", "orderdate", "Diagnosis 1"]
+    assert result.valid_rows.tolist() == [True, False]
+    assert result.summary() == {"mrn": 1, "orderdate": 1, "Diagnosis 1": 0}
+    assert result.row_errors()[1] == ("mrn: MRN must be more than 3 characters and alphanumeric; "
+                                      "orderdate: Invalid Order Date format")
@@ -0,0 +1,306 @@
+import pytest
+
+pytest.importorskip("qdrant_client")
+pytest.importorskip("langchain_openai")
+
+from qdrant_client import QdrantClient
+from qdrant_client import models
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+import vector_store
+from local_vector_store import LocalVectorStore
+from vector_store import (
+    AdaptiveBatchSizer, EnhancedQdrantVectorStore, chunk_point_id, quantization_config, vector_memory_bytes
+)
+
+
+class CountingEmbeddings:
+    """Deterministic 8-dimensional vectors; records every embedded text."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        vector = [0.1] * 8
+        for char in text:
+            vector[ord(char) % 8] += 1.0
+        return vector
+
+
+@pytest.fixture
+def store():
+    client = QdrantClient(":memory:")
+    client.create_collection("orders", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    client.upsert("orders", points=[
+        PointStruct(id=point_id, vector=[1.0, 0.0], payload={"doc_id": doc_id, "simhash": "00ff", "text": "chunk"})
+        for point_id, doc_id in ((1, "101"), (2, "101"), (3, "102"), (4, "103"))
+    ])
+    return EnhancedQdrantVectorStore(client, "orders", embedding_function=None)
+
+
+def test_stored_payloads_scrolls_only_the_requested_documents(store):
+    scoped = dict(store.stored_payloads(["simhash", "doc_id"], doc_ids=["101", "103"], batch_size=1))
+
+    assert set(scoped) == {"1", "2", "4"}
+    assert scoped["4"] == {"simhash": "00ff", "doc_id": "103"}
+
+
+def test_stored_payloads_scoped_to_digit_signatures(store):
+    store.client.set_payload("orders", payload={"digit_signature": "abc"}, points=[2, 3])
+
+    scoped = dict(store.stored_payloads(["doc_id"], digit_signatures=["abc"]))
+
+    assert scoped == {"2": {"doc_id": "101"}, "3": {"doc_id": "102"}}
+    assert dict(store.stored_payloads(["doc_id"], doc_ids=["102"], digit_signatures=["abc"])) == {"3": {"doc_id": "102"}}
+
+
+def test_stored_payloads_without_doc_ids_scrolls_everything(store):
+    assert {point_id for point_id, _ in store.stored_payloads(["simhash"])} == {"1", "2", "3", "4"}
+
+
+@pytest.fixture
+def empty_store():
+    client = QdrantClient(":memory:")
+    client.create_collection("chunks", vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+    return EnhancedQdrantVectorStore(client, "chunks", CountingEmbeddings(), {"embedding_workers": 2})
+
+
+def test_chunk_point_ids_are_stable_per_document_and_content():
+    assert chunk_point_id("101", "start of care") == chunk_point_id("101", "start of care")
+    assert chunk_point_id("101", "start of care") != chunk_point_id("102", "start of care")
+    assert chunk_point_id("101", "start of care") != chunk_point_id("101", "end of episode")
+
+
+def test_reindexing_skips_stored_chunks_and_backfills_doc_id(empty_store):
+    texts = ["start of care 01/02/2024", "diagnosis I10"]
+    ids = [chunk_point_id("101", text) for text in texts]
+    empty_store.add_texts(texts[:1], [{}], ids[:1])
+
+    returned = empty_store.add_texts(texts, [{"doc_id": "101"}, {"doc_id": "101"}], ids)
+
+    assert returned == ids
+    assert empty_store.embedding_function.embedded == texts
+    payloads = empty_store.existing_payloads(ids, ["doc_id"])
+    assert {point_id: payload.get("doc_id") for point_id, payload in payloads.items()} == \
+        {ids[0]: "101", ids[1]: "101"}
+
+
+def test_batch_size_grows_when_fast_and_shrinks_when_slow():
+    sizer = AdaptiveBatchSizer(initial=20, minimum=8, maximum=40, target_latency=2.0)
+
+    sizer.observe(20, 0.5)
+    assert sizer.size == 31
+    sizer.observe(10, 5.0)
+    assert sizer.size == 31
+    sizer.observe(31, 5.0)
+    assert sizer.size == 15
+    for _ in range(5):
+        sizer.observe(sizer.size, 5.0)
+    assert sizer.size == 8
+
+
+def test_embedding_batches_are_capped_by_text_bytes(empty_store):
+    empty_store.config = dict(empty_store.config, embedding_max_batch_bytes=10)
+    items = [("x" * 4, {}, str(idx)) for idx in range(5)]
+
+    batches = list(empty_store._embedding_batches(items, AdaptiveBatchSizer(10, 1, 10, 2.0)))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_pipelined_indexing_stores_every_point_across_small_upserts(empty_store):
+    empty_store.config = dict(empty_store.config, embedding_batch_size=8, embedding_min_batch_size=8,
+                              upsert_max_points=16)
+    texts = [f"chunk {idx}" for idx in range(100)]
+    ids = [chunk_point_id("1", text) for text in texts]
+
+    assert empty_store.add_texts(texts, [{"doc_id": "1"}] * 100, ids) == ids
+    assert empty_store.client.count("chunks").count == 100
+
+
+def test_failed_embedding_batch_is_left_out(empty_store, monkeypatch):
+    empty_store.config = dict(empty_store.config, embedding_batch_size=8, embedding_min_batch_size=8,
+                              embedding_max_batch_size=8)
+    embed = empty_store.embedding_function.embed_documents
+
+    def flaky(texts):
+        if "chunk 0" in texts:
+            raise RuntimeError("rate limited")
+        return embed(texts)
+
+    monkeypatch.setattr(empty_store.embedding_function, "embed_documents", flaky)
+    texts = [f"chunk {idx}" for idx in range(16)]
+    ids = [chunk_point_id("1", text) for text in texts]
+
+    assert empty_store.add_texts(texts, None, ids) == ids[8:]
+
+
+def test_search_params_follow_the_quantization_config(empty_store):
+    empty_store.config = dict(empty_store.config, quantization_enabled=True, rescore=False, oversampling=2.0,
+                              hnsw_ef_search=64)
+
+    params = empty_store._search_params(exact=True, rescore=True)
+
+    assert params.hnsw_ef == 64 and params.exact
+    assert params.quantization.rescore is True
+    assert params.quantization.oversampling == 2.0
+    empty_store.config["quantization_enabled"] = False
+    assert empty_store._search_params().quantization is None
+
+
+@pytest.mark.skipif(not hasattr(QdrantClient, "search"), reason="qdrant-client without the search API")
+def test_doc_filter_search_returns_only_that_documents_chunks(empty_store):
+    texts = ["start of care 01/02/2024", "start of care 01/03/2024", "diagnosis I10"]
+    doc_ids = ["101", "102", "101"]
+    empty_store.add_texts(texts, [{"doc_id": doc_id} for doc_id in doc_ids],
+                          [chunk_point_id(doc_id, text) for doc_id, text in zip(doc_ids, texts)])
+
+    results = empty_store.similarity_search("start of care 01/03/2024", k=5, filter=empty_store.doc_filter("101"))
+
+    assert {doc.page_content for doc in results} == {"start of care 01/02/2024", "diagnosis I10"}
+    assert all(doc.metadata["doc_id"] == "101" for doc in results)
+
+
+def test_quantization_config_per_type():
+    assert quantization_config({"quantization_enabled": False}) is None
+
+    scalar = quantization_config({"quantization_enabled": True, "scalar_quantile": 0.95})
+    assert isinstance(scalar, models.ScalarQuantization)
+    assert scalar.scalar.type == models.ScalarType.INT8 and scalar.scalar.quantile == 0.95
+
+    binary = quantization_config({"quantization_enabled": True, "quantization_type": "binary"})
+    assert isinstance(binary, models.BinaryQuantization)
+
+
+def test_vector_memory_estimate():
+    assert vector_memory_bytes(1000, 1536, "scalar") == {"original": 1000 * 1536 * 4, "quantized": 1000 * 1536}
+    assert vector_memory_bytes(1000, 1536, "binary")["quantized"] == 1000 * 192
+    assert vector_memory_bytes(1000, 1536, None)["quantized"] == 0
+
+
+@pytest.mark.skipif(not hasattr(QdrantClient, "search_batch"), reason="qdrant-client without the search API")
+def test_batch_search_returns_one_result_list_per_query(empty_store):
+    texts = ["start of care 01/02/2024", "diagnosis I10"]
+    empty_store.add_texts(texts, [{"doc_id": "1"}, {"doc_id": "2"}], [chunk_point_id("1", texts[0]),
+                                                                      chunk_point_id("2", texts[1])])
+
+    results = empty_store.similarity_search_batch(texts, k=1, filter=[None, empty_store.doc_filter("1")])
+
+    assert [docs[0].page_content for docs in results] == texts[:1] * 2
+
+
+ORDER_TEXT = ("Patient: Jane Doe. MRN 1234567. Start of Care 01/02/2024. Physician order for skilled nursing "
+              "visits, medication management and diagnosis I10 hypertension. Certification period "
+              "01/02/2024 to 03/01/2024. Provider signature on file.")
+
+
+def test_build_reuses_the_vector_of_a_chunk_shared_across_documents(tmp_path, monkeypatch):
+    embeddings = CountingEmbeddings()
+    monkeypatch.setattr(vector_store, "AzureOpenAIEmbeddings", lambda **kwargs: embeddings)
+    monkeypatch.setattr(vector_store, "get_embedding_cache", lambda: None)
+    scanned = []
+    stored_payloads = LocalVectorStore.stored_payloads
+
+    def spy(self, fields, doc_ids=None, digit_signatures=None):
+        scanned.append((doc_ids, digit_signatures))
+        return stored_payloads(self, fields, doc_ids, digit_signatures)
+
+    monkeypatch.setattr(LocalVectorStore, "stored_payloads", spy)
+    config = {"path": str(tmp_path), "payload_indexes": ["doc_id", "digit_signature"]}
+
+    store = vector_store.build_enhanced_vectordb_with_qdrant(
+        [ORDER_TEXT, ORDER_TEXT], "orders", ["2", "1"], backend="local", store_config=config)
+
+    assert scanned == [(None, [vector_store.digit_signature(ORDER_TEXT)])]
+    assert embeddings.embedded == [ORDER_TEXT]
+    # The same order text under two doc_ids stays retrievable for each document
+    assert {payload["doc_id"] for _, payload in store.stored_payloads(["doc_id"])} == {"1", "2"}
+    for doc_id in ("1", "2"):
+        assert store.similarity_search(ORDER_TEXT, k=1, filter=store.doc_filter(doc_id))[0].page_content == ORDER_TEXT
+    store.close()
+
+
+def test_duplicate_texts_reuse_the_stored_qdrant_vector(empty_store):
+    empty_store.add_texts(["letterhead"], [{"doc_id": "1"}], ["00000000-0000-0000-0000-000000000001"])
+    embedded = list(empty_store.embedding_function.embedded)
+    copy_id = "00000000-0000-0000-0000-000000000002"
+
+    added = empty_store.add_duplicate_texts(["letterhead"], [{"doc_id": "2"}], [copy_id],
+                                            ["00000000-0000-0000-0000-000000000001"])
+
+    assert added == [copy_id]
+    assert empty_store.embedding_function.embedded == embedded
+    record = empty_store.client.retrieve("chunks", ids=[copy_id], with_vectors=True)[0]
+    source = empty_store.client.retrieve("chunks", ids=["00000000-0000-0000-0000-000000000001"], with_vectors=True)[0]
+    assert record.payload["doc_id"] == "2" and record.payload["text"] == "letterhead"
+    assert record.vector == pytest.approx(source.vector)
+
+
+class StubStore:
+    collection_name = "orders"
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.searches = []
+
+    def doc_filter(self, doc_id):
+        return {"doc_id": doc_id}
+
+    def similarity_search_batch(self, queries, k=4, filter=None):
+        self.searches.append((queries, k, filter))
+        return [self.documents for _ in queries]
+
+
+@pytest.fixture
+def retrieval_cache(monkeypatch):
+    monkeypatch.setattr(vector_store, "_retrieval_cache", vector_store.OrderedDict())
+    return vector_store._retrieval_cache
+
+
+def test_retrieved_context_is_cached_per_document_and_query(retrieval_cache):
+    store = StubStore(["chunk"])
+
+    assert vector_store.retrieve_rag_context(store, "1", "start of care") == ["chunk"]
+    assert vector_store.retrieve_rag_context(store, "1", "start of care") == ["chunk"]
+    vector_store.retrieve_rag_context(store, "2", "start of care")
+
+    assert store.searches == [(["start of care"], 8, {"doc_id": "1"}), (["start of care"], 8, {"doc_id": "2"})]
+
+
+def test_uncached_queries_are_searched_in_one_batch(retrieval_cache):
+    store = StubStore(["chunk"])
+    vector_store.retrieve_rag_context(store, "1", "mrn")
+
+    results = vector_store.retrieve_rag_contexts(store, "1", ["soc", "mrn", "icd codes"])
+
+    assert results == [["chunk"]] * 3
+    assert store.searches[1:] == [(["soc", "icd codes"], 8, {"doc_id": "1"})]
+
+
+def test_ranked_results_interleave_and_drop_repeats():
+    first, second, third = (vector_store.Document(page_content=text) for text in ("a", "b", "c"))
+
+    merged = vector_store._merge_ranked([[first, second], [third, first], []], limit=3)
+
+    assert [doc.page_content for doc in merged] == ["a", "c", "b"]
+
+
+def test_empty_retrievals_are_not_cached_and_the_cache_is_bounded(retrieval_cache, monkeypatch):
+    monkeypatch.setitem(vector_store.FIELD_EXTRACTION_CONFIG, "rag_retrieval_cache_size", 2)
+    empty = StubStore([])
+    vector_store.retrieve_rag_context(empty, "1", "query")
+    vector_store.retrieve_rag_context(empty, "1", "query")
+    assert len(empty.searches) == 2
+
+    store = StubStore(["chunk"])
+    for doc_id in ("1", "2", "3"):
+        vector_store.retrieve_rag_context(store, doc_id, "query")
+    assert [key[1] for key in retrieval_cache] == ["2", "3"]
+
+
+def test_rag_chain_is_built_once():
+    assert vector_store.get_rag_chain() is vector_store.get_rag_chain()
@@ -2,6 +2,7 @@ from datetime import datetime,timedelta
 import time
 from dateutil import parser
 import config as rc
+from date_normalization import format_date
 import os
 import pandas as pd
 from selenium import webdriver
@@ -295,9 +296,9 @@ def get_access_token(daAPITokenUrl,daAPITokenUserName,daAPITokenPswd):
     
 def date_in_standard_format(dateVal):
     if dateVal:
-        dateobj=dateVal[:10]
-        dateobj = datetime.strptime(dateobj, "%Y-%m-%d")
-        formatted_date = dateobj.strftime("%m/%d/%Y")
+        formatted_date = format_date(dateVal[:10], "%m/%d/%Y")
+        if formatted_date is None:
+            raise ValueError(f"Date is not Valid: {dateVal}")
         # print("Formatted Date:", formatted_date)
         return formatted_date
     else:
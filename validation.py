@@ -1,7 +1,10 @@
 import re
 import requests
+import numpy as np
+import pandas as pd
 from datetime import datetime
-from typing import Tuple, Optional, List, Dict, Any
+from functools import partial
+from typing import Tuple, Optional, List, Dict, Any, Callable
 from enum import Enum
 from dataclasses import dataclass
 
@@ -37,6 +40,31 @@ class FieldExtractionResult:
         if self.validation_errors is None:
             self.validation_errors = []
 
+@dataclass
+class DataFrameValidationResult:
+    """Column-wise validation outcome for a whole sheet of orders."""
+    masks: pd.DataFrame
+    errors: pd.DataFrame
+    
+    @property
+    def valid_rows(self) -> pd.Series:
+        """Boolean mask of rows where every validated column passed."""
+        return self.masks.all(axis=1)
+    
+    def row_errors(self, separator: str = "; ") -> pd.Series:
+        """Join the per-column error messages of each row into one string."""
+        joined = pd.Series("", index=self.errors.index, dtype=object)
+        for col in self.errors.columns:
+            col_errors = self.errors[col]
+            has_error = col_errors != ""
+            prefix = joined.where(joined == "", joined + separator)
+            joined = joined.where(~has_error, prefix + f"{col}: " + col_errors)
+        return joined
+    
+    def summary(self) -> Dict[str, int]:
+        """Number of invalid values per validated column."""
+        return {col: int((~self.masks[col]).sum()) for col in self.masks.columns}
+
 def is_mostly_garbage(text, threshold=0.6):
     """Check if text is mostly garbage/unreadable characters."""
     if not text: 
@@ -227,6 +255,33 @@ class TextQualityAnalyzer:
             "completeness_analysis": completeness_indicators
         }
 
+# Compiled patterns shared by the vectorized validators
+_NON_ALNUM_RE = re.compile(r'[^A-Za-z0-9]')
+_DIGIT_RE = re.compile(r'\d')
+_ALPHA_RE = re.compile(r'[^\W\d_]')
+_REPEATED_DIGIT_RE = re.compile('|'.join(d * 4 for d in '0123456789'))
+_ICD10_RE = re.compile(r'^[A-TV-Z][0-9][0-9AB]\.?[0-9A-TV-Z]{0,4}$')
+_ICD9_RE = re.compile(r'^\d{3}\.?\d{0,2}$')
+_PATIENT_NAME_RE = re.compile(r'^[A-Za-z\s\-\'\.]+$')
+_PATIENT_NAME_COMMA_RE = re.compile(r'^[A-Za-z\s\-\'\.,]+$')
+_VALIDATION_DATE_FORMATS = ["%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y"]
+
+def _as_text(values: pd.Series) -> pd.Series:
+    """Stripped string view of a column with NaN/None/"nan" mapped to empty."""
+    text = values.astype(object).where(values.notna(), "").astype(str).str.strip()
+    return text.where(~text.str.lower().isin(["nan", "none", "nat"]), "")
+
+def _mask_and_errors(index, conditions: List[pd.Series], messages: List[str]) -> Tuple[pd.Series, pd.Series]:
+    """Turn ordered failure conditions into a validity mask and first-failure messages.
+    
+    An empty message marks a condition that is allowed (e.g. optional blank values).
+    """
+    first_failed = np.select(
+        [cond.to_numpy(dtype=bool) for cond in conditions], list(range(len(conditions))), default=-1
+    )
+    errors = np.array(messages + [""], dtype=object)[first_failed]
+    return pd.Series(errors == "", index=index), pd.Series(errors, index=index, dtype=object)
+
 class MedicalFieldValidator:
     """Validates extracted medical fields for accuracy."""
     
@@ -326,6 +381,130 @@ class MedicalFieldValidator:
         
         return True, "Valid patient name format"
     
+    # ------------------------------------------------------------------
+    # Vectorized variants: same rules and messages as the per-value
+    # validators above, applied to a whole pandas Series in one pass.
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def validate_mrn_series(values: pd.Series, allow_empty: bool = False) -> Tuple[pd.Series, pd.Series]:
+        """Vectorized validate_mrn returning (validity mask, error messages)."""
+        text = _as_text(values)
+        blank = text == ""
+        cleaned = text.str.replace(_NON_ALNUM_RE, "", regex=True)
+        length = cleaned.str.len()
+        
+        conditions = [
+            blank,
+            (length <= 3) | ~cleaned.str.contains(_DIGIT_RE),
+            length > 15,
+            cleaned.str.contains(_REPEATED_DIGIT_RE),
+        ]
+        messages = [
+            "" if allow_empty else "MRN is empty",
+            "MRN must be more than 3 characters and alphanumeric",
+            "MRN too long",
+            "MRN contains invalid pattern",
+        ]
+        return _mask_and_errors(values.index, conditions, messages)
+    
+    @staticmethod
+    def validate_date_series(
+        values: pd.Series, field_name: str = "date", allow_empty: bool = False
+    ) -> Tuple[pd.Series, pd.Series, pd.Series]:
+        """Vectorized validate_date returning (validity mask, error messages, parsed datetimes).
+        
+        Datetime-typed columns (as read from Excel) are used as-is; text columns are
+        parsed with the same format list as validate_date, first matching format wins.
+        """
+        if pd.api.types.is_datetime64_any_dtype(values):
+            parsed = pd.to_datetime(values)
+            blank = parsed.isna()
+        else:
+            text = _as_text(values)
+            blank = text == ""
+            parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+            for fmt in _VALIDATION_DATE_FORMATS:
+                pending = parsed.isna() & ~blank
+                if not pending.any():
+                    break
+                parsed.loc[pending] = pd.to_datetime(text[pending], format=fmt, errors="coerce")
+        
+        current_year = datetime.now().year
+        years = parsed.dt.year
+        conditions = [
+            blank,
+            parsed.isna(),
+            (years < 1900) | (years > current_year + 5),
+        ]
+        messages = [
+            "" if allow_empty else f"{field_name} is empty",
+            f"Invalid {field_name} format",
+            f"{field_name} year out of reasonable range",
+        ]
+        mask, errors = _mask_and_errors(values.index, conditions, messages)
+        return mask, errors, parsed.where(mask)
+    
+    @staticmethod
+    def validate_icd_code_series(values: pd.Series, allow_empty: bool = False) -> Tuple[pd.Series, pd.Series]:
+        """Vectorized validate_icd_code returning (validity mask, error messages)."""
+        text = _as_text(values).str.upper()
+        blank = text == ""
+        well_formed = text.str.match(_ICD10_RE) | text.str.match(_ICD9_RE)
+        
+        conditions = [blank, ~well_formed]
+        messages = ["" if allow_empty else "ICD code is empty", "Invalid ICD code format"]
+        return _mask_and_errors(values.index, conditions, messages)
+    
+    @staticmethod
+    def validate_patient_name_series(
+        values: pd.Series, allow_empty: bool = False, allow_comma: bool = False
+    ) -> Tuple[pd.Series, pd.Series]:
+        """Vectorized validate_patient_name returning (validity mask, error messages).
+        
+        allow_comma accepts the "LAST, FIRST" layout used by the supreme sheet.
+        """
+        text = _as_text(values)
+        blank = text == ""
+        length = text.str.len()
+        name_re = _PATIENT_NAME_COMMA_RE if allow_comma else _PATIENT_NAME_RE
+        
+        conditions = [
+            blank,
+            length < 2,
+            length > 100,
+            ~text.str.contains(_ALPHA_RE),
+            ~text.str.match(name_re),
+        ]
+        messages = [
+            "" if allow_empty else "Patient name is empty",
+            "Patient name too short",
+            "Patient name too long",
+            "Patient name should contain letters",
+            "Patient name contains invalid characters",
+        ]
+        return _mask_and_errors(values.index, conditions, messages)
+    
+    @staticmethod
+    def validate_dataframe(
+        df: pd.DataFrame, rules: Optional[Dict[str, Callable]] = None
+    ) -> DataFrameValidationResult:
+        """Validate every ruled column of an orders sheet in one vectorized pass.
+        
+        Columns named in the rules but absent from the sheet are skipped.
+        """
+        rules = ORDER_SHEET_RULES if rules is None else rules
+        masks = {}
+        errors = {}
+        for column, rule in rules.items():
+            if column not in df.columns:
+                continue
+            masks[column], errors[column] = rule(df[column])[:2]
+        return DataFrameValidationResult(
+            masks=pd.DataFrame(masks, index=df.index),
+            errors=pd.DataFrame(errors, index=df.index)
+        )
+    
     @staticmethod
     def validate_fields_comprehensive(fields: Dict[str, Any]) -> Tuple[float, List[str]]:
         """Comprehensive field validation with confidence scoring."""
@@ -410,4 +589,19 @@ class MedicalFieldValidator:
         # Calculate confidence score
         confidence = (valid_fields / total_critical_fields) if total_critical_fields > 0 else 0.0
         
-        return confidence, errors 
\ No newline at end of file
+        return confidence, errors
+
+# Default column rules for orders sheets (supreme sheet / upload input)
+ORDER_SHEET_RULES: Dict[str, Callable] = {
+    "mrn": MedicalFieldValidator.validate_mrn_series,
+    "orderdate": partial(MedicalFieldValidator.validate_date_series, field_name="Order Date"),
+    "soc": partial(MedicalFieldValidator.validate_date_series, field_name="Start of Care", allow_empty=True),
+    "cert_period_soe": partial(MedicalFieldValidator.validate_date_series, field_name="Start of Episode", allow_empty=True),
+    "cert_period_eoe": partial(MedicalFieldValidator.validate_date_series, field_name="End of Episode", allow_empty=True),
+    "dob": partial(MedicalFieldValidator.validate_date_series, field_name="Date of Birth"),
+    "patientName": partial(MedicalFieldValidator.validate_patient_name_series, allow_comma=True),
+    **{
+        f"Diagnosis {i}": partial(MedicalFieldValidator.validate_icd_code_series, allow_empty=True)
+        for i in range(1, 7)
+    },
+}
@@ -1,10 +1,15 @@
+import json
 import time
+import uuid
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Union
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.llms import Ollama
 from langchain.prompts import PromptTemplate
-from langchain.chains import RetrievalQA
+from langchain.chains.question_answering import load_qa_chain
 from langchain.vectorstores.base import VectorStore
 from langchain.schema import Document
 from langchain_openai import AzureOpenAIEmbeddings
@@ -12,14 +17,104 @@ from langchain_openai import AzureOpenAIEmbeddings
 from qdrant_client import QdrantClient, models
 from qdrant_client.models import Distance, VectorParams, PointStruct, SearchParams
 
-from validation import TextQualityAnalyzer, FieldExtractionResult, ExtractionQuality
+from validation import TextQualityAnalyzer, FieldExtractionResult, ExtractionQuality, MedicalFieldValidator
+from field_extraction import AccuracyFocusedFieldExtractor
+from llm_gateway import get_llm_gateway
+from structured_output import repair_json
+from embedding_cache import EmbeddingCache, CachedEmbeddings
+from local_vector_store import LocalVectorStore
+from chunk_dedup import digit_signature, suppress_near_duplicates
+from prompt_compaction import CHARS_PER_TOKEN
 from config import (
-    QDRANT_HOST, QDRANT_PORT, QDRANT_API_KEY, COLLECTION_NAME, QDRANT_CONFIG,
+    QDRANT_HOST, QDRANT_PORT, QDRANT_API_KEY, COLLECTION_NAME, QDRANT_CONFIG, EMBEDDING_CACHE_CONFIG,
+    CHUNK_DEDUP_CONFIG,
+    VECTOR_STORE_BACKEND, LOCAL_VECTOR_STORE_CONFIG,
     azure_endpoint, api_key, OLLAMA_LLM_MODEL, FIELD_EXTRACTION_CONFIG
 )
 
 logger = logging.getLogger(__name__)
 
+# Namespace for deterministic chunk point IDs (Qdrant accepts UUID strings)
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c7a52-3c1e-4f0b-9a43-2d6f3b8e5a17")
+
+def chunk_point_id(doc_id: Optional[str], text: str) -> str:
+    """Stable point ID from the document ID and chunk content, so re-runs map to the same points."""
+    content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{doc_id or ''}:{content_hash}"))
+
+def quantization_config(config: Dict[str, Any]):
+    """Qdrant quantization config for QDRANT_CONFIG-style settings, or None when disabled."""
+    if not config.get("quantization_enabled", False):
+        return None
+    always_ram = config.get("quantization_always_ram", True)
+    if config.get("quantization_type", "scalar") == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=always_ram))
+    return models.ScalarQuantization(
+        scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=config.get("scalar_quantile", 0.99),
+            always_ram=always_ram
+        )
+    )
+
+def _sync_quantization(client: QdrantClient, collection_name: str, collection_info, config: Dict[str, Any]):
+    """Apply the configured quantization to an existing collection if it differs."""
+    desired = quantization_config(config)
+    current = getattr(collection_info.config, "quantization_config", None)
+    if desired is None or type(current) is type(desired):
+        return
+    try:
+        client.update_collection(collection_name=collection_name, quantization_config=desired)
+        logger.info(f"Enabled {config.get('quantization_type', 'scalar')} quantization on {collection_name}")
+    except Exception as e:
+        logger.warning(f"Could not update quantization on {collection_name}: {e}")
+
+def _ensure_payload_indexes(client: QdrantClient, collection_name: str, fields: List[str]):
+    """Create keyword payload indexes so filtered searches (doc_id, company) avoid full scans."""
+    try:
+        indexed = set((client.get_collection(collection_name).payload_schema or {}).keys())
+    except Exception:
+        indexed = set()
+    for field_name in fields:
+        if field_name in indexed:
+            continue
+        try:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=models.PayloadSchemaType.KEYWORD
+            )
+            logger.info(f"Created payload index on {field_name} in {collection_name}")
+        except Exception as e:
+            logger.warning(f"Could not create payload index on {field_name}: {e}")
+
+def vector_memory_bytes(points: int, dim: int, quantization_type: Optional[str]) -> Dict[str, int]:
+    """Estimated vector storage: original float32 vectors and their quantized copy.
+    
+    Computed from the point count and dimension only, not measured; the
+    collection's real footprint also includes the HNSW graph, payloads and
+    segment overhead.
+    """
+    quantized_per_vector = {"scalar": dim, "binary": (dim + 7) // 8}.get(quantization_type, 0)
+    return {"original": points * dim * 4, "quantized": points * quantized_per_vector}
+
+class AdaptiveBatchSizer:
+    """Embedding batch size that grows while calls are fast and shrinks when they get slow."""
+    
+    def __init__(self, initial: int, minimum: int, maximum: int, target_latency: float):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+    
+    def observe(self, batch_len: int, elapsed: float):
+        if batch_len < self.size:
+            return  # Short (tail or byte-capped) batches say little about the limit
+        if elapsed > self.target_latency:
+            self.size = max(self.minimum, self.size // 2)
+        elif elapsed < self.target_latency / 2:
+            self.size = min(self.maximum, int(self.size * 1.5) + 1)
+
 class EnhancedQdrantVectorStore(VectorStore):
     """Enhanced Qdrant vector store optimized for medical document accuracy."""
     
@@ -47,30 +142,116 @@ class EnhancedQdrantVectorStore(VectorStore):
             return []
             
         if ids is None:
-            ids = [str(i) for i in range(len(texts))]
+            ids = [chunk_point_id(None, text) for text in texts]
             
         if metadatas is None:
             metadatas = [{}] * len(texts)
         
+        # Only embed and upsert chunks whose point IDs are not stored yet
+        all_ids = list(dict.fromkeys(str(point_id) for point_id in ids))
+        existing = self.existing_payloads(all_ids, ["doc_id"]) if kwargs.get("skip_existing", True) else {}
+        existing_ids = set(existing)
+        self._backfill_doc_ids(existing, zip(metadatas, ids))
+        seen = set(existing_ids)
+        new_items = []
+        for text, metadata, point_id in zip(texts, metadatas, ids):
+            point_id = str(point_id)
+            if point_id not in seen:
+                seen.add(point_id)
+                new_items.append((text, metadata, point_id))
+        
+        if existing_ids:
+            logger.info(f"Skipping {len(existing_ids)} chunks already in {self.collection_name}")
+        if not new_items:
+            logger.info(f"No new chunks to add to Qdrant collection {self.collection_name}")
+            return all_ids
+        texts, metadatas, ids = (list(column) for column in zip(*new_items))
+        
         logger.info(f"Adding {len(texts)} texts to Qdrant collection {self.collection_name}")
+        inserted_ids = self._embed_and_upsert(texts, metadatas, ids)
+        logger.info(f"Successfully added {len(inserted_ids)}/{len(texts)} points to Qdrant")
+        return [point_id for point_id in all_ids if point_id in existing_ids or point_id in inserted_ids]
+    
+    def _embedding_batches(self, items, sizer):
+        """Yield slices of items sized by sizer.size at the time each slice is cut, capped by text bytes."""
+        max_bytes = self.config.get("embedding_max_batch_bytes", 256 * 1024)
+        i = 0
+        while i < len(items):
+            batch = []
+            batch_bytes = 0
+            target = sizer.size
+            while i < len(items) and len(batch) < target:
+                text_bytes = len(items[i][0].encode("utf-8"))
+                if batch and batch_bytes + text_bytes > max_bytes:
+                    break
+                batch.append(items[i])
+                batch_bytes += text_bytes
+                i += 1
+            yield batch
+    
+    def _embed_and_upsert(self, texts: List[str], metadatas: List[dict], ids: List[str]) -> set:
+        """Embed batches concurrently and stream the points to Qdrant as they arrive.
         
-        # Process in smaller batches for reliability
-        batch_size = 25  # Smaller batches for better reliability
-        all_points = []
+        At most embedding_workers * 2 batches are in flight, so memory stays bounded
+        by a few batches rather than every point. Upserts are sent with wait=False in
+        chunks of up to upsert_max_bytes; the last one waits, which is the consistency
+        barrier since Qdrant applies updates to a collection in order.
+        """
+        workers = max(1, self.config.get("embedding_workers", 4))
+        sizer = AdaptiveBatchSizer(
+            initial=self.config.get("embedding_batch_size", 25),
+            minimum=self.config.get("embedding_min_batch_size", 8),
+            maximum=self.config.get("embedding_max_batch_size", 128),
+            target_latency=self.config.get("embedding_target_latency", 2.0)
+        )
+        upsert_max_bytes = self.config.get("upsert_max_bytes", 4 * 1024 * 1024)
+        upsert_max_points = self.config.get("upsert_max_points", 256)
         
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i:i + batch_size]
-            batch_metadatas = metadatas[i:i + batch_size]
-            batch_ids = ids[i:i + batch_size]
-            
+        items = list(zip(texts, metadatas, ids))
+        batches = self._embedding_batches(items, sizer)
+        inserted_ids = set()
+        pending_points = []
+        pending_bytes = 0
+        stats = {"embed_batches": 0, "embed_failures": 0, "upserts": 0, "upsert_failures": 0}
+        
+        def embed(batch):
+            start = time.time()
+            embeddings = self.embedding_function.embed_documents([text for text, _, _ in batch])
+            return batch, embeddings, time.time() - start
+        
+        def upsert(points, wait):
             try:
-                # Get embeddings for this batch
-                embeddings = self.embedding_function.embed_documents(batch_texts)
-                
-                # Create points
-                for text, embedding, metadata, point_id in zip(batch_texts, embeddings, batch_metadatas, batch_ids):
-                    all_points.append(
-                        PointStruct(
+                self.client.upsert(collection_name=self.collection_name, points=points, wait=wait)
+                inserted_ids.update(str(point.id) for point in points)
+                stats["upserts"] += 1
+            except Exception as e:
+                stats["upsert_failures"] += 1
+                logger.error(f"Failed to upsert {len(points)} points: {e}")
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = set()
+            exhausted = False
+            while in_flight or not exhausted:
+                while not exhausted and len(in_flight) < workers * 2:
+                    batch = next(batches, None)
+                    if batch is None:
+                        exhausted = True
+                    else:
+                        in_flight.add(executor.submit(embed, batch))
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        batch, embeddings, elapsed = future.result()
+                    except Exception as e:
+                        stats["embed_failures"] += 1
+                        logger.error(f"Failed to embed batch: {e}")
+                        continue
+                    stats["embed_batches"] += 1
+                    sizer.observe(len(batch), elapsed)
+                    for (text, metadata, point_id), embedding in zip(batch, embeddings):
+                        point = PointStruct(
                             id=str(point_id),
                             vector=embedding,
                             payload={
@@ -80,38 +261,171 @@ class EnhancedQdrantVectorStore(VectorStore):
                                 **metadata
                             }
                         )
-                    )
-                    
-                logger.info(f"Processed embedding batch {i//batch_size + 1}/{(len(texts)-1)//batch_size + 1}")
-                
-            except Exception as e:
-                logger.error(f"Failed to process batch {i//batch_size + 1}: {e}")
-                continue
-        
-        # Insert points into Qdrant in batches
-        insert_batch_size = 50
-        inserted_count = 0
+                        point_bytes = len(embedding) * 4 + len(json.dumps(point.payload, default=str))
+                        # Flush before adding, so the final flush below is never empty and can act as the barrier
+                        if pending_points and (pending_bytes + point_bytes > upsert_max_bytes
+                                               or len(pending_points) >= upsert_max_points):
+                            upsert(pending_points, wait=False)
+                            pending_points, pending_bytes = [], 0
+                        pending_points.append(point)
+                        pending_bytes += point_bytes
+                    logger.info(f"Embedded {stats['embed_batches']} batches "
+                               f"(batch size now {sizer.size}, {len(inserted_ids)} points upserted)")
         
-        for i in range(0, len(all_points), insert_batch_size):
-            batch = all_points[i:i + insert_batch_size]
-            
+        if pending_points:
+            upsert(pending_points, wait=True)
+        logger.info(f"Indexing stats: {stats}")
+        return inserted_ids
+    
+    def existing_ids(self, ids: List[str], batch_size: int = 256) -> set:
+        """IDs from ids that already exist in the collection (bulk retrieve, no payloads or vectors)."""
+        return set(self.existing_payloads(ids, False, batch_size))
+    
+    def existing_payloads(self, ids: List[str], fields=False, batch_size: int = 256) -> Dict[str, dict]:
+        """Payloads (restricted to fields; False for none) of the ids already in the collection."""
+        found = {}
+        for i in range(0, len(ids), batch_size):
+            batch = ids[i:i + batch_size]
             try:
-                self.client.upsert(
+                records = self.client.retrieve(
                     collection_name=self.collection_name,
-                    points=batch,
-                    wait=True  # Wait for confirmation
+                    ids=batch,
+                    with_payload=fields,
+                    with_vectors=False
                 )
-                inserted_count += len(batch)
-                logger.info(f"Inserted batch {i//insert_batch_size + 1}/{(len(all_points)-1)//insert_batch_size + 1} "
-                           f"({inserted_count}/{len(all_points)} points)")
-                
+                found.update((str(record.id), record.payload or {}) for record in records)
             except Exception as e:
-                logger.error(f"Failed to insert batch {i//insert_batch_size + 1}: {e}")
-                continue
+                # Treat the batch as new; upserting deterministic IDs again is harmless
+                logger.warning(f"Existence check failed for {len(batch)} ids: {e}")
+        return found
+    
+    def _backfill_doc_ids(self, existing: Dict[str, dict], metadata_ids):
+        """Set doc_id on stored points indexed before chunk payloads carried it."""
+        missing = {}
+        for metadata, point_id in metadata_ids:
+            point_id = str(point_id)
+            doc_id = metadata.get("doc_id")
+            if doc_id is not None and point_id in existing and existing[point_id].get("doc_id") is None:
+                missing.setdefault(doc_id, []).append(point_id)
+        for doc_id, point_ids in missing.items():
+            try:
+                self.client.set_payload(
+                    collection_name=self.collection_name,
+                    payload={"doc_id": doc_id},
+                    points=point_ids,
+                    wait=False
+                )
+            except Exception as e:
+                logger.warning(f"Failed to backfill doc_id for {doc_id}: {e}")
+        if missing:
+            logger.info(f"Backfilled doc_id on {sum(len(v) for v in missing.values())} stored chunks")
+    
+    def add_duplicate_texts(
+        self, texts: List[str], metadatas: List[dict], ids: List[str], source_ids: List[str]
+    ) -> List[str]:
+        """Add texts under their own IDs, reusing the stored vectors of the points they duplicate.
         
-        logger.info(f"Successfully added {inserted_count}/{len(all_points)} points to Qdrant")
-        return ids[:inserted_count]
-
+        No embedding call is made; texts whose source point cannot be read are
+        embedded through add_texts instead. Already stored IDs are skipped.
+        """
+        seen = self.existing_ids(list(dict.fromkeys(str(point_id) for point_id in ids)))
+        items = []
+        for text, metadata, point_id, source_id in zip(texts, metadatas, ids, source_ids):
+            if str(point_id) not in seen:
+                seen.add(str(point_id))
+                items.append((text, metadata, str(point_id), str(source_id)))
+        if not items:
+            return []
+        sources = sorted({source_id for _, _, _, source_id in items})
+        try:
+            records = self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=sources,
+                with_payload=False,
+                with_vectors=True
+            )
+            vectors = {str(record.id): record.vector for record in records}
+        except Exception as e:
+            logger.warning(f"Could not read stored vectors of {len(sources)} duplicated chunks: {e}")
+            vectors = {}
+        
+        points = [
+            PointStruct(
+                id=point_id,
+                vector=vectors[source_id],
+                payload={"text": text, "text_length": len(text), "word_count": len(text.split()), **metadata}
+            )
+            for text, metadata, point_id, source_id in items if source_id in vectors
+        ]
+        added = []
+        if points:
+            try:
+                self.client.upsert(collection_name=self.collection_name, points=points, wait=True)
+                added = [str(point.id) for point in points]
+            except Exception as e:
+                logger.error(f"Failed to upsert {len(points)} duplicated chunks: {e}")
+        
+        logger.info(f"Added {len(added)} chunks reusing stored vectors to {self.collection_name}")
+        
+        missing = [(text, metadata, point_id) for text, metadata, point_id, source_id in items if source_id not in vectors]
+        if missing:
+            logger.info(f"Embedding {len(missing)} duplicated chunks whose stored vector was not found")
+            missing_texts, missing_metadatas, missing_ids = (list(column) for column in zip(*missing))
+            added += self.add_texts(missing_texts, missing_metadatas, missing_ids)
+        return added
+    
+    def _search_params(self, exact: bool = False, **overrides) -> SearchParams:
+        """HNSW search parameters, using the collection's quantization as configured.
+        
+        overrides may set oversampling, rescore or ignore_quantization for one search.
+        """
+        quantization = None
+        if self.config.get("quantization_enabled", False):
+            quantization = models.QuantizationSearchParams(
+                ignore=overrides.get("ignore_quantization", False),
+                rescore=overrides.get("rescore", self.config.get("rescore", True)),
+                oversampling=overrides.get("oversampling", self.config.get("oversampling", 1.0))
+            )
+        return SearchParams(
+            hnsw_ef=self.config.get("hnsw_ef_search", 200),
+            exact=exact,
+            quantization=quantization
+        )
+    
+    def doc_filter(self, doc_id: str) -> models.Filter:
+        """Payload filter restricting a search to one document's chunks."""
+        return models.Filter(must=[models.FieldCondition(key="doc_id", match=models.MatchValue(value=str(doc_id)))])
+    
+    def stored_payloads(
+        self, fields: List[str], doc_ids: Optional[List[str]] = None,
+        digit_signatures: Optional[List[str]] = None, batch_size: int = 1000
+    ):
+        """Yield (point_id, payload) for stored points, fetching only the given payload fields.
+        
+        doc_ids and digit_signatures restrict the scroll to points whose doc_id /
+        digit_signature is one of the values (served by the payload indexes).
+        """
+        conditions = [
+            models.FieldCondition(key=key, match=models.MatchAny(any=[str(value) for value in values]))
+            for key, values in (("doc_id", doc_ids), ("digit_signature", digit_signatures))
+            if values is not None
+        ]
+        scroll_filter = models.Filter(must=conditions) if conditions else None
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=fields,
+                with_vectors=False
+            )
+            for record in records:
+                yield str(record.id), record.payload or {}
+            if offset is None:
+                break
+    
     def similarity_search(
         self, 
         query: str, 
@@ -123,56 +437,111 @@ class EnhancedQdrantVectorStore(VectorStore):
         
         try:
             query_vector = self.embedding_function.embed_query(query)
-            
-            # Configure search parameters for maximum accuracy
-            search_params = SearchParams(
-                hnsw_ef=self.config.get("hnsw_ef_search", 200),  # Higher for accuracy
-                exact=False,
-                quantization=None  # Disabled for maximum accuracy
-            )
-            
-            # Perform search with retries
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    results = self.client.search(
-                        collection_name=self.collection_name,
-                        query_vector=query_vector,
-                        limit=k,
-                        search_params=search_params,
-                        query_filter=filter,
-                        with_payload=True,
-                        with_vectors=False
-                    )
-                    break
-                    
-                except Exception as e:
-                    logger.warning(f"Search attempt {attempt + 1} failed: {e}")
-                    if attempt == max_retries - 1:
-                        logger.error(f"All search attempts failed for query: {query[:100]}...")
-                        return []
-                    time.sleep(1)
-            
-            # Convert results to LangChain documents
-            documents = []
-            for result in results:
-                doc = Document(
-                    page_content=result.payload.get("text", ""),
-                    metadata={
-                        "score": result.score,
-                        "text_length": result.payload.get("text_length", 0),
-                        "word_count": result.payload.get("word_count", 0),
-                        **{k: v for k, v in result.payload.items() if k not in ["text", "text_length", "word_count"]}
-                    }
-                )
-                documents.append(doc)
-            
-            logger.info(f"Retrieved {len(documents)} documents for query")
-            return documents
-            
+            return self.similarity_search_by_vector(query_vector, k=k, filter=filter, **kwargs)
         except Exception as e:
             logger.error(f"Similarity search failed: {e}")
             return []
+    
+    def similarity_search_by_vector(
+        self,
+        query_vector: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        exact: bool = False,
+        **kwargs
+    ) -> List[Document]:
+        """Search with a precomputed query vector; kwargs are per-search quantization overrides."""
+        search_params = self._search_params(exact=exact, **kwargs)
+        
+        # Perform search with retries
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                results = self.client.search(
+                    collection_name=self.collection_name,
+                    query_vector=query_vector,
+                    limit=k,
+                    search_params=search_params,
+                    query_filter=filter,
+                    with_payload=True,
+                    with_vectors=False
+                )
+                break
+                
+            except Exception as e:
+                logger.warning(f"Search attempt {attempt + 1} failed: {e}")
+                if attempt == max_retries - 1:
+                    logger.error("All search attempts failed")
+                    return []
+                time.sleep(1)
+        
+        documents = [self._to_document(result) for result in results]
+        logger.info(f"Retrieved {len(documents)} documents for query")
+        return documents
+    
+    def similarity_search_batch(
+        self,
+        queries: List[str],
+        k: int = 4,
+        filter: Optional[Union[dict, List[Optional[dict]]]] = None,
+        **kwargs
+    ) -> List[List[Document]]:
+        """Search many queries at once: one embedding call and one Qdrant batch request.
+        
+        filter is either applied to every query or given per query as a list.
+        Returns one document list per query, in query order (empty lists on failure).
+        """
+        if not queries:
+            return []
+        filters = filter if isinstance(filter, list) else [filter] * len(queries)
+        try:
+            embed = getattr(self.embedding_function, "embed_queries", self.embedding_function.embed_documents)
+            query_vectors = embed(queries)
+        except Exception as e:
+            logger.error(f"Batch query embedding failed: {e}")
+            return [[] for _ in queries]
+        
+        search_params = self._search_params(**kwargs)
+        requests = [
+            models.SearchRequest(
+                vector=vector,
+                filter=query_filter,
+                limit=k,
+                params=search_params,
+                with_payload=True,
+                with_vector=False
+            )
+            for vector, query_filter in zip(query_vectors, filters)
+        ]
+        
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                batch_results = self.client.search_batch(collection_name=self.collection_name, requests=requests)
+                break
+            except Exception as e:
+                logger.warning(f"Batch search attempt {attempt + 1} failed: {e}")
+                if attempt == max_retries - 1:
+                    logger.error(f"All batch search attempts failed for {len(queries)} queries")
+                    return [[] for _ in queries]
+                time.sleep(1)
+        
+        documents = [[self._to_document(result) for result in results] for results in batch_results]
+        logger.info(f"Retrieved {sum(len(docs) for docs in documents)} documents for {len(queries)} queries")
+        return documents
+    
+    @staticmethod
+    def _to_document(result) -> Document:
+        """LangChain document from a Qdrant scored point."""
+        return Document(
+            page_content=result.payload.get("text", ""),
+            metadata={
+                "score": result.score,
+                "text_length": result.payload.get("text_length", 0),
+                "word_count": result.payload.get("word_count", 0),
+                **{k: v for k, v in result.payload.items() if k not in ["text", "text_length", "word_count"]}
+            }
+        )
 
     def as_retriever(self, **kwargs):
         """Return enhanced retriever interface."""
@@ -186,7 +555,7 @@ class EnhancedQdrantVectorStore(VectorStore):
             def _get_relevant_documents(self, query: str) -> List[Document]:
                 return self.vectorstore.similarity_search(query, **self.search_kwargs)
         
-        return EnhancedQdrantRetriever(self, kwargs)
+        return EnhancedQdrantRetriever(self, kwargs.get("search_kwargs", kwargs))
 
     @classmethod
     def from_texts(
@@ -199,6 +568,7 @@ class EnhancedQdrantVectorStore(VectorStore):
         **kwargs
     ):
         """Create enhanced QdrantVectorStore with your credentials."""
+        config = kwargs.get("config") or QDRANT_CONFIG
         
         # Initialize Qdrant client with your credentials
         try:
@@ -223,6 +593,7 @@ class EnhancedQdrantVectorStore(VectorStore):
             collection_info = client.get_collection(collection_name)
             logger.info(f"Using existing collection: {collection_name}")
             logger.info(f"Collection status: {collection_info.status}")
+            _sync_quantization(client, collection_name, collection_info, config)
             
         except Exception:
             logger.info(f"Creating new collection: {collection_name}")
@@ -245,11 +616,10 @@ class EnhancedQdrantVectorStore(VectorStore):
                         distance=Distance.COSINE
                     ),
                     hnsw_config=models.HnswConfigDiff(
-                        ef_construct=QDRANT_CONFIG.get("hnsw_ef_construct", 400),
-                        m=QDRANT_CONFIG.get("hnsw_m", 64)
+                        ef_construct=config.get("hnsw_ef_construct", 400),
+                        m=config.get("hnsw_m", 64)
                     ),
-                    # No quantization for maximum accuracy
-                    quantization_config=None
+                    quantization_config=quantization_config(config)
                 )
                 
                 logger.info(f"Successfully created collection {collection_name}")
@@ -258,8 +628,10 @@ class EnhancedQdrantVectorStore(VectorStore):
                 logger.error(f"Failed to create collection: {e}")
                 raise
         
+        _ensure_payload_indexes(client, collection_name, config.get("payload_indexes", []))
+        
         # Create vector store instance
-        vector_store = cls(client, collection_name, embedding, QDRANT_CONFIG)
+        vector_store = cls(client, collection_name, embedding, config)
         
         # Add texts if provided
         if texts:
@@ -267,8 +639,34 @@ class EnhancedQdrantVectorStore(VectorStore):
         
         return vector_store
 
-def build_enhanced_vectordb_with_qdrant(all_texts: List[str], collection_name: str = COLLECTION_NAME):
-    """Build enhanced vector database with medical document optimization."""
+EMBEDDING_DEPLOYMENT = "text-embedding-ada-002"
+
+_embedding_cache = None
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide embedding cache, or None when disabled or unavailable."""
+    global _embedding_cache
+    if _embedding_cache is None and EMBEDDING_CACHE_CONFIG.get("enabled", False):
+        try:
+            _embedding_cache = EmbeddingCache(EMBEDDING_CACHE_CONFIG)
+        except Exception as e:
+            logger.warning(f"Failed to open embedding cache: {e}")
+    return _embedding_cache
+
+def build_enhanced_vectordb_with_qdrant(
+    all_texts: List[str], collection_name: str = COLLECTION_NAME, doc_ids: Optional[List[str]] = None,
+    backend: Optional[str] = None, store_config: Optional[Dict[str, Any]] = None,
+    company: Optional[str] = None
+):
+    """Build enhanced vector database with medical document optimization.
+    
+    Point IDs are derived from the document ID (when given) and chunk content, so
+    chunks of unchanged documents already in the collection are not re-embedded.
+    backend ("qdrant" or "local") defaults to VECTOR_STORE_BACKEND; store_config
+    overrides QDRANT_CONFIG / LOCAL_VECTOR_STORE_CONFIG for this store. Chunk
+    payloads carry doc_id and company (when given) for filtered retrieval.
+    """
+    backend = backend or VECTOR_STORE_BACKEND
     
     if not all_texts:
         logger.warning("No texts provided for vector database")
@@ -293,6 +691,7 @@ def build_enhanced_vectordb_with_qdrant(all_texts: List[str], collection_name: s
     
     all_chunks = []
     metadatas = []
+    point_ids = []
     chunk_quality_scores = []
     
     # Process each document
@@ -313,14 +712,20 @@ def build_enhanced_vectordb_with_qdrant(all_texts: List[str], collection_name: s
             # Only include high-quality chunks
             if chunk_quality["score"] >= 30:  # Minimum quality threshold
                 all_chunks.append(chunk)
-                metadatas.append({
+                metadata = {
                     "doc_index": doc_idx,
                     "chunk_index": chunk_idx,
                     "doc_quality_score": doc_quality["score"],
                     "chunk_quality_score": chunk_quality["score"],
                     "medical_indicators": chunk_quality.get("medical_indicators", 0),
                     "word_count": chunk_quality.get("word_count", 0)
-                })
+                }
+                if doc_ids:
+                    metadata["doc_id"] = str(doc_ids[doc_idx])
+                if company:
+                    metadata["company"] = company
+                metadatas.append(metadata)
+                point_ids.append(chunk_point_id(doc_ids[doc_idx] if doc_ids else None, chunk))
                 chunk_quality_scores.append(chunk_quality["score"])
     
     if not all_chunks:
@@ -334,24 +739,65 @@ def build_enhanced_vectordb_with_qdrant(all_texts: List[str], collection_name: s
     embeddings = AzureOpenAIEmbeddings(
         azure_endpoint=azure_endpoint,
         api_key=api_key,
-        deployment="text-embedding-ada-002",
+        deployment=EMBEDDING_DEPLOYMENT,
         api_version="2023-05-15"
     )
+    embedding_cache = get_embedding_cache()
+    if embedding_cache:
+        embeddings = CachedEmbeddings(embeddings, embedding_cache, EMBEDDING_DEPLOYMENT)
     
-    # Create enhanced Qdrant vector store
+    # Create enhanced Qdrant (or local) vector store
+    store_class = LocalVectorStore if backend == "local" else EnhancedQdrantVectorStore
     try:
-        vectordb = EnhancedQdrantVectorStore.from_texts(
-            all_chunks,
+        vectordb = store_class.from_texts(
+            [],
             embeddings,
-            metadatas=metadatas,
-            collection_name=collection_name
+            collection_name=collection_name,
+            config=store_config
         )
         
+        reused = []
+        if CHUNK_DEDUP_CONFIG.get("enabled", False):
+            existing = []
+            # Duplicates need an identical digit signature, so only stored chunks sharing one are scanned
+            if CHUNK_DEDUP_CONFIG.get("scan_collection", True):
+                try:
+                    existing = list(vectordb.stored_payloads(
+                        ["simhash", "digit_signature", "doc_id"],
+                        digit_signatures=sorted({digit_signature(chunk) for chunk in all_chunks})))
+                except Exception as e:
+                    logger.warning(f"Could not read stored chunk fingerprints: {e}")
+            all_chunks, metadatas, point_ids, reused, dedup = suppress_near_duplicates(
+                all_chunks, metadatas, point_ids, existing
+            )
+            if dedup.skipped:
+                logger.info(f"Near-duplicate chunks not embedded: {dedup.skipped}/{dedup.chunks} "
+                           f"({dedup.within_run} within this run, {dedup.against_collection} already in "
+                           f"{collection_name}, {dedup.reused} stored for another document with a reused "
+                           f"vector); saved ~{dedup.chars_saved // CHARS_PER_TOKEN} embedding tokens")
+        
+        vectordb.add_texts(all_chunks, metadatas, point_ids)
+        if reused:
+            vectordb.add_duplicate_texts(*(list(column) for column in zip(*reused)))
+        
         build_time = time.time() - start_time
         logger.info(f"Enhanced vector database built in {build_time:.2f} seconds")
-        logger.info(f"Configuration: ef_construct={QDRANT_CONFIG['hnsw_ef_construct']}, "
-                   f"m={QDRANT_CONFIG['hnsw_m']}, ef_search={QDRANT_CONFIG['hnsw_ef_search']}")
-        logger.info(f"Connected to: {QDRANT_HOST}")
+        if embedding_cache:
+            cache_stats = embedding_cache.stats()
+            logger.info(f"Embedding cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                       f"({cache_stats['hit_rate']*100:.1f}% hit rate), {cache_stats['entries']} entries, "
+                       f"{cache_stats['evictions']} evictions")
+        if backend == "local":
+            logger.info(f"Local vector store at {vectordb.path} ({vectordb.count} points, "
+                       f"{vectordb.search_mode} search)")
+        else:
+            config = vectordb.config
+            quantization = config.get("quantization_type", "scalar") if config.get("quantization_enabled") else "none"
+            logger.info(f"Configuration: ef_construct={config['hnsw_ef_construct']}, "
+                       f"m={config['hnsw_m']}, ef_search={config['hnsw_ef_search']}, "
+                       f"quantization={quantization}, oversampling={config.get('oversampling', 1.0)}, "
+                       f"rescore={config.get('rescore', True)}")
+            logger.info(f"Connected to: {QDRANT_HOST}")
         
         return vectordb
         
@@ -359,27 +805,51 @@ def build_enhanced_vectordb_with_qdrant(all_texts: List[str], collection_name: s
         logger.error(f"Failed to build vector database: {e}")
         return None
 
-def enhanced_rag_extract_fields_v2(text: str, vectordb, doc_id: str, max_retries: int = 5) -> FieldExtractionResult:
-    """Enhanced RAG extraction with comprehensive medical document understanding."""
-    
-    if not text.strip():
-        return FieldExtractionResult(
-            fields=AccuracyFocusedFieldExtractor()._get_empty_fields_structure(),
-            confidence=0.0,
-            method="no_text",
-            validation_errors=["No text provided"],
-            quality=ExtractionQuality.FAILED
-        )
+def benchmark_quantization(
+    store: EnhancedQdrantVectorStore, queries: List[str], k: int = 5,
+    settings: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Dict[str, float]]:
+    """Recall@k and latency of quantized search settings against unquantized search.
     
-    # Analyze text quality first
-    text_quality = TextQualityAnalyzer.analyze_comprehensive(text)
-    logger.info(f"Text quality for {doc_id}: {text_quality['score']:.1f} ({text_quality['quality'].value})")
+    Ground truth is exact (brute force, full precision) search. Query vectors are
+    embedded once up front, so latencies are Qdrant round-trips only. Each setting
+    holds similarity_search_by_vector overrides (oversampling, rescore,
+    ignore_quantization); the default compares unquantized HNSW with the
+    configured quantization with and without rescoring.
+    """
+    import numpy as np
     
-    if text_quality["score"] < 25:
-        logger.warning(f"Very low text quality for {doc_id}, extraction may be unreliable")
+    settings = settings or {
+        "unquantized": {"ignore_quantization": True},
+        "quantized": {"rescore": False, "oversampling": 1.0},
+        "quantized_rescore": {"rescore": True, "oversampling": store.config.get("oversampling", 1.0)},
+        "quantized_rescore_x2": {"rescore": True, "oversampling": 2.0},
+    }
+    vectors = store.embedding_function.embed_documents(queries)
+    truth = [
+        {doc.page_content for doc in store.similarity_search_by_vector(vector, k=k, exact=True)}
+        for vector in vectors
+    ]
     
-    # Enhanced prompt template with medical expertise
-    enhanced_prompt_template = """
+    report = {}
+    for name, overrides in settings.items():
+        latencies = []
+        recalls = []
+        for vector, expected in zip(vectors, truth):
+            start = time.perf_counter()
+            documents = store.similarity_search_by_vector(vector, k=k, **overrides)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if expected:
+                recalls.append(len(expected & {doc.page_content for doc in documents}) / len(expected))
+        report[name] = {
+            "recall_at_k": float(np.mean(recalls)) if recalls else 0.0,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+        }
+    return report
+
+# Enhanced prompt template with medical expertise
+RAG_PROMPT_TEMPLATE = """
 You are a highly specialized medical records extraction expert with deep knowledge of healthcare documentation standards.
 
 CRITICAL EXTRACTION REQUIREMENTS:
@@ -420,34 +890,110 @@ Return ONLY valid JSON with the exact structure specified above. No explanations
 
 JSON:"""
 
-    try:
-        # Initialize Ollama with optimal settings for medical document processing
-        llm = Ollama(
-            model=OLLAMA_LLM_MODEL,
-            temperature=0.05,  # Very low temperature for maximum consistency
-            top_k=5,           # Limited vocabulary for focused responses
-            top_p=0.8,         # Nucleus sampling for quality
-            repeat_penalty=1.1, # Prevent repetition
-            num_ctx=4096,      # Large context window for medical documents
-        )
-        
-        prompt = PromptTemplate.from_template(enhanced_prompt_template)
-        
-        # Enhanced retrieval strategy
-        retriever = vectordb.as_retriever(
-            search_kwargs={
-                "k": 8,  # Retrieve more context for better accuracy
-                "filter": None  # Could add filters based on document type
-            }
-        )
-        
-        qa = RetrievalQA.from_chain_type(
-            llm=llm,
-            retriever=retriever,
-            chain_type="stuff",
-            return_source_documents=True,  # Get source documents for analysis
-            chain_type_kwargs={"prompt": prompt}
+# Field-specific retrieval queries, searched alongside the document query so the
+# context also covers fields that query's nearest chunks tend to miss
+RAG_FIELD_QUERIES = [
+    "patient name, date of birth, sex and address",
+    "medical record number (MRN), order number and order date",
+    "start of care date and certification period from / to",
+    "diagnosis ICD-10 codes",
+]
+
+_rag_chain = None
+_rag_chain_lock = threading.Lock()
+_retrieval_cache = OrderedDict()
+_retrieval_cache_lock = threading.Lock()
+_rag_field_extractor = None
+
+def get_rag_chain():
+    """Process-wide "stuff" QA chain over the shared Ollama client; retrieval happens separately."""
+    global _rag_chain
+    with _rag_chain_lock:
+        if _rag_chain is None:
+            # Initialize Ollama with optimal settings for medical document processing
+            llm = get_llm_gateway().ollama_llm(
+                OLLAMA_LLM_MODEL,
+                temperature=0.05,  # Very low temperature for maximum consistency
+                top_k=5,           # Limited vocabulary for focused responses
+                top_p=0.8,         # Nucleus sampling for quality
+                repeat_penalty=1.1, # Prevent repetition
+                num_ctx=4096,      # Large context window for medical documents
+            )
+            _rag_chain = load_qa_chain(llm, chain_type="stuff", prompt=PromptTemplate.from_template(RAG_PROMPT_TEMPLATE))
+        return _rag_chain
+
+def _rag_extractor() -> AccuracyFocusedFieldExtractor:
+    """Shared extractor instance for RAG result structure checks and empty results."""
+    global _rag_field_extractor
+    with _rag_chain_lock:
+        if _rag_field_extractor is None:
+            _rag_field_extractor = AccuracyFocusedFieldExtractor()
+        return _rag_field_extractor
+
+def retrieve_rag_contexts(vectordb, doc_id: str, queries: List[str], k: int = 8) -> List[List[Document]]:
+    """This document's top-k chunks for each query, cached per (collection, document, query).
+    
+    Queries missing from the cache are sent together through similarity_search_batch
+    (one embedding call, one search request).
+    """
+    collection = getattr(vectordb, "collection_name", None) or getattr(vectordb, "path", None)
+    results: List[Optional[List[Document]]] = [None] * len(queries)
+    with _retrieval_cache_lock:
+        for i, query in enumerate(queries):
+            cache_key = (collection, doc_id, query, k)
+            if cache_key in _retrieval_cache:
+                _retrieval_cache.move_to_end(cache_key)
+                results[i] = _retrieval_cache[cache_key]
+    pending = [i for i, documents in enumerate(results) if documents is None]
+    if pending:
+        # Only this document's chunks: smaller search and no other patients' data in the context
+        fetched = vectordb.similarity_search_batch(
+            [queries[i] for i in pending], k=k, filter=vectordb.doc_filter(doc_id))
+        with _retrieval_cache_lock:
+            for i, documents in zip(pending, fetched):
+                results[i] = documents
+                if documents:
+                    _retrieval_cache[(collection, doc_id, queries[i], k)] = documents
+            while len(_retrieval_cache) > FIELD_EXTRACTION_CONFIG.get("rag_retrieval_cache_size", 256):
+                _retrieval_cache.popitem(last=False)
+    return results
+
+def retrieve_rag_context(vectordb, doc_id: str, query: str, k: int = 8) -> List[Document]:
+    """This document's top-k chunks for query, cached per (collection, document, query)."""
+    return retrieve_rag_contexts(vectordb, doc_id, [query], k)[0]
+
+def _merge_ranked(result_lists: List[List[Document]], limit: int) -> List[Document]:
+    """Interleave ranked results (every query's best chunk first), dropping repeated chunks."""
+    merged, seen = [], set()
+    for rank in range(max((len(documents) for documents in result_lists), default=0)):
+        for documents in result_lists:
+            if rank < len(documents) and documents[rank].page_content not in seen:
+                seen.add(documents[rank].page_content)
+                merged.append(documents[rank])
+    return merged[:limit]
+
+def enhanced_rag_extract_fields_v2(text: str, vectordb, doc_id: str, max_retries: int = 5) -> FieldExtractionResult:
+    """Enhanced RAG extraction with comprehensive medical document understanding."""
+    
+    if not text.strip():
+        return FieldExtractionResult(
+            fields=_rag_extractor()._get_empty_fields_structure(),
+            confidence=0.0,
+            method="no_text",
+            validation_errors=["No text provided"],
+            quality=ExtractionQuality.FAILED
         )
+    
+    # Analyze text quality first
+    text_quality = TextQualityAnalyzer.analyze_comprehensive(text)
+    logger.info(f"Text quality for {doc_id}: {text_quality['score']:.1f} ({text_quality['quality'].value})")
+    
+    if text_quality["score"] < 25:
+        logger.warning(f"Very low text quality for {doc_id}, extraction may be unreliable")
+    
+    try:
+        gateway = get_llm_gateway()
+        chain = get_rag_chain()
         
         # Create focused medical query
         medical_keywords = ["patient", "diagnosis", "medical", "order", "care", "episode", "certification"]
@@ -455,6 +1001,14 @@ JSON:"""
         
         focused_query = f"Extract medical order information from document containing: {', '.join(text_keywords)}. Document preview: {text[:800]}..."
         
+        # Retrieved once (and cached) in one batch with the field queries; retries below only repeat generation
+        context_limit = FIELD_EXTRACTION_CONFIG.get("rag_context_chunks", 8)
+        source_docs = _merge_ranked(
+            retrieve_rag_contexts(vectordb, doc_id, [focused_query] + RAG_FIELD_QUERIES, k=context_limit),
+            context_limit
+        )
+        logger.info(f"Retrieved {len(source_docs)} source documents for context")
+        
         best_result = None
         best_confidence = 0
         validation_errors = []
@@ -463,50 +1017,44 @@ JSON:"""
             try:
                 logger.info(f"RAG extraction attempt {attempt + 1} for {doc_id}")
                 
-                response = qa(focused_query)
+                # Run through the gateway so RAG calls share the Ollama concurrency limit
+                response = gateway.call(
+                    "ollama",
+                    lambda: chain({"input_documents": source_docs, "question": focused_query}),
+                    max_retries=1,
+                    description="rag"
+                )
                 
                 # Handle response format
                 if isinstance(response, dict):
-                    result_text = response.get("result", str(response))
-                    source_docs = response.get("source_documents", [])
+                    result_text = response.get("output_text", str(response))
                 else:
                     result_text = str(response)
-                    source_docs = []
                 
-                logger.info(f"Retrieved {len(source_docs)} source documents for context")
-                
-                # Extract and validate JSON
-                json_match = re.search(r'\{[\s\S]*\}', result_text)
-                if json_match:
-                    json_str = json_match.group()
-                    try:
-                        parsed_result = json.loads(json_str)
+                # Extract and validate JSON (malformed output is repaired locally)
+                parsed_result = repair_json(result_text)
+                if isinstance(parsed_result, dict):
+                    # Validate structure
+                    if _rag_extractor()._validate_extraction_structure(parsed_result):
+                        
+                        # Comprehensive field validation
+                        confidence, errors = MedicalFieldValidator.validate_fields_comprehensive(parsed_result)
                         
-                        # Validate structure
-                        field_extractor = AccuracyFocusedFieldExtractor()
-                        if field_extractor._validate_extraction_structure(parsed_result):
-                            
-                            # Comprehensive field validation
-                            confidence, errors = MedicalFieldValidator.validate_fields_comprehensive(parsed_result)
-                            
-                            logger.info(f"Attempt {attempt + 1} confidence: {confidence:.2f}")
-                            
-                            # Keep best result based on confidence
-                            if confidence > best_confidence:
-                                best_confidence = confidence
-                                best_result = parsed_result
-                                validation_errors = errors
-                            
-                            # If we have high confidence, stop trying
-                            if confidence >= FIELD_EXTRACTION_CONFIG.get("field_confidence_threshold", 0.7):
-                                logger.info(f"High confidence achieved ({confidence:.2f}), stopping attempts")
-                                break
+                        logger.info(f"Attempt {attempt + 1} confidence: {confidence:.2f}")
                         
-                        else:
-                            logger.warning(f"Attempt {attempt + 1}: Invalid structure")
+                        # Keep best result based on confidence
+                        if confidence > best_confidence:
+                            best_confidence = confidence
+                            best_result = parsed_result
+                            validation_errors = errors
+                        
+                        # If we have high confidence, stop trying
+                        if confidence >= FIELD_EXTRACTION_CONFIG.get("field_confidence_threshold", 0.7):
+                            logger.info(f"High confidence achieved ({confidence:.2f}), stopping attempts")
+                            break
                     
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"Attempt {attempt + 1}: JSON parsing failed - {e}")
+                    else:
+                        logger.warning(f"Attempt {attempt + 1}: Invalid structure")
                 
                 else:
                     logger.warning(f"Attempt {attempt + 1}: No JSON found in response")
@@ -546,7 +1094,7 @@ JSON:"""
         else:
             logger.error(f"All RAG extraction attempts failed for {doc_id}")
             return FieldExtractionResult(
-                fields=AccuracyFocusedFieldExtractor()._get_empty_fields_structure(),
+                fields=_rag_extractor()._get_empty_fields_structure(),
                 confidence=0.0,
                 method="rag_failed",
                 validation_errors=["All RAG extraction attempts failed"],
@@ -556,9 +1104,65 @@ JSON:"""
     except Exception as e:
         logger.error(f"Critical RAG extraction error for {doc_id}: {e}")
         return FieldExtractionResult(
-            fields=AccuracyFocusedFieldExtractor()._get_empty_fields_structure(),
+            fields=_rag_extractor()._get_empty_fields_structure(),
             confidence=0.0,
             method="rag_critical_error",
             validation_errors=[f"Critical error: {str(e)}"],
             quality=ExtractionQuality.FAILED
-        ) 
\ No newline at end of file
+        ) 
+
+if __name__ == "__main__":
+    # Recall/latency benchmarks over the chunk corpus:
+    #   python vector_store.py [db]               local backend (exact and IVF) against Qdrant
+    #   python vector_store.py quantization [db]  scalar/binary quantization against unquantized search
+    import sys
+    from database import create_connection, migrate, iter_raw_texts
+    from local_vector_store import benchmark_vector_stores
+    
+    args = sys.argv[1:]
+    quantization_mode = bool(args) and args[0] == "quantization"
+    if quantization_mode:
+        args = args[1:]
+    db_file = args[0] if args else "doctoralliance_orders_enhanced.db"
+    conn = create_connection(db_file)
+    migrate(conn)
+    rows = list(iter_raw_texts(conn))
+    conn.close()
+    doc_ids = [str(row[0]) for row in rows]
+    texts = [row[1] for row in rows]
+    queries = [f"Extract medical order information. Document preview: {text[:800]}" for text in texts[:200]]
+    
+    if quantization_mode:
+        for quantization_type in ("scalar", "binary"):
+            config = dict(QDRANT_CONFIG, quantization_enabled=True, quantization_type=quantization_type)
+            store = build_enhanced_vectordb_with_qdrant(
+                texts, f"{COLLECTION_NAME}_benchmark_{quantization_type}", doc_ids,
+                backend="qdrant", store_config=config
+            )
+            if not store:
+                continue
+            info = store.client.get_collection(store.collection_name)
+            dim = len(store.embedding_function.embed_query("dimension probe"))
+            memory = vector_memory_bytes(info.points_count or 0, dim, quantization_type)
+            print(f"{quantization_type}: {info.points_count} points, estimated vector storage (not measured): "
+                  f"{memory['original'] / 1e6:.1f} MB float32, {memory['quantized'] / 1e6:.1f} MB quantized")
+            for name, metrics in benchmark_quantization(store, queries, k=5).items():
+                print(f"  {name:22s} recall@5={metrics['recall_at_k']:.3f} "
+                      f"p50={metrics['p50_ms']:.1f}ms p95={metrics['p95_ms']:.1f}ms")
+        sys.exit(0)
+    
+    collection = f"{COLLECTION_NAME}_benchmark"
+    stores = {"local_exact": build_enhanced_vectordb_with_qdrant(texts, collection, doc_ids, backend="local")}
+    local_path = stores["local_exact"].path
+    stores["local_ivf"] = LocalVectorStore(
+        local_path, stores["local_exact"].embedding_function,
+        dict(LOCAL_VECTOR_STORE_CONFIG, search_mode="ivf", ivf_min_points=0)
+    )
+    qdrant_store = build_enhanced_vectordb_with_qdrant(texts, collection, doc_ids, backend="qdrant")
+    if qdrant_store:
+        stores["qdrant"] = qdrant_store
+    
+    report = benchmark_vector_stores(stores, queries, k=5, reference="local_exact")
+    for name, metrics in report.items():
+        print(f"{name:12s} recall@5={metrics['recall_at_k']:.3f} "
+              f"p50={metrics['p50_ms']:.1f}ms p95={metrics['p95_ms']:.1f}ms")